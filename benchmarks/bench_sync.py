@@ -0,0 +1,239 @@
+"""
+Sync benchmark for MD-to-Drive against the in-process fake Drive API
+
+Generates a synthetic docs tree, then measures cold (first sync), warm
+(10% of files modified) and no-op (nothing changed) syncs. Each sync runs in
+a fresh subprocess so peak RSS is per scenario; the fake server runs in this
+process and counts API calls.
+
+Usage:
+    python benchmarks/bench_sync.py --size small
+    python benchmarks/bench_sync.py --files 5000 --depth 6 --latency 0.02 --json results.json
+    python benchmarks/bench_sync.py --size medium --baseline results.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'tests'))
+
+from fake_drive import FakeDriveServer  # noqa: E402
+
+
+SIZES = {'small': 1000, 'medium': 10000, 'large': 100000}
+SCENARIOS = ['cold', 'warm', 'noop']
+WORDS = ('sync drive docs markdown sheet folder cache upload quota token request '
+         'latency folder batch page heading table section review').split()
+
+
+def generate_tree(root: Path, files: int, depth: int, seed: int = 0):
+    """
+    Generate a synthetic docs tree
+
+    Mostly small Markdown files, some code files and a few CSVs, spread over
+    directories up to `depth` levels deep.
+
+    Args:
+        root: Directory to create the tree in
+        files: Number of files
+        depth: Maximum directory depth
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    directories = [root]
+    while len(directories) < max(files // 20, 1):
+        parent = rng.choice(directories)
+        if len(parent.relative_to(root).parts) < depth:
+            directories.append(parent / f"section{len(directories)}")
+
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    for i in range(files):
+        directory = rng.choice(directories)
+        kind = rng.random()
+        if kind < 0.8:
+            size = int(min(rng.lognormvariate(8, 1), 200_000))
+            body = ' '.join(rng.choice(WORDS) for _ in range(size // 6))
+            (directory / f"page{i}.md").write_text(f"# Page {i}\n\n{body}\n```python\nprint({i})\n```\n")
+        elif kind < 0.9:
+            (directory / f"module{i}.py").write_text('\n'.join(f"value_{j} = {j}" for j in range(rng.randint(5, 500))))
+        else:
+            rows = int(min(rng.lognormvariate(4, 1.5), 20_000))
+            (directory / f"data{i}.csv").write_text(
+                'id,name,value\n' + ''.join(f"{j},{rng.choice(WORDS)},{rng.random():.4f}\n" for j in range(rows))
+            )
+
+
+def modify_files(root: Path, fraction: float, seed: int = 1) -> int:
+    """Append to a fraction of the tree's files; returns how many changed"""
+    rng = random.Random(seed)
+    files = sorted(p for p in root.rglob('*') if p.is_file())
+    changed = rng.sample(files, max(1, int(len(files) * fraction)))
+    for path in changed:
+        with open(path, 'a') as f:
+            f.write('\n' if path.suffix == '.csv' else f"\nEdited {time.time()}\n")
+    return len(changed)
+
+
+def run_sync(tree: Path, endpoint: str, credentials: str, cache_file: str, folder_id: str, workers: int = 1,
+             transport: str = 'urllib3', convert_workers: int = 0) -> dict:
+    """Run one sync in this process (called in the benchmark subprocess)"""
+    from md_to_drive.sync import GoogleDriveSync
+
+    start = time.perf_counter()
+    first_file = None
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        syncer = GoogleDriveSync(credentials_file=credentials, folder_id=folder_id,
+                                 cache_file=cache_file, api_endpoint=endpoint, transport=transport,
+                                 convert_workers=convert_workers)
+        for _ in syncer.iter_sync(tree, workers=workers):
+            if first_file is None:
+                first_file = time.perf_counter() - start
+    wall_time = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak_rss *= 1024
+    return {'wall_time': wall_time, 'first_file_time': first_file or wall_time, 'peak_rss_mb': peak_rss / 2 ** 20}
+
+
+def run_scenario(server: FakeDriveServer, args, workdir: Path, folder_id: str, file_count: int) -> dict:
+    server.drive.reset_counters()
+    command = [
+        sys.executable, __file__, '--worker',
+        '--tree', str(workdir / 'docs'),
+        '--endpoint', server.url,
+        '--credentials', str(workdir / 'credentials.json'),
+        '--cache-file', str(workdir / 'cache' / '.sync_cache.json'),
+        '--folder-id', folder_id,
+        '--workers', str(args.workers),
+        '--transport', args.transport,
+        '--convert-workers', str(args.convert_workers),
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+
+    calls = dict(server.drive.calls)
+    result.update({
+        'api_calls': sum(calls.values()),
+        'api_calls_per_file': sum(calls.values()) / file_count,
+        'api_calls_by_method': calls,
+        'bytes_uploaded': server.drive.bytes_uploaded,
+    })
+    return result
+
+
+def check_regressions(results: dict, baseline: dict, max_regression: float) -> list:
+    """Compare results against a baseline run; returns regression messages"""
+    regressions = []
+    for scenario, result in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario)
+        if not previous:
+            continue
+        for metric in ('wall_time', 'api_calls_per_file', 'peak_rss_mb'):
+            if previous[metric] and result[metric] > previous[metric] * (1 + max_regression):
+                regressions.append(
+                    f"{scenario} {metric}: {result[metric]:.3f} vs baseline {previous[metric]:.3f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', choices=SIZES, default='small', help='Tree size preset (1k/10k/100k files)')
+    parser.add_argument('--files', type=int, help='Number of files (overrides --size)')
+    parser.add_argument('--depth', type=int, default=4, help='Maximum directory depth (default: 4)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake API latency per request in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--workers', type=int, default=1, help='Files synced concurrently (default: 1)')
+    parser.add_argument('--transport', choices=['urllib3', 'http2', 'httplib2'], default='urllib3',
+                        help='HTTP transport (default: urllib3)')
+    parser.add_argument('--convert-workers', type=int, default=0,
+                        help='Conversion processes (default: 0, converting in the sync threads)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios to run')
+    parser.add_argument('--json', dest='json_file', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Results JSON from a previous run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed slowdown vs baseline before failing (default: 0.2 = 20%%)')
+    # Internal: run a single sync and print its measurements
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--tree', help=argparse.SUPPRESS)
+    parser.add_argument('--endpoint', help=argparse.SUPPRESS)
+    parser.add_argument('--credentials', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-file', help=argparse.SUPPRESS)
+    parser.add_argument('--folder-id', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_sync(Path(args.tree), args.endpoint, args.credentials, args.cache_file, args.folder_id,
+                                  args.workers, args.transport, args.convert_workers)))
+        return 0
+
+    file_count = args.files or SIZES[args.size]
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    results = {
+        'files': file_count,
+        'depth': args.depth,
+        'latency': args.latency,
+        'workers': args.workers,
+        'transport': args.transport,
+        'convert_workers': args.convert_workers,
+        'error_rate': args.error_rate,
+        'scenarios': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='md-to-drive-bench-') as tmp, \
+            FakeDriveServer(latency=args.latency, error_rate=args.error_rate, keep_content=False) as server:
+        workdir = Path(tmp)
+        print(f"🏗️  Generating {file_count} files (depth {args.depth})...")
+        generate_tree(workdir / 'docs', file_count, args.depth)
+        server.write_credentials(str(workdir / 'credentials.json'))
+        folder_id = server.drive.add_file('Benchmark')['id']
+
+        print(f"{'scenario':<8} {'wall':>9} {'1st file':>9} {'calls':>8} {'calls/file':>11} {'peak RSS':>10}")
+        for scenario in scenarios:
+            if scenario == 'warm':
+                modify_files(workdir / 'docs', 0.1)
+            elif scenario == 'cold':
+                # Cold must start from an empty cache (scenarios may be reordered)
+                cache_file = workdir / 'cache' / '.sync_cache.json'
+                if cache_file.exists():
+                    cache_file.unlink()
+            elif scenario != 'noop':
+                parser.error(f"Unknown scenario: {scenario}")
+
+            result = run_scenario(server, args, workdir, folder_id, file_count)
+            results['scenarios'][scenario] = result
+            print(f"{scenario:<8} {result['wall_time']:>8.2f}s {result['first_file_time']:>8.2f}s {result['api_calls']:>8} "
+                  f"{result['api_calls_per_file']:>11.2f} {result['peak_rss_mb']:>8.1f}MB")
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = check_regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\n❌ Performance regressions:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print("\n✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+HTTP transport benchmark for MD-to-Drive against the in-process fake Drive API
+
+Sends the same mix of small Drive requests (files.list and files.get, like
+folder lookups) from several threads through each transport and reports
+per-request latency percentiles, throughput and how many connections the
+server accepted. Requests are sent in `--rounds` batches, each on fresh
+threads like successive syncs or daemon jobs, and `--connect-latency`
+charges each new connection like a TLS handshake would. The fake serves
+plain HTTP/1.1, so the http2 transport shows httpx pooling here, not
+HTTP/2 multiplexing.
+
+Usage:
+    python benchmarks/bench_transport.py
+    python benchmarks/bench_transport.py --requests 2000 --threads 16 --rounds 10 --connect-latency 0.05
+    python benchmarks/bench_transport.py --transports urllib3,httplib2 --json transport.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'tests'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from fake_drive import FakeDriveServer  # noqa: E402
+from md_to_drive.auth import CredentialPool  # noqa: E402
+from md_to_drive.transport import POOL_SIZE, TRANSPORTS  # noqa: E402
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_transport(server: FakeDriveServer, credentials: str, transport: str, requests: int, threads: int,
+                  pool_size: int, rounds: int = 1) -> dict:
+    """Send `requests` calls from `threads` threads (new ones each round) through one transport"""
+    pool = CredentialPool(credentials, api_endpoint=server.url, transport=transport, pool_size=pool_size)
+    pool.authenticate()
+    folder_id = server.drive.add_file(f"Bench {transport}")['id']
+    server.drive.reset_counters()
+
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        if i % 2:
+            pool.execute(lambda service: service.files().get(fileId=folder_id, fields='id'))
+        else:
+            pool.execute(lambda service: service.files().list(
+                q=f"name='folder{i % 50}' and '{folder_id}' in parents and trashed=false",
+                fields='files(id, name)'
+            ))
+        return time.perf_counter() - start
+
+    latencies = []
+    start = time.perf_counter()
+    for batch in range(rounds):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies += executor.map(call, range(batch, requests, rounds))
+    latencies.sort()
+    wall_time = time.perf_counter() - start
+
+    return {
+        'wall_time': wall_time,
+        'requests_per_second': requests / wall_time,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'connections': server.drive.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transports', default=','.join(TRANSPORTS),
+                        help='Comma-separated transports to compare (default: all)')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per transport (default: 500)')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent threads (default: 8)')
+    parser.add_argument('--rounds', type=int, default=5, help='Batches sent on fresh threads (default: 5)')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE,
+                        help=f'Connections per pooled transport (default: {POOL_SIZE})')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake API latency per request in seconds')
+    parser.add_argument('--connect-latency', type=float, default=0.0,
+                        help='Fake cost of each new connection in seconds (e.g. 0.05 for a TLS handshake)')
+    parser.add_argument('--json', dest='json_file', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    transports = [t.strip() for t in args.transports.split(',') if t.strip()]
+    results = {
+        'requests': args.requests,
+        'threads': args.threads,
+        'rounds': args.rounds,
+        'pool_size': args.pool_size,
+        'latency': args.latency,
+        'connect_latency': args.connect_latency,
+        'transports': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='md-to-drive-bench-') as tmp, \
+            FakeDriveServer(latency=args.latency, connect_latency=args.connect_latency, keep_content=False) as server:
+        credentials = str(Path(tmp) / 'credentials.json')
+        server.write_credentials(credentials)
+
+        print(f"{'transport':<10} {'wall':>8} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'conns':>6}")
+        for transport in transports:
+            if transport not in TRANSPORTS:
+                parser.error(f"Unknown transport: {transport}")
+            try:
+                result = run_transport(server, credentials, transport, args.requests, args.threads, args.pool_size,
+                                       args.rounds)
+            except ValueError as e:
+                print(f"{transport:<10} skipped: {e}")
+                continue
+            results['transports'][transport] = result
+            print(f"{transport:<10} {result['wall_time']:>7.2f}s {result['requests_per_second']:>8.0f} "
+                  f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms "
+                  f"{result['connections']:>6}")
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Import-time benchmark for the MD-to-Drive CLI
+
+Measures how long it takes to start the CLI in a fresh interpreter, which is
+what every git-hook-triggered sync pays before doing any work.
+
+Usage:
+    python benchmarks/import_time.py [--runs 10]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Modules that must not be imported just to start the CLI
+HEAVY_MODULES = ['googleapiclient', 'google.oauth2', 'httplib2']
+
+
+def time_command(args, runs):
+    """
+    Run a command several times in fresh processes
+
+    Args:
+        args: Command line to run
+        runs: Number of runs
+
+    Returns:
+        List of wall times in milliseconds
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def imported_heavy_modules(module):
+    """
+    Get the heavy modules pulled in by importing a module
+
+    Args:
+        module: Module to import in a fresh interpreter
+
+    Returns:
+        List of heavy module names that were imported
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    return output.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Runs per measurement (default: 10)')
+    args = parser.parse_args()
+
+    benchmarks = {
+        'python (baseline)': [sys.executable, '-c', 'pass'],
+        'import md_to_drive': [sys.executable, '-c', 'import md_to_drive'],
+        'import md_to_drive.cli': [sys.executable, '-c', 'import md_to_drive.cli'],
+        'import md_to_drive.sync': [sys.executable, '-c', 'import md_to_drive.sync'],
+        'md-to-drive --version': [sys.executable, '-m', 'md_to_drive.cli', '--version'],
+    }
+
+    print(f"{'benchmark':<28} {'median':>10} {'min':>10}")
+    for name, command in benchmarks.items():
+        timings = time_command(command, args.runs)
+        print(f"{name:<28} {statistics.median(timings):>8.1f}ms {min(timings):>8.1f}ms")
+
+    for module in ['md_to_drive', 'md_to_drive.cli']:
+        heavy = imported_heavy_modules(module)
+        status = f"imports {', '.join(heavy)}" if heavy else "no heavy imports"
+        print(f"{module}: {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -32,11 +32,15 @@ setup(
         "google-auth-oauthlib>=1.2.0",
         "google-auth-httplib2>=0.2.0",
         "google-api-python-client>=2.110.0",
+        "urllib3>=1.26.0",
         "click>=8.1.0",
         "pyyaml>=6.0",
         "watchdog>=3.0.0",
     ],
     extras_require={
+        "http2": [
+            "httpx[http2]>=0.24",
+        ],
         "dev": [
             "pytest>=7.0",
             "pytest-cov>=4.0",
@@ -6,7 +6,28 @@ __version__ = "0.1.0"
 __author__ = "Anthony Scolaro"
 __email__ = "anthonys@projectassistant.org"
 
-from .sync import GoogleDriveSync
-from .converter import MarkdownConverter, CSVConverter
+__all__ = ["GoogleDriveSync", "SyncResult", "MarkdownConverter", "CSVConverter", "register_converter"]
 
-__all__ = ["GoogleDriveSync", "MarkdownConverter", "CSVConverter"]
+# Public classes are imported on first access: `sync` pulls in the Google API
+# client, which would otherwise slow down every CLI invocation
+_LAZY_IMPORTS = {
+    "GoogleDriveSync": ".sync",
+    "SyncResult": ".sync",
+    "MarkdownConverter": ".converter",
+    "CSVConverter": ".converter",
+    "register_converter": ".converter",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        from importlib import import_module
+
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
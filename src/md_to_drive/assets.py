@@ -0,0 +1,150 @@
+"""
+Image asset uploads for MD-to-Drive
+Local images referenced from Markdown are uploaded once per content hash to a
+shared assets folder, so an image used by many documents costs one upload
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from googleapiclient.http import MediaFileUpload
+
+from .cache import SyncCache
+
+
+logger = logging.getLogger(__name__)
+
+ASSETS_FOLDER = '_assets'
+
+# Docs fetch images from this URL when converting; readers need access to the
+# assets folder (e.g. share it by link) for images to render inline
+ASSET_URL = 'https://drive.google.com/uc?export=view&id={}'
+
+MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+}
+
+
+class AssetUploader:
+    """Upload referenced images once, deduplicated by content hash"""
+
+    def __init__(self, syncer, folder_name: str = ASSETS_FOLDER, workers: int = 4):
+        """
+        Initialize asset uploader
+
+        Args:
+            syncer: GoogleDriveSync whose credential pool, cache and metrics are used
+            folder_name: Name of the assets folder created in the sync's root folder
+            workers: Number of images to upload concurrently
+        """
+        self.syncer = syncer
+        self.folder_name = folder_name
+        self.workers = workers
+        # Started on first use, and again after shutdown()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._folder_lock = threading.Lock()
+        # Content hash -> upload in progress or done (one per hash per run)
+        self._uploads: Dict[str, Future] = {}
+        self._folder_id: Optional[str] = None
+
+    @property
+    def root_folder_id(self) -> str:
+        return self.syncer.folder_id or 'root'
+
+    def resolve(self, images: Sequence[Path]) -> Dict[Path, str]:
+        """
+        Upload images that aren't on Drive yet and get their URLs
+
+        Images are uploaded in parallel on the asset workers; images that
+        fail to upload are left out (their links stay unchanged).
+
+        Args:
+            images: Local image paths
+
+        Returns:
+            Local image path -> URL of the uploaded copy
+        """
+        futures = {}
+        for image in images:
+            digest = SyncCache.get_file_hash(image)
+            if not digest:
+                continue
+            with self._lock:
+                future = self._uploads.get(digest)
+                if future is None:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                            thread_name_prefix='md-to-drive-assets')
+                    future = self._executor.submit(self._upload, Path(image), digest)
+                    self._uploads[digest] = future
+            futures[image] = future
+
+        urls = {}
+        for image, future in futures.items():
+            try:
+                urls[image] = ASSET_URL.format(future.result())
+            except Exception as e:
+                logger.warning("⚠️  Could not upload image %s: %s", image, e)
+        return urls
+
+    def shutdown(self, wait: bool = True):
+        """Stop the asset workers (a later upload starts new ones)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _folder(self) -> str:
+        with self._folder_lock:
+            if self._folder_id is None:
+                self._folder_id = self.syncer.get_or_create_folder(self.folder_name, self.root_folder_id)
+            return self._folder_id
+
+    def _upload(self, image: Path, digest: str) -> str:
+        cache = self.syncer.cache
+        key = f"{self.root_folder_id}:{digest}"
+        if cache is not None and key in cache.assets:
+            self.syncer.metrics.count('assets_cached')
+            return cache.assets[key]['drive_id']
+
+        with self.syncer.metrics.phase('assets'):
+            folder_id = self._folder()
+            # Content-addressed name, so copies uploaded by other machines are found too
+            name = f"{digest}{image.suffix.lower()}"
+            results = self.syncer._execute(lambda service: service.files().list(
+                q=f"name='{name}' and '{folder_id}' in parents and trashed=false",
+                spaces='drive',
+                fields='files(id)',
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True
+            ))
+            files = results.get('files', [])
+
+            if files:
+                drive_id = files[0]['id']
+                self.syncer.metrics.count('assets_reused')
+            else:
+                media = MediaFileUpload(str(image), mimetype=MIME_TYPES.get(image.suffix.lower()))
+                drive_id = self.syncer._execute(lambda service: service.files().create(
+                    body={'name': name, 'parents': [folder_id]},
+                    media_body=media,
+                    fields='id',
+                    supportsAllDrives=True
+                ))['id']
+                logger.info("🖼️  Uploaded image: %s (ID: %s)", image, drive_id,
+                            extra={'event': 'asset_uploaded', 'path': str(image), 'drive_id': drive_id})
+                self.syncer.metrics.count('assets_uploaded')
+
+        if cache is not None:
+            cache.record_asset(key, drive_id, name)
+        return drive_id
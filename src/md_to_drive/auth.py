@@ -3,27 +3,138 @@ Google Drive authentication module
 """
 
 import os
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Union
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document, fix_method_name
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
 
+from .transport import DEFAULT_TRANSPORT, POOL_SIZE, make_http
+
 
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
+# Discovery versions of the APIs used (the drive.file scope covers Sheets and
+# Docs edits of files this app created)
+API_VERSIONS = {'drive': 'v3', 'sheets': 'v4', 'docs': 'v1'}
+
+
+class TokenCache:
+    """On-disk cache of access tokens so short runs skip the token request"""
+
+    # Cached tokens this close to expiry are refreshed instead of reused
+    EXPIRY_MARGIN = timedelta(minutes=5)
+
+    def __init__(self, cache_file: str = 'cache/.token_cache.json'):
+        """
+        Initialize token cache
+
+        Args:
+            cache_file: Path to token cache file
+        """
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(credentials) -> str:
+        return f"{credentials.service_account_email} {' '.join(SCOPES)}"
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def restore(self, credentials) -> bool:
+        """
+        Load a cached, unexpired access token into credentials
+
+        Args:
+            credentials: Service account credentials
+
+        Returns:
+            bool: True if a cached token was restored
+        """
+        entry = self._read().get(self._key(credentials))
+        if not entry:
+            return False
+
+        expiry = datetime.fromisoformat(entry['expiry'])
+        # google-auth compares expiry against naive UTC time
+        if expiry - self.EXPIRY_MARGIN <= datetime.utcnow():
+            return False
+
+        credentials.token = entry['token']
+        credentials.expiry = expiry
+        return True
+
+    def store(self, credentials):
+        """
+        Save the credentials' current access token
+
+        Args:
+            credentials: Service account credentials
+        """
+        if not credentials.token or not credentials.expiry:
+            return
+
+        with self._lock:
+            tokens = self._read()
+            tokens[self._key(credentials)] = {
+                'token': credentials.token,
+                'expiry': credentials.expiry.isoformat(),
+            }
+
+            cache_dir = os.path.dirname(self.cache_file)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            # Access tokens are secrets: keep the file private to the user
+            fd = os.open(self.cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(tokens, f)
+
 
 class GoogleAuthenticator:
     """Handle Google Drive authentication"""
 
-    def __init__(self, credentials_file='credentials.json'):
+    def __init__(self, credentials_file='credentials.json', token_cache: Optional[TokenCache] = None,
+                 api_endpoint: Optional[str] = None, transport: str = DEFAULT_TRANSPORT,
+                 pool_size: int = POOL_SIZE):
         """
         Initialize authenticator
 
         Args:
             credentials_file: Path to service account JSON file
+            token_cache: Optional cache to reuse access tokens across runs
+            api_endpoint: Optional root URL to send API requests to instead of
+                Google's (e.g. a local fake server for tests and benchmarks)
+            transport: HTTP transport: 'urllib3' (pooled keep-alive), 'http2'
+                (pooled, needs httpx) or 'httplib2' (one connection per thread)
+            pool_size: Maximum open connections of a pooled transport
         """
         self.credentials_file = Path(credentials_file)
+        self.token_cache = token_cache
+        self.api_endpoint = api_endpoint or os.getenv('MD_TO_DRIVE_API_ENDPOINT')
+        self.transport = transport
+        self.pool_size = pool_size
+        self.credentials = None
+        self.http = None
         self._service = None
+        # Services by API (drive's under `service`): per thread for httplib2,
+        # shared by every thread for a pooled transport (which is thread-safe)
+        self._local = threading.local()
+        self._shared = SimpleNamespace()
+        self._build_lock = threading.Lock()
 
     def authenticate(self):
         """
@@ -53,18 +164,94 @@ class GoogleAuthenticator:
                 str(self.credentials_file),
                 scopes=SCOPES
             )
-            self._service = build('drive', 'v3', credentials=creds)
+            if self.token_cache:
+                self.token_cache.restore(creds)
+            self.credentials = creds
+            if self.transport != 'httplib2':
+                # Shared by every thread's services
+                self.http = make_http(self.transport, creds, self.pool_size)
+            self._service = self._build_service()
+            self._services().service = self._service
             return self._service
 
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Invalid credentials file: {e}")
 
+    def save_token(self):
+        """Save the current access token to the token cache"""
+        if self.token_cache and self.credentials:
+            self.token_cache.store(self.credentials)
+
+    @property
+    def account(self) -> str:
+        """Service account email (or credentials file name before authenticating)"""
+        email = getattr(self.credentials, 'service_account_email', None)
+        return email or str(self.credentials_file)
+
+    def _build_service(self, name: str = 'drive', version: str = 'v3'):
+        """Build an API service for the authenticated credentials"""
+        # A pooled transport authorizes requests itself
+        auth = {'http': self.http} if self.http is not None else {'credentials': self.credentials}
+        if self.api_endpoint:
+            # Point every URL in the discovery document (including uploads and
+            # batch) at the custom endpoint
+            document = json.loads(get_static_doc(name, version))
+            document['rootUrl'] = self.api_endpoint.rstrip('/') + '/'
+            return _reuse_collections(build_from_document(document, **auth))
+
+        # The discovery document ships with the client library: no fetch needed
+        return _reuse_collections(build(name, version, static_discovery=True, cache_discovery=False, **auth))
+
+    def _services(self):
+        """Services the calling thread may use"""
+        return self._shared if self.http is not None else self._local
+
     @property
     def service(self):
-        """Get or create Google Drive service"""
+        """
+        Get or create Google Drive service
+
+        With httplib2 each thread gets its own service object because an
+        httplib2 connection is not thread-safe; a pooled transport is, so
+        every thread shares one service (and its connections).
+        """
+        return self.api('drive')
+
+    def api(self, name: str):
+        """
+        Get or create a service for one of API_VERSIONS (shared or per thread, like `service`)
+
+        Args:
+            name: API name: 'drive', 'sheets' or 'docs'
+
+        Returns:
+            API service
+        """
         if self._service is None:
-            self._service = self.authenticate()
-        return self._service
+            self.authenticate()
+        services = self._services()
+        attribute = 'service' if name == 'drive' else name
+        service = getattr(services, attribute, None)
+        if service is None:
+            # Shared services are built once, and only published once complete
+            with self._build_lock if services is self._shared else nullcontext():
+                service = getattr(services, attribute, None)
+                if service is None:
+                    service = self._build_service(name, API_VERSIONS[name])
+                    setattr(services, attribute, service)
+        return service
+
+    @property
+    def sheets(self):
+        """Get or create Google Sheets service"""
+        return self.api('sheets')
+
+    @property
+    def docs(self):
+        """Get or create Google Docs service"""
+        return self.api('docs')
 
     def test_connection(self):
         """
@@ -82,3 +269,225 @@ class GoogleAuthenticator:
             return True
         except HttpError as error:
             raise HttpError(f"Connection test failed: {error}")
+
+
+def _reuse_collections(resource):
+    """
+    Make a service's collections (e.g. `service.files()`) return the same object on every call
+
+    The client builds a new collection, with all of its methods, each time
+    one is accessed, which costs more CPU than sending a small request.
+    Each collection is now built on first access and kept: only the
+    collections a sync uses are built (the Sheets and Docs APIs have many
+    it never touches). Collections are safe to share between threads (as
+    pooled services are): the first build happens under a lock, a built
+    collection is never modified, and each method call builds its own
+    request object.
+
+    Args:
+        resource: API service or collection
+
+    Returns:
+        The same resource
+    """
+    for name in resource._resourceDesc.get('resources', {}):
+        attribute = fix_method_name(name)
+
+        def collection(build=getattr(resource, attribute), built=[], lock=threading.Lock()):
+            if not built:
+                with lock:
+                    if not built:
+                        built.append(_reuse_collections(build()))
+            return built[0]
+
+        resource._set_dynamic_attr(attribute, collection)
+    return resource
+
+
+def is_rate_limit_error(error: HttpError) -> bool:
+    """
+    Check whether an API error means the account hit its quota
+
+    Args:
+        error: Error raised by a Google API request
+
+    Returns:
+        bool: True for 429s and 403 rate limit errors
+    """
+    status = getattr(error.resp, 'status', None)
+    if status == 429:
+        return True
+    content = error.content or b''
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return status == 403 and b'ratelimitexceeded' in content.lower()
+
+
+class CredentialPool:
+    """Spread Google Drive API requests across several service accounts"""
+
+    # Sliding window used to track each account's request rate
+    RATE_WINDOW = 100.0
+    # Backoff applied to an account after a rate limit error (doubles per strike)
+    BASE_COOLDOWN = 1.0
+    MAX_COOLDOWN = 64.0
+
+    def __init__(self, credentials_files: Union[str, Sequence[str]] = 'credentials.json',
+                 token_cache: Optional[TokenCache] = None, api_endpoint: Optional[str] = None,
+                 transport: str = DEFAULT_TRANSPORT, pool_size: int = POOL_SIZE):
+        """
+        Initialize credential pool
+
+        Args:
+            credentials_files: Path or list of paths to service account JSON files
+            token_cache: Optional cache to reuse access tokens across runs
+            api_endpoint: Optional root URL to send API requests to instead of Google's
+            transport: HTTP transport for every account (see GoogleAuthenticator)
+            pool_size: Maximum open connections per account
+        """
+        if isinstance(credentials_files, (str, os.PathLike)):
+            credentials_files = [credentials_files]
+        if not credentials_files:
+            raise ValueError("At least one credentials file is required")
+
+        self.authenticators = [GoogleAuthenticator(f, token_cache, api_endpoint, transport, pool_size)
+                               for f in credentials_files]
+        # Optional SyncMetrics that records every request attempt
+        self.metrics = None
+        self._lock = threading.Lock()
+        self._recent = [deque() for _ in self.authenticators]
+        self._cooldown_until = [0.0] * len(self.authenticators)
+        self._strikes = [0] * len(self.authenticators)
+        self._usage = [{'requests': 0, 'rate_limited': 0, 'errors': 0} for _ in self.authenticators]
+
+    def authenticate(self):
+        """
+        Authenticate every account in the pool
+
+        Returns:
+            Google Drive service object of the first account
+
+        Raises:
+            FileNotFoundError: If a credentials file doesn't exist
+            ValueError: If credentials are invalid
+        """
+        services = [auth.authenticate() for auth in self.authenticators]
+        return services[0]
+
+    def save_tokens(self):
+        """Save every account's access token to the token cache"""
+        for auth in self.authenticators:
+            auth.save_token()
+
+    def _acquire(self) -> int:
+        """
+        Pick the account to send the next request with
+
+        Chooses the least busy account that is not cooling down after a rate
+        limit error, waiting for the earliest cooldown to end if all are.
+
+        Returns:
+            Index of the chosen account
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                available = [i for i, until in enumerate(self._cooldown_until) if until <= now]
+                if available:
+                    for i in available:
+                        recent = self._recent[i]
+                        while recent and recent[0] < now - self.RATE_WINDOW:
+                            recent.popleft()
+                    index = min(available, key=lambda i: len(self._recent[i]))
+                    self._recent[index].append(now)
+                    self._usage[index]['requests'] += 1
+                    return index
+                wait = min(self._cooldown_until) - now
+            time.sleep(wait)
+
+    def _record_rate_limit(self, index: int):
+        """Put an account in cooldown after a rate limit error"""
+        with self._lock:
+            self._strikes[index] += 1
+            self._usage[index]['rate_limited'] += 1
+            cooldown = min(self.BASE_COOLDOWN * 2 ** (self._strikes[index] - 1), self.MAX_COOLDOWN)
+            self._cooldown_until[index] = time.monotonic() + cooldown + random.uniform(0, 1)
+
+    def execute(self, make_request: Callable, on_progress: Optional[Callable[[int, int], None]] = None,
+                api: str = 'drive'):
+        """
+        Execute a request on the least busy account, failing over on rate limits
+
+        Args:
+            make_request: Function taking a service and returning a request
+            on_progress: Optional callback(bytes_sent, total_bytes) called after each
+                chunk of a resumable upload
+            api: Service passed to make_request: 'drive', 'sheets' or 'docs'
+
+        Returns:
+            Response of the request
+
+        Raises:
+            HttpError: If the request fails, or every retry was rate limited
+        """
+        attempts = 5 * len(self.authenticators)
+
+        for attempt in range(attempts):
+            index = self._acquire()
+            try:
+                service = self.authenticators[index].api(api)
+                response = self._execute_request(make_request(service), on_progress)
+            except HttpError as error:
+                if is_rate_limit_error(error) and attempt < attempts - 1:
+                    self._record_rate_limit(index)
+                    continue
+                with self._lock:
+                    self._usage[index]['errors'] += 1
+                raise
+
+            with self._lock:
+                self._strikes[index] = 0
+            return response
+
+    @staticmethod
+    def _run(request, on_progress: Optional[Callable[[int, int], None]] = None):
+        """Run a request, uploading resumable media chunk by chunk when progress is wanted"""
+        if on_progress is None or getattr(request, 'resumable', None) is None:
+            return request.execute()
+        response = None
+        while response is None:
+            status, response = request.next_chunk()
+            if status is not None:
+                on_progress(status.resumable_progress, status.total_size)
+        return response
+
+    def _execute_request(self, request, on_progress: Optional[Callable[[int, int], None]] = None):
+        """Execute a request, recording it in metrics if enabled"""
+        if self.metrics is None:
+            return self._run(request, on_progress)
+
+        method = getattr(request, 'methodId', None) or 'unknown'
+        media = getattr(request, 'resumable', None)
+        start = time.perf_counter()
+        error = True
+        try:
+            with self.metrics.span(method):
+                response = self._run(request, on_progress)
+            error = False
+            return response
+        finally:
+            self.metrics.record_call(method, time.perf_counter() - start, error=error,
+                                     bytes_sent=media.size() if media else 0)
+
+    def usage(self) -> List[Dict[str, Union[str, int]]]:
+        """
+        Get per-account usage for this run
+
+        Returns:
+            List of dicts with account, requests, rate_limited and errors
+        """
+        with self._lock:
+            return [
+                {'account': auth.account, **usage}
+                for auth, usage in zip(self.authenticators, self._usage)
+            ]
@@ -6,9 +6,21 @@ Tracks file hashes to avoid re-syncing unchanged files
 import os
 import json
 import hashlib
+import logging
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, Tuple, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Tuple, Optional, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+# Version 1 was a flat {file path: entry} dict keyed by the path as passed on
+# the command line; version 2 wraps entries keyed by make_key()
+CACHE_VERSION = 2
+
+# Google expires resumable upload sessions after a week
+UPLOAD_SESSION_MAX_AGE = timedelta(days=7)
 
 
 class SyncCache:
@@ -23,6 +35,15 @@ class SyncCache:
         """
         self.cache_file = cache_file
         self.cache: Dict[str, dict] = {}
+        # Uploaded images, keyed by assets folder and content hash
+        self.assets: Dict[str, dict] = {}
+        # Drive folders mirroring local directories, keyed like files (make_key)
+        self.folders: Dict[str, dict] = {}
+        # Content hashes computed ahead of the run (e.g. by a saved plan), by local path
+        self.known_hashes: Dict[str, str] = {}
+        # Guards writes so a shared cache can be updated from worker threads
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
 
     def load(self) -> Dict[str, dict]:
         """
@@ -34,14 +55,18 @@ class SyncCache:
         if os.path.exists(self.cache_file):
             try:
                 with open(self.cache_file, 'r') as f:
-                    self.cache = json.load(f)
-                    print(f"📂 Loaded cache with {len(self.cache)} entries")
+                    data = json.load(f)
+                    self.cache = self._entries_from(data)
+                    versioned = isinstance(data.get('version'), int)
+                    self.assets = data.get('assets', {}) if versioned else {}
+                    self.folders = data.get('folders', {}) if versioned else {}
+                    logger.info("📂 Loaded cache with %d entries", len(self.cache))
             except Exception as e:
-                print(f"⚠️  Error loading cache: {e}")
+                logger.warning("⚠️  Error loading cache: %s", e)
                 self.cache = {}
         else:
             self.cache = {}
-            print(f"📂 No existing cache found - starting fresh")
+            logger.info("📂 No existing cache found - starting fresh")
 
         return self.cache
 
@@ -51,16 +76,148 @@ class SyncCache:
             # Ensure cache directory exists
             cache_dir = os.path.dirname(self.cache_file)
             if cache_dir and not os.path.exists(cache_dir):
-                print(f"📁 Creating cache directory: {cache_dir}")
+                logger.debug("📁 Creating cache directory: %s", cache_dir)
                 os.makedirs(cache_dir, exist_ok=True)
 
-            print(f"📝 Saving cache to: {self.cache_file}")
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+            logger.debug("📝 Saving cache to: %s", self.cache_file)
+            with self._lock:
+                data = self.to_dict()
+            # Write to a temp file and swap it in so concurrent or interrupted
+            # saves never leave a truncated cache behind
+            with self._save_lock:
+                temp_file = f"{self.cache_file}.tmp"
+                with open(temp_file, 'w') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(temp_file, self.cache_file)
 
-            print(f"✅ Cache saved successfully ({len(self.cache)} entries)")
+            logger.info("✅ Cache saved successfully (%d entries)", len(data['files']))
         except Exception as e:
-            print(f"❌ Error saving cache: {e}")
+            logger.error("❌ Error saving cache: %s", e)
+
+    def to_dict(self) -> dict:
+        """
+        Get the on-disk representation of the cache
+
+        Returns:
+            Versioned cache document
+        """
+        return {
+            'version': CACHE_VERSION,
+            'files': dict(self.cache),
+            'assets': dict(self.assets),
+            'folders': dict(self.folders),
+        }
+
+    @staticmethod
+    def _entries_from(data: dict) -> Dict[str, dict]:
+        """
+        Extract file entries from a cache document of any version
+
+        Args:
+            data: Parsed cache file contents
+
+        Returns:
+            Cache entries dictionary
+        """
+        if isinstance(data.get('version'), int):
+            return data.get('files', {})
+        # Version 1: flat dict keyed by local path, migrated lazily by lookup()
+        return data
+
+    def export_to(self, export_file: str):
+        """
+        Write a portable copy of the cache (e.g. for a CI artifact)
+
+        Args:
+            export_file: Path to write the cache to
+        """
+        export_dir = os.path.dirname(export_file)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+
+        with self._lock:
+            data = self.to_dict()
+        with open(export_file, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def import_from(self, import_file: str) -> int:
+        """
+        Merge entries from an exported cache file
+
+        Args:
+            import_file: Path to a cache file written by export_to() or save()
+
+        Returns:
+            Number of entries added or replaced
+        """
+        with open(import_file, 'r') as f:
+            data = json.load(f)
+        if isinstance(data.get('version'), int):
+            self.merge_assets(data.get('assets', {}))
+            self.merge_folders(data.get('folders', {}))
+        return self.merge(self._entries_from(data))
+
+    @staticmethod
+    def make_key(root_folder_id: str, relative_path: Path) -> str:
+        """
+        Build a cache key that does not depend on how the sync was invoked
+
+        Args:
+            root_folder_id: Google Drive folder the sync targets
+            relative_path: File path within the synced tree, as mirrored on Drive
+
+        Returns:
+            Cache key string
+        """
+        return f"{root_folder_id}:{Path(relative_path).as_posix()}"
+
+    def lookup(self, cache_key: str, file_path: Path) -> Optional[dict]:
+        """
+        Get the cache entry for a file
+
+        Entries written by older versions (keyed by the local path) are
+        moved to the new key the first time they are seen.
+
+        Args:
+            cache_key: Key from make_key()
+            file_path: Local file path, used to find legacy entries
+
+        Returns:
+            Cache entry or None if the file is not cached
+        """
+        if cache_key not in self.cache and str(file_path) in self.cache:
+            with self._lock:
+                if str(file_path) in self.cache:
+                    self.cache[cache_key] = self.cache.pop(str(file_path))
+        return self.cache.get(cache_key)
+
+    @staticmethod
+    def content_hash(file_path: Path, dependencies: Sequence[Path] = ()) -> Optional[str]:
+        """
+        Get a hash covering a file and the files it embeds (e.g. images)
+
+        Embedded files count by content only, not by path: the links to them
+        are part of the file itself, and the same tree checked out elsewhere
+        (e.g. on a CI runner with a restored cache) must hash the same.
+
+        Args:
+            file_path: Path to file
+            dependencies: Files whose content is part of the synced result
+
+        Returns:
+            MD5 hash string (the plain file hash without dependencies) or None if error
+        """
+        file_hash = SyncCache.get_file_hash(file_path)
+        if not file_hash or not dependencies:
+            return file_hash
+        combined = hashlib.md5(file_hash.encode())
+        for digest in sorted(SyncCache.get_file_hash(dependency) or '' for dependency in dependencies):
+            combined.update(digest.encode())
+        return combined.hexdigest()
+
+    def _hash(self, file_path: Path, dependencies: Sequence[Path] = ()) -> Optional[str]:
+        """Get a file's content hash, preferring one computed ahead of the run"""
+        return self.known_hashes.get(str(file_path)) or self.content_hash(file_path, dependencies)
 
     @staticmethod
     def get_file_hash(file_path: Path) -> Optional[str]:
@@ -80,31 +237,33 @@ class SyncCache:
                     hash_md5.update(chunk)
             return hash_md5.hexdigest()
         except Exception as e:
-            print(f"⚠️  Error hashing {file_path}: {e}")
+            logger.warning("⚠️  Error hashing %s: %s", file_path, e)
             return None
 
-    def should_sync(self, file_path: Path) -> Tuple[bool, str]:
+    def should_sync(self, file_path: Path, cache_key: Optional[str] = None,
+                    dependencies: Sequence[Path] = ()) -> Tuple[bool, str]:
         """
         Check if file should be synced based on cache
 
         Args:
             file_path: Path to file
+            cache_key: Key from make_key() (defaults to the local path)
+            dependencies: Files embedded in the synced result (see content_hash)
 
         Returns:
             Tuple of (should_sync: bool, reason: str)
         """
-        file_hash = self.get_file_hash(file_path)
+        file_hash = self._hash(file_path, dependencies)
         if not file_hash:
             return True, "error reading file"
 
-        cache_key = str(file_path)
+        cache_key = cache_key or str(file_path)
+        cached_data = self.lookup(cache_key, file_path)
 
         # File not in cache - needs sync
-        if cache_key not in self.cache:
+        if cached_data is None:
             return True, "new file"
 
-        cached_data = self.cache[cache_key]
-
         # Hash changed - needs sync
         if cached_data.get('hash') != file_hash:
             return True, "file modified"
@@ -112,21 +271,151 @@ class SyncCache:
         # Already synced and unchanged
         return False, "already synced"
 
-    def update(self, file_path: Path, drive_file_id: str):
+    def update(self, file_path: Path, drive_file_id: str, cache_key: Optional[str] = None,
+               dependencies: Sequence[Path] = (), **fields):
         """
         Update cache with synced file info
 
         Args:
             file_path: Local file path
             drive_file_id: Google Drive file ID
+            cache_key: Key from make_key() (defaults to the local path)
+            dependencies: Files embedded in the synced result (see content_hash)
+            **fields: Extra fields to store (e.g. per-chunk hashes of a large CSV)
         """
-        file_hash = self.get_file_hash(file_path)
+        file_hash = self._hash(file_path, dependencies)
         if file_hash:
-            self.cache[str(file_path)] = {
+            entry = {
                 'hash': file_hash,
                 'drive_id': drive_file_id,
                 'last_sync': datetime.now().isoformat(),
+                **fields,
             }
+            with self._lock:
+                self.cache[cache_key or str(file_path)] = entry
+
+    def move(self, old_key: str, new_key: str):
+        """
+        Move a file's entry to a new key (e.g. after the file was renamed on Drive)
+
+        Args:
+            old_key: Key the entry is stored under
+            new_key: Key to store it under
+        """
+        with self._lock:
+            entry = self.cache.pop(old_key, None)
+            if entry is not None:
+                entry['last_sync'] = datetime.now().isoformat()
+                self.cache[new_key] = entry
+
+    def remove(self, cache_key: str):
+        """
+        Forget a file (e.g. after its Drive copy was pruned)
+
+        Args:
+            cache_key: Key from make_key()
+        """
+        with self._lock:
+            self.cache.pop(cache_key, None)
+
+    def record_cost(self, cache_key: str, size: int, duration: float):
+        """
+        Record how long a file took to sync (used to schedule later runs)
+
+        Args:
+            cache_key: Key from make_key()
+            size: File size in bytes
+            duration: Seconds the sync took
+        """
+        with self._lock:
+            entry = self.cache.setdefault(cache_key, {})
+            entry['size'] = size
+            entry['duration'] = round(duration, 6)
+
+    def merge(self, entries: Dict[str, dict]) -> int:
+        """
+        Merge cache entries from another cache (e.g. a shard's cache)
+
+        When both caches track the same file, the most recently synced
+        entry wins.
+
+        Args:
+            entries: Cache entries to merge in
+
+        Returns:
+            Number of entries added or replaced
+        """
+        changed = 0
+        with self._lock:
+            for cache_key, entry in entries.items():
+                current = self.cache.get(cache_key)
+                if current is None or entry.get('last_sync', '') > current.get('last_sync', ''):
+                    self.cache[cache_key] = entry
+                    changed += 1
+        return changed
+
+    def record_asset(self, asset_key: str, drive_file_id: str, name: str):
+        """
+        Record an uploaded image
+
+        Args:
+            asset_key: Root folder ID and content hash ("folder:hash")
+            drive_file_id: Google Drive file ID of the uploaded copy
+            name: File name on Drive
+        """
+        with self._lock:
+            self.assets[asset_key] = {
+                'drive_id': drive_file_id,
+                'name': name,
+                'last_sync': datetime.now().isoformat(),
+            }
+
+    def merge_assets(self, assets: Dict[str, dict]) -> int:
+        """
+        Merge uploaded-image entries from another cache
+
+        Assets are content-addressed, so existing entries are never replaced.
+
+        Args:
+            assets: Asset entries to merge in
+
+        Returns:
+            Number of entries added
+        """
+        with self._lock:
+            added = {key: entry for key, entry in assets.items() if key not in self.assets}
+            self.assets.update(added)
+        return len(added)
+
+    def record_folder(self, folder_key: str, drive_folder_id: str):
+        """
+        Record the Drive folder mirroring a local directory
+
+        Args:
+            folder_key: Key from make_key() for the directory
+            drive_folder_id: Google Drive folder ID
+        """
+        with self._lock:
+            self.folders[folder_key] = {'drive_id': drive_folder_id, 'last_sync': datetime.now().isoformat()}
+
+    def merge_folders(self, folders: Dict[str, dict]) -> int:
+        """
+        Merge folder entries from another cache (most recently synced wins)
+
+        Args:
+            folders: Folder entries to merge in
+
+        Returns:
+            Number of entries added or replaced
+        """
+        changed = 0
+        with self._lock:
+            for key, entry in folders.items():
+                current = self.folders.get(key)
+                if current is None or entry.get('last_sync', '') > current.get('last_sync', ''):
+                    self.folders[key] = entry
+                    changed += 1
+        return changed
 
     def get_stats(self) -> Dict[str, int]:
         """
@@ -139,3 +428,101 @@ class SyncCache:
             'total_entries': len(self.cache),
             'total_files': len(self.cache)
         }
+
+
+class UploadSessions:
+    """
+    On-disk record of interrupted resumable uploads
+
+    Sessions are saved after every acknowledged chunk, so they live in a
+    small file next to the sync cache instead of in the cache itself.
+    """
+
+    def __init__(self, sessions_file: str = 'cache/.upload_sessions.json'):
+        """
+        Initialize upload sessions (expired sessions are dropped on load)
+
+        Args:
+            sessions_file: Path to sessions file
+        """
+        self.sessions_file = sessions_file
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, dict] = {}
+        try:
+            with open(sessions_file, 'r') as f:
+                self.sessions = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        cutoff = (datetime.now() - UPLOAD_SESSION_MAX_AGE).isoformat()
+        expired = [key for key, session in self.sessions.items() if session.get('updated', '') < cutoff]
+        if expired:
+            for key in expired:
+                del self.sessions[key]
+            logger.debug("🧹 Dropped %d expired upload sessions", len(expired))
+            self._save()
+
+    def get(self, upload_key: str, content_hash: str, target: Optional[str]) -> Optional[dict]:
+        """
+        Get the session of an interrupted upload of the same content to the same file
+
+        Args:
+            upload_key: Key of the upload (cache key, plus the chunk for chunked CSVs)
+            content_hash: MD5 of the uploaded content
+            target: Drive ID of the file being replaced (None for a new file)
+
+        Returns:
+            Session with uri and offset (bytes acknowledged), or None
+        """
+        with self._lock:
+            session = self.sessions.get(upload_key)
+        if session and session['hash'] == content_hash and session.get('target') == target:
+            return session
+        return None
+
+    def record(self, upload_key: str, content_hash: str, target: Optional[str], uri: str, offset: int):
+        """
+        Save an upload's session and acknowledged offset
+
+        Args:
+            upload_key: Key of the upload
+            content_hash: MD5 of the uploaded content
+            target: Drive ID of the file being replaced (None for a new file)
+            uri: Resumable session URI
+            offset: Bytes the server has acknowledged
+        """
+        with self._lock:
+            self.sessions[upload_key] = {
+                'hash': content_hash,
+                'target': target,
+                'uri': uri,
+                'offset': offset,
+                'updated': datetime.now().isoformat(),
+            }
+            self._save()
+
+    def forget(self, upload_key: str):
+        """
+        Drop an upload's session (finished, expired or superseded)
+
+        Args:
+            upload_key: Key of the upload
+        """
+        with self._lock:
+            if self.sessions.pop(upload_key, None) is not None:
+                self._save()
+
+    def _save(self):
+        """Write the sessions file (callers hold the lock)"""
+        try:
+            sessions_dir = os.path.dirname(self.sessions_file)
+            if sessions_dir:
+                os.makedirs(sessions_dir, exist_ok=True)
+            # Session URIs accept uploads without credentials: keep them private
+            temp_file = f"{self.sessions_file}.tmp"
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.sessions, f)
+            os.replace(temp_file, self.sessions_file)
+        except OSError as e:
+            logger.warning("⚠️  Error saving upload sessions: %s", e)
@@ -4,24 +4,41 @@ Command-line interface for MD-to-Drive
 
 import click
 import sys
+from click.core import ParameterSource
 from pathlib import Path
 from typing import Optional
 
-from . import GoogleDriveSync
-from .__init__ import __version__
+from . import __version__
+from .cache import SyncCache
+from .convert import CONVERT_WORKERS
+from .daemon import DaemonClient, serve as daemon_serve
+from .log import setup_logging
+from .shard import parse_shard
+
+
+# `sync` options that configure the syncer itself rather than one job: a
+# running daemon has its own, so syncs setting them are not forwarded
+DAEMON_LOCAL_OPTIONS = ('credentials', 'cache_file', 'images', 'csv_chunk_rows', 'convert_workers', 'transport')
 
 
 @click.group()
 @click.version_option(version=__version__)
-def main():
+@click.option('--verbose', '-v', is_flag=True,
+              help='Also log per-file details (skipped files, existing folders)')
+@click.option('--log-format', type=click.Choice(['text', 'json']), default='text',
+              help='Log format: human-readable text or one JSON object per line (default: text)')
+@click.pass_context
+def main(ctx, verbose, log_format):
     """MD-to-Drive: Sync Markdown and CSV files to Google Drive"""
-    pass
+    ctx.obj = {'log_level': 'debug' if verbose else 'info', 'json_lines': log_format == 'json'}
+    setup_logging(ctx.obj['log_level'], json_lines=ctx.obj['json_lines'])
 
 
 @main.command()
 @click.argument('path', type=click.Path(exists=True))
-@click.option('--credentials', '-c', default='credentials.json',
-              help='Path to Google service account credentials JSON')
+@click.option('--credentials', '-c', multiple=True, default=['credentials.json'],
+              help='Path to Google service account credentials JSON '
+                   '(repeat to spread API quota across several accounts)')
 @click.option('--folder-id', '-f', envvar='GOOGLE_DRIVE_FOLDER_ID',
               help='Google Drive folder ID to sync to')
 @click.option('--recursive/--no-recursive', '-r', default=True,
@@ -29,8 +46,45 @@ def main():
 @click.option('--exclude', '-e', multiple=True,
               help='Patterns to exclude (can be used multiple times)')
 @click.option('--quiet', '-q', is_flag=True,
-              help='Suppress output')
-def sync(path, credentials, folder_id, recursive, exclude, quiet):
+              help='Only log warnings and errors')
+@click.option('--progress/--no-progress', default=True,
+              help='Show a progress bar with throughput and ETA on a terminal (default: on)')
+@click.option('--shard', metavar='I/N',
+              help='Only sync shard I of N (for parallel CI jobs)')
+@click.option('--folders-only', is_flag=True,
+              help='Only create the folder structure (pre-pass for sharded syncs)')
+@click.option('--workers', '-w', default=4, type=int,
+              help='Number of files to sync concurrently (default: 4)')
+@click.option('--csv-chunk-rows', type=click.IntRange(min=1),
+              help='Split CSVs into one sheet per this many rows (default: 200000)')
+@click.option('--images/--no-images', default=True,
+              help='Upload local images referenced from Markdown to a shared _assets folder (default: on)')
+@click.option('--cache-file', default='cache/.sync_cache.json',
+              help='Path to sync cache file')
+@click.option('--convert-workers', type=click.IntRange(min=0),
+              help='Processes converting large Markdown and code files while others upload '
+                   f'(default: {CONVERT_WORKERS}, one per spare core up to 4; 0 converts in the sync threads)')
+@click.option('--transport', type=click.Choice(['urllib3', 'http2', 'httplib2']), default='urllib3',
+              help='HTTP transport: pooled keep-alive connections shared by all workers (urllib3), '
+                   'the same over HTTP/2 (http2, needs httpx) or one connection per thread (httplib2)')
+@click.option('--daemon/--no-daemon', 'use_daemon', default=True,
+              help='Forward to a running `md-to-drive serve` daemon if there is one (default: on)')
+@click.option('--report', type=click.Path(dir_okay=False),
+              help='Write a JSON run report (phase timings, API calls, bytes) to this file')
+@click.option('--trace', is_flag=True,
+              help='Record spans for every phase and API call in the report (and OpenTelemetry if installed)')
+@click.option('--plan-file', type=click.Path(exists=True, dir_okay=False),
+              help='Execute a plan saved by `md-to-drive plan` (no re-scan or re-hash)')
+@click.option('--prune', is_flag=True,
+              help='With --plan-file, move Drive files whose local file was deleted to the trash '
+                   '(without it they are kept, as in a plain sync)')
+@click.option('--profile', type=click.Choice(['cprofile', 'sampling']), is_flag=False, flag_value='cprofile',
+              help='Profile the run (cProfile dump, or sampled stacks for a flame graph) and write it '
+                   'next to the run report')
+@click.pass_context
+def sync(ctx, path, credentials, folder_id, recursive, exclude, quiet, progress, shard, folders_only, workers,
+         csv_chunk_rows, images, cache_file, convert_workers, transport, use_daemon, plan_file, prune, report,
+         trace, profile):
     """
     Sync files or directories to Google Drive
 
@@ -41,18 +95,84 @@ def sync(path, credentials, folder_id, recursive, exclude, quiet):
         md-to-drive sync README.md --folder-id abc123
 
         md-to-drive sync docs/ --exclude "*.draft.md" --exclude "temp/"
+
+        md-to-drive sync docs/ --shard 2/4
+
+        md-to-drive sync docs/ --report reports/sync.json
+
+        md-to-drive sync docs/ --plan-file plan.json --prune
+
+        md-to-drive sync docs/ --report reports/sync.json --profile
+
+        md-to-drive --log-format json sync docs/ --no-progress
     """
+    log_options = ctx.obj or {}
+    progress_bar = setup_logging('warning' if quiet else log_options.get('log_level', 'info'),
+                                 json_lines=log_options.get('json_lines', False),
+                                 progress=progress and not quiet)
+
+    try:
+        shard_spec = parse_shard(shard) if shard else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--shard'")
+
+    if prune and not plan_file:
+        raise click.BadParameter("only applies with --plan-file", param_hint="'--prune'")
+
+    plan = None
+    if plan_file:
+        from .plan import load_plan
+        try:
+            plan = load_plan(plan_file)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--plan-file'")
+        if Path(plan['directory']).resolve() != Path(path).resolve():
+            raise click.BadParameter(f"plan was made for {plan['directory']}, not {path}",
+                                     param_hint="'--plan-file'")
+        if folder_id is None and plan['folder_id'] != 'root':
+            folder_id = plan['folder_id']
+
+    local_options = any(ctx.get_parameter_source(name) != ParameterSource.DEFAULT for name in DAEMON_LOCAL_OPTIONS)
+    if use_daemon and not shard_spec and not folders_only and not plan and not report and not profile \
+            and not local_options:
+        client = DaemonClient.discover(cache_file)
+        if client is not None and client.health().get('folder_id') == folder_id:
+            return _sync_via_daemon(client, path, recursive, exclude, workers, quiet)
+
     if not quiet:
         click.echo(f"🔄 Starting sync from: {path}\n")
 
+    profiler = None
+    if profile:
+        from .profiling import SyncProfiler
+        profiler = SyncProfiler(profile)
+        profiler.start()
+
+    syncer = None
     try:
-        syncer = GoogleDriveSync(credentials_file=credentials, folder_id=folder_id)
+        from .sync import GoogleDriveSync
+        from .metrics import SyncMetrics
+
+        syncer = GoogleDriveSync(credentials_file=list(credentials), folder_id=folder_id, cache_file=cache_file,
+                                 metrics=SyncMetrics(trace=trace), upload_images=images, transport=transport,
+                                 convert_workers=CONVERT_WORKERS if convert_workers is None else convert_workers)
+        if csv_chunk_rows:
+            syncer.csv_chunk_rows = csv_chunk_rows
 
         path_obj = Path(path)
 
-        if path_obj.is_file():
+        if plan is not None:
+            # Execute a saved plan
+            results = list(syncer.apply_plan(plan, workers=workers, progress=progress_bar, prune=prune))
+
+            if not quiet:
+                click.echo("\n✨ Sync complete!")
+                click.echo(f"   Files synced: {sum(1 for result in results if result.drive_id)}")
+
+        elif path_obj.is_file():
             # Sync single file
             file_id = syncer.sync_file(path_obj, folder_id)
+            syncer.finalize()
             if file_id and not quiet:
                 click.echo(f"\n✨ Sync complete! File ID: {file_id}")
 
@@ -61,13 +181,25 @@ def sync(path, credentials, folder_id, recursive, exclude, quiet):
             synced = syncer.sync_directory(
                 path_obj,
                 recursive=recursive,
-                exclude=list(exclude) if exclude else None
+                exclude=list(exclude) if exclude else None,
+                shard=shard_spec,
+                folders_only=folders_only,
+                progress=progress_bar,
+                workers=workers
             )
 
             if not quiet:
-                click.echo(f"\n✨ Sync complete!")
+                click.echo("\n✨ Sync complete!")
                 click.echo(f"   Files synced: {len(synced)}")
 
+        if len(credentials) > 1 and not quiet:
+            click.echo("\n🔑 API usage per account:")
+            for usage in syncer.pool.usage():
+                click.echo(
+                    f"   {usage['account']}: {usage['requests']} requests, "
+                    f"{usage['rate_limited']} rate limited, {usage['errors']} errors"
+                )
+
         return 0
 
     except FileNotFoundError as e:
@@ -79,6 +211,229 @@ def sync(path, credentials, folder_id, recursive, exclude, quiet):
         click.echo(f"❌ Error: {e}", err=True)
         return 1
 
+    finally:
+        if syncer is not None:
+            syncer.conversions.shutdown()
+            if syncer.assets is not None:
+                syncer.assets.shutdown()
+        extra = {}
+        if profiler is not None:
+            profiler.stop()
+            # Profile files sit next to the run report, e.g. reports/sync.pstats
+            base = str(Path(report).with_suffix('')) if report else 'md-to-drive-profile'
+            files = profiler.write(base)
+            extra['profile'] = {'mode': profile, 'files': files, 'sections': profiler.sections()}
+            if not quiet:
+                click.echo(f"🔬 Profile written to {', '.join(files)}")
+
+        if report and syncer is not None:
+            syncer.write_report(report, **extra)
+            if not quiet:
+                click.echo(f"📊 Run report written to {report}")
+
+
+def _sync_via_daemon(client, path, recursive, exclude, workers, quiet):
+    """Forward a sync to a running daemon and wait for the result"""
+    if not quiet:
+        click.echo(f"🛰️  Forwarding sync of {path} to daemon at {client.url}\n")
+
+    try:
+        job = client.wait(client.submit(path, recursive, list(exclude), workers)['id'])
+    except OSError as e:
+        click.echo(f"❌ Error: could not reach daemon: {e}", err=True)
+        return 1
+
+    if job['status'] == 'failed':
+        click.echo(f"❌ Error: {job['error']}", err=True)
+        return 1
+
+    if not quiet:
+        click.echo("✨ Sync complete!")
+        click.echo(f"   Files synced: {job['result']['files_synced']}")
+    return 0
+
+
+@main.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.option('--folder-id', '-f', envvar='GOOGLE_DRIVE_FOLDER_ID',
+              help='Google Drive folder ID the sync would target')
+@click.option('--recursive/--no-recursive', '-r', default=True,
+              help='Recursively plan subdirectories')
+@click.option('--exclude', '-e', multiple=True,
+              help='Patterns to exclude (can be used multiple times)')
+@click.option('--shard', metavar='I/N',
+              help='Only plan shard I of N')
+@click.option('--images/--no-images', default=True,
+              help='Count local images referenced from Markdown (default: on)')
+@click.option('--cache-file', default='cache/.sync_cache.json',
+              help='Path to sync cache file')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='Save the plan to this file (execute it with `sync --plan-file`)')
+@click.pass_context
+def plan(ctx, path, folder_id, recursive, exclude, shard, images, cache_file, output):
+    """
+    Show what a sync would do, without any API call
+
+    Compares the local tree with the sync cache: files to create, update,
+    rename or prune, and the bytes and API calls a sync would take.
+
+    Examples:
+
+        md-to-drive plan docs/
+
+        md-to-drive plan docs/ -o plan.json && md-to-drive sync docs/ --plan-file plan.json
+
+    Planned prunes are only applied with `sync --plan-file --prune`.
+    """
+    from .plan import ACTIONS, build_plan, save_plan
+
+    try:
+        shard_spec = parse_shard(shard) if shard else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--shard'")
+
+    sync_cache = SyncCache(cache_file)
+    sync_cache.load()
+    sync_plan = build_plan(Path(path), sync_cache, folder_id, recursive, list(exclude),
+                           shard_spec, images)
+    summary = sync_plan['summary']
+    verbose = (ctx.obj or {}).get('log_level') == 'debug'
+
+    for item in sync_plan['files']:
+        if item['action'] == 'rename':
+            click.echo(f"  rename  {item['from']} -> {item['path']}")
+        elif item['action'] != 'skip' or verbose:
+            click.echo(f"  {item['action']:<6}  {item['path']}")
+
+    click.echo("\n📋 Plan: " + ', '.join(f"{summary[action]} to {action}" for action in ACTIONS))
+    click.echo(f"   Folders: {summary['folders']} ({summary['new_folders']} new)")
+    if summary['images']:
+        click.echo(f"   New images: {summary['images']}")
+    click.echo(f"   Upload: {summary['bytes'] / (1024 * 1024):.1f} MB in ~{summary['api_calls']} API calls")
+
+    if output:
+        save_plan(sync_plan, output)
+        click.echo(f"💾 Plan written to {output}")
+    return 0
+
+
+@main.command()
+@click.option('--credentials', '-c', multiple=True, default=['credentials.json'],
+              help='Path to Google service account credentials JSON '
+                   '(repeat to spread API quota across several accounts)')
+@click.option('--folder-id', '-f', envvar='GOOGLE_DRIVE_FOLDER_ID',
+              help='Google Drive folder ID to sync to')
+@click.option('--cache-file', default='cache/.sync_cache.json',
+              help='Path to sync cache file')
+@click.option('--host', default='127.0.0.1',
+              help='Interface to listen on (default: 127.0.0.1)')
+@click.option('--port', '-p', default=0, type=int,
+              help='Port to listen on (default: any free port)')
+@click.option('--workers', '-w', default=4, type=int,
+              help='Number of sync jobs to run concurrently (default: 4)')
+@click.option('--convert-workers', type=click.IntRange(min=0),
+              help='Processes converting large Markdown and code files while others upload '
+                   f'(default: {CONVERT_WORKERS}, one per spare core up to 4; 0 converts in the sync threads)')
+@click.option('--transport', type=click.Choice(['urllib3', 'http2', 'httplib2']), default='urllib3',
+              help='HTTP transport: pooled keep-alive connections shared by all workers (urllib3), '
+                   'the same over HTTP/2 (http2, needs httpx) or one connection per thread (httplib2)')
+def serve(credentials, folder_id, cache_file, host, port, workers, convert_workers, transport):
+    """
+    Run a sync daemon that keeps auth and cache warm
+
+    `md-to-drive sync` forwards to the daemon automatically while it runs
+    (use --no-daemon to sync in-process). Queued jobs for the same path are
+    coalesced.
+
+    Examples:
+
+        md-to-drive serve --folder-id abc123 &
+
+        md-to-drive sync docs/
+    """
+    try:
+        from .sync import GoogleDriveSync
+
+        syncer = GoogleDriveSync(credentials_file=list(credentials), folder_id=folder_id, cache_file=cache_file,
+                                 transport=transport,
+                                 convert_workers=CONVERT_WORKERS if convert_workers is None else convert_workers)
+    except FileNotFoundError as e:
+        click.echo(f"❌ Error: {e}", err=True)
+        click.echo("\nRun 'md-to-drive setup' for configuration help", err=True)
+        return 1
+
+    daemon_serve(syncer, host=host, port=port, workers=workers)
+    return 0
+
+
+@main.group()
+def cache():
+    """Manage the sync cache"""
+    pass
+
+
+@cache.command('merge')
+@click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', '-o', default='cache/.sync_cache.json',
+              help='Cache file to merge into (created if missing)')
+def cache_merge(inputs, output):
+    """
+    Merge per-shard cache files into one
+
+    Entries already in the output file are kept unless an input has a
+    more recent sync of the same file.
+
+    Examples:
+
+        md-to-drive cache merge shard-*/.sync_cache.json
+    """
+    merged = SyncCache(output)
+    merged.load()
+
+    for input_file in inputs:
+        shard_cache = SyncCache(input_file)
+        changed = merged.merge(shard_cache.load())
+        merged.merge_assets(shard_cache.assets)
+        merged.merge_folders(shard_cache.folders)
+        click.echo(f"🔀 Merged {input_file}: {changed} entries updated")
+
+    merged.save()
+    return 0
+
+
+@cache.command('export')
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--cache-file', default='cache/.sync_cache.json',
+              help='Path to sync cache file')
+def cache_export(output, cache_file):
+    """
+    Export the sync cache (e.g. to upload as a CI artifact)
+
+    Cache keys are relative to the sync root and target folder, so the
+    export can be restored on any machine or checkout path.
+    """
+    sync_cache = SyncCache(cache_file)
+    sync_cache.load()
+    sync_cache.export_to(output)
+    click.echo(f"📦 Exported {len(sync_cache.cache)} entries to {output}")
+    return 0
+
+
+@cache.command('import')
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--cache-file', default='cache/.sync_cache.json',
+              help='Path to sync cache file')
+def cache_import(input_file, cache_file):
+    """
+    Import an exported sync cache into the local cache
+    """
+    sync_cache = SyncCache(cache_file)
+    sync_cache.load()
+    changed = sync_cache.import_from(input_file)
+    click.echo(f"📦 Imported {input_file}: {changed} entries updated")
+    sync_cache.save()
+    return 0
+
 
 @main.command()
 @click.option('--credentials', '-c', default='credentials.json',
@@ -92,6 +447,8 @@ def test(credentials):
     click.echo("🔍 Testing Google Drive connection...\n")
 
     try:
+        from .sync import GoogleDriveSync
+
         syncer = GoogleDriveSync(credentials_file=credentials)
         syncer.auth.test_connection()
 
@@ -0,0 +1,138 @@
+"""
+Process-pool conversion stage for MD-to-Drive
+Converting large Markdown and code files (code block formatting, image
+link rewriting, splitting into sections) is CPU-bound; running it in worker
+processes spreads it over every core and keeps it from holding the GIL
+while other threads upload. Workers are spawned, so scripts that sync with
+conversion processes need an `if __name__ == '__main__':` guard
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Optional
+
+from .converter import MarkdownConverter
+from . import docs
+
+logger = logging.getLogger(__name__)
+
+
+# Worker processes the command line converts with by default (the library
+# converts in the calling thread unless asked): one per spare core, leaving
+# a core to the upload threads
+CONVERT_WORKERS = min(4, (os.cpu_count() or 1) - 1)
+
+# Smaller files are converted in the calling thread: shipping them to a
+# worker process costs more than converting them
+PROCESS_MIN_BYTES = 64 * 1024
+
+
+def convert_file(converter, path: Path, image_urls: Optional[Dict[Path, str]] = None,
+                 sections: bool = True) -> dict:
+    """
+    Convert a file for upload (runs in worker processes)
+
+    Args:
+        converter: Converter class for the file (see FileTypeDetector.register)
+        path: File to convert
+        image_urls: Optional local image path -> URL of its uploaded copy (Markdown only)
+        sections: Also split the converted Markdown into sections
+
+    Returns:
+        Upload metadata from the converter, with `sections` (list of docs.Section) if requested
+    """
+    path = Path(path)
+    if image_urls and issubclass(converter, MarkdownConverter):
+        metadata = converter.prepare_for_upload(path, image_urls=image_urls)
+    else:
+        metadata = converter.prepare_for_upload(path)
+
+    if sections:
+        try:
+            with open(metadata.get('temp_file') or path, 'r', encoding='utf-8') as f:
+                metadata['sections'] = docs.split_sections(f.read())
+        except BaseException:
+            if metadata.get('temp_file') and os.path.exists(metadata['temp_file']):
+                os.unlink(metadata['temp_file'])
+            raise
+    return metadata
+
+
+class ConversionPool:
+    """Convert large files in worker processes and small ones in the calling thread"""
+
+    def __init__(self, workers: int = 0, min_bytes: int = PROCESS_MIN_BYTES):
+        """
+        Initialize conversion pool (processes are started on first use)
+
+        Args:
+            workers: Number of worker processes (0 converts everything in the calling thread)
+            min_bytes: Files at least this large are converted in a worker process
+        """
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, converter, path: Path, image_urls: Optional[Dict[Path, str]] = None,
+               sections: bool = True) -> Future:
+        """
+        Start converting a file (see convert_file)
+
+        Args:
+            converter: Converter class for the file
+            path: File to convert
+            image_urls: Optional local image path -> URL of its uploaded copy
+            sections: Also split the converted Markdown into sections
+
+        Returns:
+            Future resolving to the upload metadata
+        """
+        if self.workers > 0 and os.path.getsize(path) >= self.min_bytes:
+            try:
+                return self._processes().submit(convert_file, converter, path, image_urls, sections)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory): start a fresh pool next time
+                self.shutdown(wait=False)
+
+        future = Future()
+        try:
+            future.set_result(convert_file(converter, path, image_urls, sections))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def convert(self, converter, path: Path, image_urls: Optional[Dict[Path, str]] = None,
+                sections: bool = True) -> dict:
+        """
+        Convert a file and wait for the result (see submit)
+
+        Returns:
+            Upload metadata from the converter
+        """
+        try:
+            return self.submit(converter, path, image_urls, sections).result()
+        except BrokenProcessPool as e:
+            logger.warning("⚠️  Conversion process failed, converting %s in this thread: %s", path, e)
+            self.shutdown(wait=False)
+            return convert_file(converter, path, image_urls, sections)
+
+    def _processes(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the parent runs upload and folder threads
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes (a later conversion starts new ones)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -2,10 +2,28 @@
 File conversion utilities for Markdown and CSV
 """
 
+import csv
+import hashlib
+import itertools
+import logging
+import os
 import re
 import tempfile
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+# Packages can ship converters under this entry point group, named after the
+# suffix they handle, e.g. `rst = my_package.converters:RstConverter`
+ENTRY_POINT_GROUP = 'md_to_drive.converters'
+
+# ![alt](target "title") - the target may be wrapped in <>
+IMAGE_PATTERN = re.compile(r'(!\[[^\]]*\]\(\s*<?)([^)\s>]+)(>?(?:\s+"[^"]*")?\s*\))')
+FENCED_CODE_PATTERN = re.compile(r'(```.*?```)', re.DOTALL)
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.bmp'}
 
 
 class MarkdownConverter:
@@ -56,24 +74,84 @@ class MarkdownConverter:
         return md_content
 
     @staticmethod
-    def prepare_for_upload(md_file: Path, format_code: bool = True) -> dict:
+    def _local_image_path(target: str, base_dir: Path) -> Optional[Path]:
+        """Resolve an image link target to a local image file, or None"""
+        # Skip URLs (http:, data:, ...), anchors and site-absolute paths
+        if re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*:', target) or target.startswith(('#', '/')):
+            return None
+        path = (base_dir / unquote(target.split('#')[0].split('?')[0])).resolve()
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file():
+            return path
+        return None
+
+    @staticmethod
+    def find_local_images(md_content: str, base_dir: Path) -> List[Path]:
+        """
+        Find local image files referenced with ![alt](path) outside code blocks
+
+        Args:
+            md_content: Markdown content
+            base_dir: Directory relative links are resolved against
+
+        Returns:
+            Resolved paths of existing local images, without duplicates
+        """
+        images = []
+        for segment in FENCED_CODE_PATTERN.split(md_content)[::2]:
+            for match in IMAGE_PATTERN.finditer(segment):
+                path = MarkdownConverter._local_image_path(match.group(2), base_dir)
+                if path and path not in images:
+                    images.append(path)
+        return images
+
+    @staticmethod
+    def rewrite_image_links(md_content: str, base_dir: Path, image_urls: Dict[Path, str]) -> str:
+        """
+        Point local image links at their uploaded copies
+
+        Args:
+            md_content: Markdown content
+            base_dir: Directory relative links are resolved against
+            image_urls: Resolved local image path -> URL
+
+        Returns:
+            Markdown content with rewritten image links
+        """
+        def replace_image(match):
+            url = image_urls.get(MarkdownConverter._local_image_path(match.group(2), base_dir))
+            return f"{match.group(1)}{url}{match.group(3)}" if url else match.group(0)
+
+        segments = FENCED_CODE_PATTERN.split(md_content)
+        for i in range(0, len(segments), 2):
+            segments[i] = IMAGE_PATTERN.sub(replace_image, segments[i])
+        return ''.join(segments)
+
+    @staticmethod
+    def prepare_for_upload(md_file: Path, format_code: bool = True,
+                           image_urls: Optional[Dict[Path, str]] = None) -> dict:
         """
         Prepare markdown file for upload with optional code formatting
 
         Args:
             md_file: Path to markdown file
             format_code: Whether to apply code formatting (default: True)
+            image_urls: Optional local image path -> URL of its uploaded copy
 
         Returns:
             Dictionary with file metadata and preprocessed content path
         """
-        if format_code:
+        if format_code or image_urls:
             # Read and preprocess markdown
             with open(md_file, 'r', encoding='utf-8') as f:
                 md_content = f.read()
 
+            if image_urls:
+                md_content = MarkdownConverter.rewrite_image_links(md_content, Path(md_file).parent, image_urls)
+
             # Preprocess to make code blocks readable
-            processed_content = MarkdownConverter.preprocess_markdown_for_google_docs(md_content)
+            processed_content = md_content
+            if format_code:
+                processed_content = MarkdownConverter.preprocess_markdown_for_google_docs(md_content)
 
             # Create temporary file with processed content
             temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False, encoding='utf-8')
@@ -119,12 +197,102 @@ class CSVConverter:
             'description': f'Converted from {csv_file.name}'
         }
 
+    @staticmethod
+    def _rows_per_chunk(header: List[str], max_rows: int, max_cells: int) -> int:
+        """Data rows that fit in one chunk (see iter_chunks)"""
+        return max(1, min(max_rows, max_cells // max(len(header), 1) - 1))
+
+    @staticmethod
+    def needs_chunking(csv_file: Path, max_rows: int, max_cells: int) -> bool:
+        """
+        Check whether a CSV holds more than one chunk (see iter_chunks)
+
+        Rows are counted, not bytes: the reader stops as soon as the first
+        chunk overflows.
+
+        Args:
+            csv_file: Path to CSV file
+            max_rows: Maximum data rows per chunk
+            max_cells: Maximum cells per chunk (including the header)
+
+        Returns:
+            True if the CSV has more data rows than fit in one chunk
+        """
+        with open(csv_file, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return False
+            rows_per_chunk = CSVConverter._rows_per_chunk(header, max_rows, max_cells)
+            return next(itertools.islice(reader, rows_per_chunk, None), None) is not None
+
+    @staticmethod
+    def iter_chunks(csv_file: Path, max_rows: int, max_cells: int, directory: str) -> Iterator[dict]:
+        """
+        Split a CSV into chunk files, streaming it in bounded memory
+
+        Every chunk repeats the header row and holds at most `max_rows` data
+        rows and `max_cells` cells. Each chunk file is written to `directory`
+        before it is yielded; the caller may delete it once it is uploaded.
+
+        Args:
+            csv_file: Path to CSV file
+            max_rows: Maximum data rows per chunk
+            max_cells: Maximum cells per chunk (including the header)
+            directory: Directory to write chunk files to
+
+        Yields:
+            Dictionaries with path, rows (data rows), hash (MD5 of the chunk) and bytes
+        """
+        with open(csv_file, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            rows_per_chunk = CSVConverter._rows_per_chunk(header, max_rows, max_cells)
+
+            for index in itertools.count():
+                path = os.path.join(directory, f"chunk{index}.csv")
+                with open(path, 'w', newline='', encoding='utf-8') as out:
+                    hashing = _HashingWriter(out)
+                    writer = csv.writer(hashing, lineterminator='\n')
+                    writer.writerow(header)
+                    rows = 0
+                    for row in itertools.islice(reader, rows_per_chunk):
+                        writer.writerow(row)
+                        rows += 1
+
+                if rows == 0 and index > 0:
+                    os.unlink(path)
+                    return
+                yield {'path': path, 'rows': rows, 'hash': hashing.hexdigest(), 'bytes': hashing.bytes}
+                if rows < rows_per_chunk:
+                    return
+
     @staticmethod
     def get_conversion_mimetype() -> str:
         """Get Google Sheets MIME type for conversion"""
         return 'application/vnd.google-apps.spreadsheet'
 
 
+class _HashingWriter:
+    """File wrapper that hashes everything written through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.md5 = hashlib.md5()
+        self.bytes = 0
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self.md5.update(data)
+        self.bytes += len(data)
+        return self.f.write(text)
+
+    def hexdigest(self) -> str:
+        return self.md5.hexdigest()
+
+
 class FileTypeDetector:
     """Detect file types and choose appropriate converter"""
 
@@ -144,6 +312,47 @@ class FileTypeDetector:
         '.yaml': MarkdownConverter,
     }
 
+    _plugins_loaded = False
+    _plugins_lock = threading.Lock()
+
+    @classmethod
+    def register(cls, suffixes: Union[str, Iterable[str]], converter):
+        """
+        Register a converter for one or more file suffixes
+
+        A converter is a class with a `prepare_for_upload(path)` static method
+        returning upload metadata (name, mimeType of the uploaded content,
+        description, and optionally `temp_file` holding the converted content)
+        and a `get_conversion_mimetype()` static method returning the Google
+        type it converts to (a Doc or a Sheet; Sheets are imported as CSV).
+        Conversions may run in worker processes, so the class must be
+        importable from its module.
+
+        Args:
+            suffixes: Suffix such as '.rst' (the dot is optional), or several
+            converter: Converter class (replaces any converter for the suffix)
+        """
+        if isinstance(suffixes, str):
+            suffixes = [suffixes]
+        for suffix in suffixes:
+            suffix = suffix.lower()
+            cls.CONVERTERS[suffix if suffix.startswith('.') else f'.{suffix}'] = converter
+
+    @classmethod
+    def load_plugins(cls):
+        """Register converters installed under the `md_to_drive.converters` entry point group (once)"""
+        if cls._plugins_loaded:
+            return
+        with cls._plugins_lock:
+            if cls._plugins_loaded:
+                return
+            for entry_point in _entry_points(ENTRY_POINT_GROUP):
+                try:
+                    cls.register(entry_point.name, entry_point.load())
+                except Exception as e:
+                    logger.warning("⚠️  Could not load converter %s: %s", entry_point.value, e)
+            cls._plugins_loaded = True
+
     @classmethod
     def get_converter(cls, file_path: Path):
         """
@@ -158,6 +367,7 @@ class FileTypeDetector:
         Raises:
             ValueError: If file type is not supported
         """
+        cls.load_plugins()
         suffix = file_path.suffix.lower()
         converter = cls.CONVERTERS.get(suffix)
 
@@ -168,3 +378,25 @@ class FileTypeDetector:
             )
 
         return converter
+
+
+def register_converter(suffixes: Union[str, Iterable[str]], converter):
+    """
+    Register a converter for one or more file suffixes (see FileTypeDetector.register)
+
+    Args:
+        suffixes: Suffix such as '.rst' (the dot is optional), or several
+        converter: Converter class
+    """
+    FileTypeDetector.register(suffixes, converter)
+
+
+def _entry_points(group: str):
+    """Installed entry points of a group"""
+    from importlib import metadata
+
+    try:
+        return metadata.entry_points(group=group)
+    except TypeError:
+        # Python < 3.10
+        return metadata.entry_points().get(group, [])
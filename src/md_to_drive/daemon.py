@@ -0,0 +1,445 @@
+"""
+Long-running sync daemon for MD-to-Drive
+Keeps one authenticated GoogleDriveSync warm and runs sync jobs submitted
+over a local HTTP API, so repeated syncs skip auth, cache load and setup
+"""
+
+import os
+import json
+import logging
+import secrets
+import threading
+import urllib.request
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE_NAME = '.daemon.json'
+
+
+def state_file_for(cache_file: str) -> str:
+    """
+    Get the daemon state file used with a given sync cache
+
+    Args:
+        cache_file: Path to sync cache file
+
+    Returns:
+        Path to the daemon state file (stored next to the cache)
+    """
+    return os.path.join(os.path.dirname(cache_file), STATE_FILE_NAME)
+
+
+class SyncJob:
+    """A queued sync of one file or directory"""
+
+    def __init__(self, job_id: str, path: Path, recursive: bool, exclude: List[str], workers: int = 1):
+        self.id = job_id
+        self.path = path
+        self.recursive = recursive
+        self.exclude = exclude
+        self.workers = workers
+        self.status = 'queued'
+        self.submissions = 1
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created = datetime.now().isoformat()
+
+    @property
+    def key(self):
+        """Jobs with the same key do the same work and can be coalesced"""
+        return (str(self.path), self.recursive, tuple(sorted(self.exclude)))
+
+    def covers(self, path: Path, recursive: bool, exclude: List[str]) -> bool:
+        """
+        Check whether this job does exactly the work a new request would
+
+        Only identical requests are coalesced: a directory sync places files
+        relative to that directory, so a file below it synced on its own
+        lands somewhere else on Drive.
+        """
+        return self.key == (str(path), recursive, tuple(sorted(exclude)))
+
+    def overlaps(self, other: 'SyncJob') -> bool:
+        """Check whether two jobs may touch the same files"""
+        return (self.path == other.path or self.path in other.path.parents
+                or other.path in self.path.parents)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'path': str(self.path),
+            'recursive': self.recursive,
+            'exclude': self.exclude,
+            'workers': self.workers,
+            'status': self.status,
+            'submissions': self.submissions,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+        }
+
+
+class SyncDaemon:
+    """Job queue and worker pool around a shared GoogleDriveSync"""
+
+    # Finished jobs kept around so clients can fetch their results
+    MAX_FINISHED_JOBS = 1000
+
+    def __init__(self, syncer, workers: int = 4):
+        """
+        Initialize sync daemon
+
+        Args:
+            syncer: Authenticated GoogleDriveSync instance shared by all workers
+            workers: Number of jobs processed concurrently
+        """
+        self.syncer = syncer
+        self.workers = workers
+        self.jobs: Dict[str, SyncJob] = {}
+        self._pending: deque = deque()
+        self._running: List[SyncJob] = []
+        self._finished: deque = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, path: str, recursive: bool = True, exclude: Optional[List[str]] = None,
+               workers: int = 1) -> SyncJob:
+        """
+        Queue a sync job, coalescing it with an equivalent pending job
+
+        Args:
+            path: File or directory to sync
+            recursive: Include subdirectories
+            exclude: List of patterns to exclude
+            workers: Number of files the job syncs concurrently
+
+        Returns:
+            The queued job (possibly an existing one)
+        """
+        path = Path(path).resolve()
+        exclude = list(exclude or [])
+
+        with self._condition:
+            for job in self._pending:
+                if job.covers(path, recursive, exclude):
+                    job.submissions += 1
+                    job.workers = max(job.workers, workers)
+                    return job
+
+            job = SyncJob(secrets.token_hex(8), path, recursive, exclude, workers)
+            self.jobs[job.id] = job
+            self._pending.append(job)
+            self._condition.notify_all()
+            return job
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[SyncJob]:
+        """
+        Wait for a job to finish
+
+        Args:
+            job_id: Job ID
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            The job, or None if the ID is unknown
+        """
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                self._condition.wait_for(lambda: job.status in ('done', 'failed'), timeout)
+            return job
+
+    def _next_job(self) -> Optional[SyncJob]:
+        """Take the oldest pending job that doesn't overlap a running one"""
+        for job in self._pending:
+            if not any(job.overlaps(running) for running in self._running):
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._condition.wait()
+                    job = self._next_job()
+                if self._stopping:
+                    if job is not None:
+                        self._pending.appendleft(job)
+                    return
+                job.status = 'running'
+                self._running.append(job)
+
+            try:
+                job.result = self._run(job)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+                logger.error("❌ Job %s failed: %s", job.id, e)
+
+            with self._condition:
+                self._running.remove(job)
+                self._finished.append(job)
+                while len(self._finished) > self.MAX_FINISHED_JOBS:
+                    self.jobs.pop(self._finished.popleft().id, None)
+                self._condition.notify_all()
+
+    def _run(self, job: SyncJob) -> dict:
+        """Run one job on the shared syncer"""
+        logger.info("🔄 Job %s: syncing %s", job.id, job.path, extra={'event': 'job_started', 'job_id': job.id})
+
+        if job.path.is_file():
+            file_id = self.syncer.sync_file(job.path)
+            # Other jobs may be converting: keep the processes for them
+            self.syncer.finalize(shutdown=False)
+            return {'files_synced': 1 if file_id else 0, 'file_id': file_id}
+
+        if job.path.is_dir():
+            synced = self.syncer.sync_directory(job.path, recursive=job.recursive, exclude=job.exclude or None,
+                                                workers=job.workers)
+            return {'files_synced': len(synced)}
+
+        raise FileNotFoundError(f"Path not found: {job.path}")
+
+    def start(self):
+        """Start the worker threads"""
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the workers after their current job and save the cache"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self.syncer.finalize()
+
+    def status(self) -> dict:
+        with self._condition:
+            return {
+                'status': 'ok',
+                'pid': os.getpid(),
+                'folder_id': self.syncer.folder_id,
+                'cache_file': os.path.abspath(self.syncer.cache.cache_file) if self.syncer.cache else None,
+                'queued': len(self._pending),
+                'running': len(self._running),
+            }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """HTTP API: POST /jobs, GET /jobs/<id>[?wait=seconds], GET /health"""
+
+    daemon: SyncDaemon = None
+    token: str = None
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorized(self) -> bool:
+        expected = f"Bearer {self.token}"
+        if secrets.compare_digest(self.headers.get('Authorization', ''), expected):
+            return True
+        self._send(401, {'error': 'unauthorized'})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+
+        if url.path == '/health':
+            self._send(200, self.daemon.status())
+        elif url.path.startswith('/jobs/'):
+            wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+            job = self.daemon.wait(url.path[len('/jobs/'):], timeout=wait)
+            if job is None:
+                self._send(404, {'error': 'unknown job'})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+
+        if urlparse(self.path).path != '/jobs':
+            self._send(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            workers = int(request.get('workers', 1))
+            if workers < 1:
+                raise ValueError("workers must be at least 1")
+            job = self.daemon.submit(request['path'], request.get('recursive', True), request.get('exclude'),
+                                     workers)
+        except (KeyError, TypeError, ValueError) as e:
+            self._send(400, {'error': f"invalid job: {e}"})
+            return
+
+        self._send(202, job.to_dict())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(syncer, host: str = '127.0.0.1', port: int = 0, workers: int = 4):
+    """
+    Run the sync daemon until interrupted
+
+    Writes a state file next to the sync cache with the daemon's address and
+    an access token, which DaemonClient uses to find and authenticate to it.
+
+    Args:
+        syncer: Authenticated GoogleDriveSync instance
+        host: Interface to listen on (keep local: jobs read local files)
+        port: Port to listen on (0 picks a free port)
+        workers: Number of jobs processed concurrently
+    """
+    daemon = SyncDaemon(syncer, workers)
+    handler = type('RequestHandler', (_RequestHandler,), {
+        'daemon': daemon,
+        'token': secrets.token_urlsafe(32),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    state_file = state_file_for(syncer.cache.cache_file if syncer.cache else 'cache/.sync_cache.json')
+    state_dir = os.path.dirname(state_file)
+    if state_dir:
+        os.makedirs(state_dir, exist_ok=True)
+    # The token grants access to the daemon: keep the file private to the user
+    fd = os.open(state_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({
+            'url': f"http://{server.server_address[0]}:{server.server_address[1]}",
+            'token': handler.token,
+            'pid': os.getpid(),
+        }, f)
+
+    daemon.start()
+    logger.info("🛰️  Sync daemon listening on %s:%s (%d workers)",
+                server.server_address[0], server.server_address[1], workers)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🛑 Shutting down sync daemon")
+    finally:
+        server.server_close()
+        daemon.stop()
+        if os.path.exists(state_file):
+            os.unlink(state_file)
+
+
+class DaemonClient:
+    """Forward sync jobs to a running daemon"""
+
+    def __init__(self, url: str, token: str, timeout: float = 5.0):
+        """
+        Initialize daemon client
+
+        Args:
+            url: Daemon base URL
+            token: Access token from the daemon's state file
+            timeout: Timeout in seconds for connecting and short requests
+        """
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def discover(cls, cache_file: str = 'cache/.sync_cache.json') -> Optional['DaemonClient']:
+        """
+        Find a running daemon that uses the given cache file
+
+        Args:
+            cache_file: Path to sync cache file
+
+        Returns:
+            DaemonClient, or None if no daemon is running
+        """
+        try:
+            with open(state_file_for(cache_file), 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        client = cls(state['url'], state['token'], timeout=1.0)
+        try:
+            client.health()
+        except (OSError, ValueError):
+            return None
+        return client
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(
+            f"{self.url}{path}",
+            data=data,
+            method=method,
+            headers={'Authorization': f"Bearer {self.token}", 'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+            return json.loads(response.read())
+
+    def health(self) -> dict:
+        """Get daemon status"""
+        return self._request('GET', '/health')
+
+    def submit(self, path: str, recursive: bool = True, exclude: Optional[List[str]] = None,
+               workers: int = 1) -> dict:
+        """
+        Submit a sync job
+
+        Args:
+            path: File or directory to sync (sent as an absolute path)
+            recursive: Include subdirectories
+            exclude: List of patterns to exclude
+            workers: Number of files the job syncs concurrently
+
+        Returns:
+            Job description
+        """
+        return self._request('POST', '/jobs', {
+            'path': str(Path(path).resolve()),
+            'recursive': recursive,
+            'exclude': list(exclude or []),
+            'workers': workers,
+        })
+
+    def wait(self, job_id: str, poll_interval: float = 30.0) -> dict:
+        """
+        Wait for a job to finish
+
+        Args:
+            job_id: Job ID
+            poll_interval: Seconds each long-poll request waits on the daemon
+
+        Returns:
+            Final job description
+        """
+        while True:
+            job = self._request('GET', f"/jobs/{job_id}?wait={poll_interval}", timeout=poll_interval + self.timeout)
+            if job['status'] in ('done', 'failed'):
+                return job
@@ -0,0 +1,297 @@
+"""
+Section-level Google Docs updates for MD-to-Drive
+Split Markdown into sections by heading, track a hash per section and
+rewrite only the changed sections with the Docs API instead of replacing
+the whole document (which is slow and drops comments anchored in it)
+"""
+
+import hashlib
+import re
+from typing import Callable, List, Optional, Tuple
+
+
+# More changed sections than this share of the document: re-upload it instead
+MAX_CHANGED_FRACTION = 0.5
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+FENCE_PATTERN = re.compile(r'^(```|~~~)')
+LIST_ITEM_PATTERN = re.compile(r'^(?:([-*+])|(\d+)[.)])[ \t]+(.*)$')
+
+# Markdown the incremental renderer doesn't reproduce like Drive's importer
+# (code, tables, quotes, HTML, images, rules, nested lists, hard breaks...):
+# a changed section containing any of these is re-uploaded with the document
+UNSUPPORTED_PATTERN = re.compile(
+    r'^(?:[ \t]+\S|>|\||<|```|~~~|\[[^\]]+\]:|(?:[-*_][ \t]*){3,}$|=+[ \t]*$)'
+    r'|═══|!\[|<[a-zA-Z/]|`|[ \t]{2}$|\\$'
+)
+
+INLINE_PATTERN = re.compile(
+    r'\\(?P<escaped>[^\w\s])'
+    r'|\*\*(?P<bold>.+?)\*\*|__(?P<bold2>.+?)__'
+    r'|~~(?P<strike>.+?)~~'
+    r'|\*(?P<italic>[^*\s](?:.*?[^*\s])?)\*|(?<!\w)_(?P<italic2>[^_\s](?:.*?[^_\s])?)_(?!\w)'
+    r'|\[(?P<link>[^\]]+)\]\((?P<url>[^)\s]+)(?:[ \t]+"[^"]*")?\)'
+)
+
+BULLET_PRESETS = {
+    'bullet': 'BULLET_DISC_CIRCLE_SQUARE',
+    'number': 'NUMBERED_DECIMAL_ALPHA_ROMAN',
+}
+
+
+class Section:
+    """A heading and the Markdown up to the next heading"""
+
+    def __init__(self, level: int, title: str, body: str):
+        """
+        Initialize section
+
+        Args:
+            level: Heading level (0 for the text before the first heading)
+            title: Heading text as the document shows it
+            body: Markdown below the heading
+        """
+        self.level = level
+        self.title = title
+        self.body = body
+        self.hash = hashlib.md5(body.encode('utf-8')).hexdigest()
+
+    @property
+    def outline(self) -> str:
+        return f"{self.level} {self.title}"
+
+
+def split_sections(md_content: str) -> List[Section]:
+    """
+    Split Markdown into sections at ATX headings (outside code blocks)
+
+    Args:
+        md_content: Markdown content (as uploaded, i.e. after preprocessing)
+
+    Returns:
+        Sections in document order; the first one holds the text before the
+        first heading and has level 0
+    """
+    sections = []
+    level, title, body = 0, '', []
+    fence = None
+    for line in md_content.split('\n'):
+        marker = FENCE_PATTERN.match(line)
+        if marker and fence is None:
+            fence = marker.group(1)
+        elif marker and line.startswith(fence):
+            fence = None
+        heading = HEADING_PATTERN.match(line) if fence is None else None
+        if heading:
+            sections.append(Section(level, title, '\n'.join(body)))
+            level, title, body = len(heading.group(1)), render_inline(heading.group(2))[0].strip(), []
+        else:
+            body.append(line)
+    sections.append(Section(level, title, '\n'.join(body)))
+    return sections
+
+
+def utf16_len(text: str) -> int:
+    """Length of text in UTF-16 code units (the unit of Docs indexes)"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def render_inline(text: str) -> Tuple[str, List[Tuple[int, int, dict]]]:
+    """
+    Render inline Markdown (emphasis, strikethrough, links, escapes)
+
+    Args:
+        text: One paragraph of Markdown
+
+    Returns:
+        Tuple of (plain text, [(start, end, Docs textStyle)]) with offsets in
+        UTF-16 code units
+    """
+    plain = []
+    styles = []
+    offset = 0
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        plain.append(text[position:match.start()])
+        offset += utf16_len(text[position:match.start()])
+        position = match.end()
+        if match.group('escaped'):
+            plain.append(match.group('escaped'))
+            offset += 1
+            continue
+
+        kind = next(name for name in ('bold', 'bold2', 'strike', 'italic', 'italic2', 'link')
+                    if match.group(name) is not None)
+        inner, inner_styles = render_inline(match.group(kind))
+        style = {
+            'bold': {'bold': True},
+            'bold2': {'bold': True},
+            'strike': {'strikethrough': True},
+            'italic': {'italic': True},
+            'italic2': {'italic': True},
+            'link': {'link': {'url': match.group('url')}},
+        }[kind]
+        length = utf16_len(inner)
+        styles.append((offset, offset + length, style))
+        styles.extend((offset + start, offset + end, s) for start, end, s in inner_styles)
+        plain.append(inner)
+        offset += length
+    plain.append(text[position:])
+    return ''.join(plain), styles
+
+
+def render_body(body: str) -> Optional[List[Tuple[str, List[Tuple[int, int, dict]], Optional[str]]]]:
+    """
+    Render a section body into Docs paragraphs
+
+    Args:
+        body: Markdown below a heading
+
+    Returns:
+        List of (text, text styles, list kind: None, 'bullet' or 'number'),
+        or None if the body uses Markdown the renderer doesn't support
+    """
+    paragraphs = []
+    lines: List[str] = []
+    kind = None
+
+    def flush():
+        if lines:
+            text, styles = render_inline(' '.join(lines))
+            paragraphs.append((text, styles, kind))
+            lines.clear()
+
+    for line in body.split('\n'):
+        if UNSUPPORTED_PATTERN.search(line):
+            return None
+        if not line.strip():
+            flush()
+            kind = None
+            continue
+        item = LIST_ITEM_PATTERN.match(line)
+        if item:
+            flush()
+            kind = 'bullet' if item.group(1) else 'number'
+            lines.append(item.group(3).strip())
+        else:
+            lines.append(line.strip())
+    flush()
+    return paragraphs
+
+
+def changed_sections(entry: dict, sections: List[Section]) -> Optional[List[int]]:
+    """
+    Find the sections to rewrite in place
+
+    Args:
+        entry: The document's cache entry (with `outline` and `sections` of the synced version)
+        sections: Sections of the current Markdown
+
+    Returns:
+        Indexes of changed sections, or None if the document should be
+        re-uploaded (headings changed, too much changed, or a changed section
+        can't be rendered)
+    """
+    if entry.get('outline') != [section.outline for section in sections]:
+        return None
+    changed = [i for i, section in enumerate(sections) if entry['sections'][i] != section.hash]
+    if len(changed) > 1 and len(changed) > MAX_CHANGED_FRACTION * len(sections):
+        return None
+    if any(render_body(sections[i].body) is None for i in changed):
+        return None
+    return changed
+
+
+def _section_requests(paragraphs, start: int, end: int, last: bool) -> List[dict]:
+    """Build the requests replacing the content between `start` and `end` with paragraphs"""
+    text = '\n'.join(paragraph[0] for paragraph in paragraphs)
+    requests = []
+    if end > start:
+        # Keep the region's last newline (the document's final one can't be deleted)
+        if not text and not last:
+            return [{'deleteContentRange': {'range': {'startIndex': start, 'endIndex': end}}}]
+        if end - 1 > start:
+            requests.append({'deleteContentRange': {'range': {'startIndex': start, 'endIndex': end - 1}}})
+        if text:
+            requests.append({'insertText': {'location': {'index': start}, 'text': text}})
+    elif text:
+        if last:
+            # Nothing follows the heading: split its paragraph instead of inserting past the end
+            requests.append({'insertText': {'location': {'index': start - 1}, 'text': '\n' + text}})
+        else:
+            requests.append({'insertText': {'location': {'index': start}, 'text': text + '\n'}})
+    if not text:
+        return requests
+
+    # Inserted text inherits the surrounding style: reset it, then apply the Markdown's
+    length = utf16_len(text)
+    whole = {'startIndex': start, 'endIndex': start + length + 1}
+    requests += [
+        {'updateParagraphStyle': {'range': whole, 'paragraphStyle': {'namedStyleType': 'NORMAL_TEXT'},
+                                  'fields': 'namedStyleType'}},
+        {'deleteParagraphBullets': {'range': whole}},
+        {'updateTextStyle': {'range': {'startIndex': start, 'endIndex': start + length}, 'textStyle': {},
+                             'fields': 'bold,italic,strikethrough,link'}},
+    ]
+    offset = start
+    for text, styles, kind in paragraphs:
+        for style_start, style_end, style in styles:
+            if style_end > style_start:
+                requests.append({'updateTextStyle': {
+                    'range': {'startIndex': offset + style_start, 'endIndex': offset + style_end},
+                    'textStyle': style,
+                    'fields': ','.join(style),
+                }})
+        if kind:
+            requests.append({'createParagraphBullets': {
+                'range': {'startIndex': offset, 'endIndex': offset + utf16_len(text) + 1},
+                'bulletPreset': BULLET_PRESETS[kind],
+            }})
+        offset += utf16_len(text) + 1
+    return requests
+
+
+def update_sections(execute: Callable, document_id: str, sections: List[Section], changed: List[int]) -> bool:
+    """
+    Rewrite changed sections of a Google Doc in one batchUpdate
+
+    The document's headings are located first; if they don't match the
+    Markdown's (e.g. the document was edited by hand), nothing is written.
+
+    Args:
+        execute: Function running a request built from a Docs service
+        document_id: Google Doc file ID
+        sections: Sections of the current Markdown
+        changed: Indexes of the sections to rewrite (from changed_sections)
+
+    Returns:
+        Whether the document was updated (False: re-upload it)
+    """
+    document = execute(lambda docs: docs.documents().get(
+        documentId=document_id,
+        fields='body(content(startIndex,endIndex,paragraph(elements(textRun(content)),paragraphStyle(namedStyleType))))'
+    ))
+    content = document.get('body', {}).get('content', [])
+    body_end = content[-1]['endIndex'] if content else 1
+
+    headings = []
+    for element in content:
+        paragraph = element.get('paragraph')
+        if paragraph and paragraph.get('paragraphStyle', {}).get('namedStyleType', '').startswith(('HEADING_', 'TITLE')):
+            text = ''.join(run.get('textRun', {}).get('content', '') for run in paragraph.get('elements', []))
+            headings.append((element['startIndex'], element['endIndex'], ' '.join(text.split())))
+    if [title for _, _, title in headings] != [' '.join(section.title.split()) for section in sections[1:]]:
+        return False
+
+    # Section i spans from the end of its heading to the start of the next one
+    starts = [1] + [end for _, end, _ in headings]
+    ends = [start for start, _, _ in headings] + [body_end]
+    requests = []
+    for i in sorted(changed, reverse=True):
+        requests += _section_requests(render_body(sections[i].body), starts[i], ends[i], i == len(sections) - 1)
+    if requests:
+        execute(lambda docs: docs.documents().batchUpdate(
+            documentId=document_id,
+            body={'requests': requests}
+        ))
+    return True
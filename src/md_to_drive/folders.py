@@ -0,0 +1,125 @@
+"""
+Pipelined folder resolution for MD-to-Drive
+Local directories are mapped to Drive folders on their own workers as a
+dependency graph: each folder is looked up or created as soon as its parent
+exists, so sibling subtrees resolve in parallel and uploads into a folder
+can start without waiting for the rest of the tree
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict
+
+from .cache import SyncCache
+
+
+logger = logging.getLogger(__name__)
+
+# Folder lookups/creations in flight at once
+FOLDER_WORKERS = 4
+
+
+class FolderResolver:
+    """Resolve local directories under a base directory to Drive folder IDs"""
+
+    def __init__(self, syncer, base_path: Path, parent_id: str, workers: int = FOLDER_WORKERS):
+        """
+        Initialize folder resolver
+
+        Args:
+            syncer: GoogleDriveSync used to look up and create folders
+            base_path: Local directory mirrored as a folder inside parent_id
+            parent_id: Drive folder ID the base directory's folder goes in
+            workers: Number of folders resolved concurrently
+        """
+        self.syncer = syncer
+        self.base_path = Path(base_path)
+        self.parent_id = parent_id
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='md-to-drive-folders')
+        self._lock = threading.Lock()
+        # Local directory -> folder ID (resolved once per run)
+        self._folders: Dict[Path, Future] = {}
+
+    def folder(self, directory: Path) -> Future:
+        """
+        Get a future for a directory's folder ID, starting its resolution if needed
+
+        Parent folders are resolved first (each directory waits only for its
+        own ancestors). Directories outside the base directory map to the
+        base directory's folder.
+
+        Args:
+            directory: Local directory (the base directory or one inside it)
+
+        Returns:
+            Future resolving to the Drive folder ID
+        """
+        directory = Path(directory)
+        if directory != self.base_path and self.base_path not in directory.parents:
+            directory = self.base_path
+
+        with self._lock:
+            future = self._folders.get(directory)
+            if future is not None:
+                return future
+            future = self._folders[directory] = Future()
+
+        if directory == self.base_path:
+            self._executor.submit(self._resolve, future, directory, self.parent_id)
+        else:
+            self.folder(directory.parent).add_done_callback(
+                lambda parent: self._parent_resolved(future, directory, parent))
+        return future
+
+    def _parent_resolved(self, future: Future, directory: Path, parent: Future):
+        error = parent.exception()
+        if error is not None:
+            future.set_exception(error)
+            return
+        try:
+            self._executor.submit(self._resolve, future, directory, parent.result())
+        except RuntimeError as e:
+            # Shut down while the parent was resolving
+            future.set_exception(e)
+
+    def _resolve(self, future: Future, directory: Path, parent_id: str):
+        try:
+            with self.syncer.metrics.phase('folders'):
+                folder_id = self.syncer.get_or_create_folder(directory.name, parent_id)
+        except Exception as e:
+            logger.error("❌ %s", e, extra={'event': 'folder_failed', 'path': str(directory)})
+            future.set_exception(e)
+            return
+        if self.syncer.cache is not None:
+            # Lets `md-to-drive plan` tell existing folders from new ones offline
+            relative_path = directory.resolve().relative_to(self.base_path.resolve().parent)
+            self.syncer.cache.record_folder(SyncCache.make_key(self.parent_id, relative_path), folder_id)
+        # Starts resolving the children waiting on this folder
+        future.set_result(folder_id)
+
+    def wait(self):
+        """Wait until every requested folder is resolved or has failed"""
+        with self._lock:
+            # Children are registered as soon as they're requested, before their parent resolves
+            requested = list(self._folders.values())
+        wait(requested)
+
+    def results(self) -> Dict[str, str]:
+        """
+        Wait for every requested folder
+
+        Returns:
+            Dictionary mapping local paths to Drive folder IDs
+
+        Raises:
+            Exception: If a folder could not be resolved
+        """
+        self.wait()
+        with self._lock:
+            return {str(path): future.result() for path, future in self._folders.items()}
+
+    def shutdown(self, wait: bool = True):
+        """Stop the folder workers (waiting for folders in progress by default)"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,192 @@
+"""
+Logging setup for MD-to-Drive
+Human-readable or JSON-lines log output and a compact progress bar
+
+Library modules log through `logging.getLogger(__name__)` with %-style
+arguments, so per-file messages below the configured level are never
+formatted.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, TextIO
+
+
+LOGGER_NAME = 'md_to_drive'
+
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ProgressBar:
+    """Single-line progress bar with throughput and ETA"""
+
+    WIDTH = 24
+    # Minimum seconds between redraws, so tiny files don't make drawing the bottleneck
+    REFRESH_INTERVAL = 0.1
+
+    def __init__(self, stream: TextIO = None, unit: str = 'files'):
+        """
+        Initialize progress bar
+
+        Args:
+            stream: Terminal stream to draw on (default: stderr)
+            unit: Name of the counted items
+        """
+        self.stream = stream or sys.stderr
+        self.unit = unit
+        self.total = 0
+        self.done = 0
+        self._start = None
+        self._last_draw = 0.0
+        self._visible = False
+        self._lock = threading.RLock()
+
+    def start(self, total: int = 0):
+        """Begin tracking `total` items (more can be added while running)"""
+        with self._lock:
+            self.total = total
+            self.done = 0
+            self._start = time.monotonic()
+            self._draw(force=True)
+
+    def add(self, amount: int):
+        """Add newly discovered items to the total"""
+        with self._lock:
+            self.total += amount
+            self._draw()
+
+    def advance(self, amount: int = 1):
+        """Mark items as done"""
+        with self._lock:
+            self.done += amount
+            self._draw()
+
+    def finish(self):
+        """Draw the final state and move to a new line"""
+        with self._lock:
+            if self._start is not None:
+                self._draw(force=True)
+                self.stream.write('\n')
+                self.stream.flush()
+            self._visible = False
+            self._start = None
+
+    def clear(self):
+        """Erase the bar (before another line is written)"""
+        with self._lock:
+            if self._visible:
+                self.stream.write('\r\033[K')
+                self._visible = False
+
+    def redraw(self):
+        """Draw the bar again after another line was written"""
+        with self._lock:
+            if self._start is not None:
+                self._draw(force=True)
+
+    def _draw(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_draw < self.REFRESH_INTERVAL and self.done < self.total:
+            return
+        self._last_draw = now
+
+        elapsed = max(now - self._start, 1e-9)
+        rate = self.done / elapsed
+        fraction = self.done / self.total if self.total else 0.0
+        filled = int(self.WIDTH * fraction)
+        eta = (self.total - self.done) / rate if rate else 0.0
+
+        self.stream.write(
+            f"\r\033[K[{'#' * filled}{'.' * (self.WIDTH - filled)}] {self.done}/{self.total} {self.unit}"
+            f"  {rate:.1f} {self.unit}/s  ETA {_format_seconds(eta)}"
+        )
+        self.stream.flush()
+        self._visible = True
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class _ProgressAwareHandler(logging.StreamHandler):
+    """Stream handler that keeps a progress bar on the last line"""
+
+    def __init__(self, stream: TextIO, progress: Optional[ProgressBar] = None):
+        super().__init__(stream)
+        self.progress = progress
+
+    def emit(self, record: logging.LogRecord):
+        if self.progress is None:
+            super().emit(record)
+            return
+        with self.progress._lock:
+            self.progress.clear()
+            super().emit(record)
+            self.progress.redraw()
+
+
+def setup_logging(level: str = 'info', json_lines: bool = False, progress: bool = False,
+                  stream: TextIO = None) -> Optional[ProgressBar]:
+    """
+    Configure MD-to-Drive log output
+
+    Args:
+        level: Minimum level: 'debug', 'info', 'warning' or 'error'
+        json_lines: Emit one JSON object per record instead of text
+        progress: Show a progress bar (ignored for JSON output or non-TTY streams)
+        stream: Output stream (default: stderr)
+
+    Returns:
+        The ProgressBar to drive, or None if progress is not shown
+    """
+    stream = stream or sys.stderr
+    bar = None
+    if progress and not json_lines and stream.isatty():
+        bar = ProgressBar(stream)
+
+    handler = _ProgressAwareHandler(stream, bar)
+    handler.setFormatter(JSONLinesFormatter() if json_lines else logging.Formatter('%(message)s'))
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel(LEVELS[level])
+    logger.propagate = False
+
+    return bar
@@ -0,0 +1,227 @@
+"""
+Run instrumentation for MD-to-Drive
+Counts API calls, latencies, bytes uploaded and time spent per sync phase,
+and writes them as a machine-readable run report
+"""
+
+import os
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+
+# Upper bounds (seconds) of the API latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+REPORT_VERSION = 1
+
+
+class _Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 6),
+            'mean_seconds': round(self.total / self.count, 6) if self.count else 0.0,
+            'max_seconds': round(self.max, 6),
+            'buckets': {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+            },
+        }
+
+
+class SyncMetrics:
+    """Collect timings and counters for one sync run"""
+
+    def __init__(self, trace: bool = False):
+        """
+        Initialize metrics
+
+        Args:
+            trace: Record a span for every phase and API call (kept in the
+                report, and sent to OpenTelemetry when it is installed)
+        """
+        self.trace = trace
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases: Dict[str, dict] = defaultdict(lambda: {'seconds': 0.0, 'count': 0})
+        self._api: Dict[str, dict] = defaultdict(lambda: {'calls': 0, 'errors': 0, 'latency': _Histogram()})
+        self._counters: Dict[str, int] = defaultdict(int)
+        self.bytes_uploaded = 0
+        self._spans: List[dict] = []
+        self._local = threading.local()
+        self._tracer = None
+
+        if trace:
+            try:
+                from opentelemetry import trace as otel_trace
+                self._tracer = otel_trace.get_tracer('md_to_drive')
+            except ImportError:
+                pass
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Record a span (only when tracing is enabled)
+
+        Args:
+            name: Span name
+            **attributes: Span attributes
+        """
+        if not self.trace:
+            yield
+            return
+
+        stack = self._local.__dict__.setdefault('stack', [])
+        record = {
+            'name': name,
+            'parent': stack[-1]['name'] if stack else None,
+            'thread': threading.current_thread().name,
+            'start_seconds': round(time.perf_counter() - self._start, 6),
+            'attributes': attributes,
+        }
+        stack.append(record)
+        otel_span = self._tracer.start_as_current_span(name, attributes=attributes) if self._tracer else None
+        if otel_span:
+            otel_span.__enter__()
+        try:
+            yield
+        except BaseException as e:
+            record['error'] = str(e)
+            raise
+        finally:
+            if otel_span:
+                otel_span.__exit__(None, None, None)
+            stack.pop()
+            record['duration_seconds'] = round(time.perf_counter() - self._start - record['start_seconds'], 6)
+            with self._lock:
+                self._spans.append(record)
+
+    @contextmanager
+    def phase(self, name: str, **attributes):
+        """
+        Time a sync phase (scan, hash, folders, lookup, convert, upload, cache_save)
+
+        Time spent in a phase nested inside another one on the same thread
+        (e.g. hashing during an upload) is only counted for the inner phase,
+        so phase totals don't count it twice.
+
+        Args:
+            name: Phase name
+            **attributes: Span attributes when tracing
+        """
+        # Seconds spent in phases nested inside each open phase of this thread
+        nested = self._local.__dict__.setdefault('nested', [])
+        nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            with self.span(name, **attributes):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - nested.pop()
+            if nested:
+                nested[-1] += elapsed
+            with self._lock:
+                phase = self._phases[name]
+                phase['seconds'] += own
+                phase['count'] += 1
+
+    def record_call(self, method: str, seconds: float, error: bool = False, bytes_sent: int = 0):
+        """
+        Record one API request
+
+        Args:
+            method: API method ID (e.g. 'drive.files.list')
+            seconds: Request latency
+            error: Whether the request failed
+            bytes_sent: Media bytes uploaded by the request
+        """
+        with self._lock:
+            api = self._api[method]
+            api['calls'] += 1
+            api['latency'].observe(seconds)
+            if error:
+                api['errors'] += 1
+            else:
+                self.bytes_uploaded += bytes_sent
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Increment a counter (e.g. files_created, files_skipped)
+
+        Args:
+            name: Counter name
+            amount: Amount to add
+        """
+        with self._lock:
+            self._counters[name] += amount
+
+    def report(self, **extra) -> dict:
+        """
+        Build the run report
+
+        Args:
+            **extra: Additional top-level fields (e.g. per-account usage)
+
+        Returns:
+            JSON-serialisable report dictionary
+        """
+        with self._lock:
+            report = {
+                'version': REPORT_VERSION,
+                'started': self.started.isoformat(),
+                'duration_seconds': round(time.perf_counter() - self._start, 6),
+                'counters': dict(self._counters),
+                'phases': {
+                    name: {'seconds': round(p['seconds'], 6), 'count': p['count']}
+                    for name, p in self._phases.items()
+                },
+                'api': {
+                    'calls': sum(a['calls'] for a in self._api.values()),
+                    'errors': sum(a['errors'] for a in self._api.values()),
+                    'methods': {
+                        method: {'calls': a['calls'], 'errors': a['errors'], 'latency': a['latency'].to_dict()}
+                        for method, a in self._api.items()
+                    },
+                },
+                'bytes_uploaded': self.bytes_uploaded,
+            }
+            if self.trace:
+                report['spans'] = sorted(self._spans, key=lambda s: s['start_seconds'])
+        report.update(extra)
+        return report
+
+    def write_report(self, report_file: str, **extra):
+        """
+        Write the run report as JSON
+
+        Args:
+            report_file: Path to write the report to
+            **extra: Additional top-level fields
+        """
+        report_dir = os.path.dirname(report_file)
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+        with open(report_file, 'w') as f:
+            json.dump(self.report(**extra), f, indent=2)
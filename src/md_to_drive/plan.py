@@ -0,0 +1,236 @@
+"""
+Offline sync plans for MD-to-Drive
+Work out what a sync would do - creates, updates, skips, renames and
+prunes, with estimated bytes and API calls - from the local tree and the
+sync cache alone, without any API call
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .cache import SyncCache
+from .converter import MarkdownConverter
+from .schedule import conversion_kind
+from .shard import in_shard
+from .sync import walk_directory
+
+
+PLAN_VERSION = 1
+
+# Actions a plan can hold for a file, in display order
+ACTIONS = ('create', 'update', 'rename', 'prune', 'skip')
+
+# Estimated API calls per planned action (e.g. lookup + upload for a create)
+CALLS = {
+    'create': 2,
+    'update': 2,
+    'rename': 2,
+    'prune': 1,  # per Drive file (a chunked CSV has several)
+    'skip': 0,
+    'folder': 1,
+    'new_folder': 2,
+    'image': 2,
+}
+
+
+def build_plan(directory: Path, cache: SyncCache, folder_id: Optional[str] = None, recursive: bool = True,
+               exclude: Sequence[str] = (), shard: Optional[Tuple[int, int]] = None,
+               upload_images: bool = True) -> dict:
+    """
+    Compute what syncing a directory would do
+
+    New files whose content matches a cached file that no longer exists
+    locally are planned as renames (moved on Drive instead of re-uploaded);
+    the remaining cached files that no longer exist are planned as prunes
+    (only applied by `sync --plan-file --prune`).
+
+    Args:
+        directory: Local directory path
+        cache: Loaded sync cache
+        folder_id: Google Drive folder the sync targets (None for My Drive root)
+        recursive: Include subdirectories
+        exclude: List of patterns to exclude
+        shard: Optional (index, total) to only plan this shard's share of the files
+        upload_images: Whether local images referenced from Markdown are uploaded
+
+    Returns:
+        Plan dictionary (see save_plan), with a `summary` of counts, bytes and API calls
+    """
+    directory = Path(directory)
+    root = folder_id or 'root'
+    sync_root = directory.resolve().parent
+    base_key = SyncCache.make_key(root, directory.resolve().relative_to(sync_root))
+
+    folders = []
+    files = []
+    seen = set()
+    new_images: Dict[str, int] = {}
+    unsupported = 0
+
+    for dirpath, paths in walk_directory(directory, recursive, exclude, shard):
+        folder = cache.folders.get(SyncCache.make_key(root, dirpath.resolve().relative_to(sync_root)))
+        folders.append({'path': str(dirpath), 'drive_id': folder['drive_id'] if folder else None})
+
+        for path in paths:
+            kind = conversion_kind(path)
+            if kind is None:
+                unsupported += 1
+                continue
+            key = SyncCache.make_key(root, path.resolve().relative_to(sync_root))
+            seen.add(key)
+
+            images = []
+            if upload_images and path.suffix.lower() in ('.md', '.markdown'):
+                try:
+                    content = path.read_text(encoding='utf-8')
+                except (OSError, UnicodeDecodeError):
+                    content = ''
+                if '![' in content:
+                    images = MarkdownConverter.find_local_images(content, path.parent)
+
+            digest = cache.content_hash(path, images)
+            entry = cache.lookup(key, path)
+            item = {'path': str(path), 'key': key, 'kind': kind, 'hash': digest,
+                    'bytes': os.path.getsize(path), 'drive_id': (entry or {}).get('drive_id')}
+            if entry is None:
+                item['action'] = 'create'
+            elif entry.get('hash') == digest and (kind != 'application/vnd.google-apps.spreadsheet'
+                                                  or 'blocks' in entry or 'chunks' in entry):
+                item['action'] = 'skip'
+                item['bytes'] = 0
+            else:
+                item['action'] = 'update'
+
+            if item['action'] != 'skip':
+                for image in images:
+                    image_hash = SyncCache.get_file_hash(image)
+                    if image_hash and f"{root}:{image_hash}" not in cache.assets:
+                        new_images[image_hash] = os.path.getsize(image)
+            files.append(item)
+
+    # Cached files under the directory that are gone locally: renamed or deleted
+    missing: Dict[Tuple[str, str], List[Tuple[str, dict]]] = {}
+    gone = []
+    for key, entry in list(cache.cache.items()):
+        if not key.startswith(base_key + '/') or key in seen:
+            continue
+        relative_path = Path(key.split(':', 1)[1])
+        local_path = sync_root / relative_path
+        within = local_path.relative_to(directory.resolve())
+        if local_path.exists() or (not recursive and len(within.parts) > 1):
+            continue
+        if any(Path(directory, within).match(pattern) for pattern in exclude):
+            continue
+        if shard and not in_shard(within, shard):
+            continue
+        gone.append((key, entry, Path(directory, within)))
+        if entry.get('hash') and entry.get('drive_id') and not entry.get('chunks'):
+            kind = conversion_kind(local_path)
+            missing.setdefault((entry['hash'], kind), []).append((key, gone[-1]))
+
+    renamed = set()
+    for item in files:
+        candidates = missing.get((item['hash'], item['kind'])) if item['action'] == 'create' else None
+        if candidates:
+            key, (_, entry, old_path) = candidates.pop(0)
+            renamed.add(key)
+            item.update({'action': 'rename', 'from': str(old_path), 'from_key': key,
+                         'drive_id': entry['drive_id'], 'bytes': 0})
+
+    for key, entry, old_path in gone:
+        if key not in renamed:
+            drive_ids = [chunk['drive_id'] for chunk in entry.get('chunks', []) if chunk.get('drive_id')]
+            if entry.get('drive_id') and entry['drive_id'] not in drive_ids:
+                drive_ids.insert(0, entry['drive_id'])
+            files.append({'path': str(old_path), 'key': key, 'kind': conversion_kind(old_path),
+                          'action': 'prune', 'bytes': 0, 'drive_ids': drive_ids})
+
+    plan = {
+        'version': PLAN_VERSION,
+        'created': datetime.now().isoformat(),
+        'directory': str(directory),
+        'folder_id': root,
+        'recursive': recursive,
+        'exclude': list(exclude),
+        'shard': list(shard) if shard else None,
+        'upload_images': upload_images,
+        'folders': folders,
+        'files': files,
+    }
+    plan['summary'] = summarize(plan, unsupported, new_images)
+    return plan
+
+
+def summarize(plan: dict, unsupported: int = 0, new_images: Optional[Dict[str, int]] = None) -> dict:
+    """
+    Count a plan's actions and estimate its cost
+
+    Args:
+        plan: Plan dictionary
+        unsupported: Number of files skipped as unsupported
+        new_images: Content hash -> size of images that would be uploaded
+
+    Returns:
+        Dictionary with a count per action, folders, new_folders, images,
+        unsupported, bytes and api_calls
+    """
+    new_images = new_images or {}
+    summary = {action: 0 for action in ACTIONS}
+    api_calls = 0
+    for item in plan['files']:
+        summary[item['action']] += 1
+        if item['action'] == 'prune':
+            api_calls += CALLS['prune'] * len(item['drive_ids'])
+        else:
+            api_calls += CALLS[item['action']]
+    new_folders = sum(1 for folder in plan['folders'] if folder['drive_id'] is None)
+    api_calls += CALLS['new_folder'] * new_folders + CALLS['folder'] * (len(plan['folders']) - new_folders)
+    api_calls += CALLS['image'] * len(new_images)
+
+    summary.update({
+        'folders': len(plan['folders']),
+        'new_folders': new_folders,
+        'images': len(new_images),
+        'unsupported': unsupported,
+        'bytes': sum(item['bytes'] for item in plan['files']) + sum(new_images.values()),
+        'api_calls': api_calls,
+    })
+    return summary
+
+
+def save_plan(plan: dict, plan_file: str):
+    """
+    Write a plan to a JSON file (for `sync --plan-file`)
+
+    Args:
+        plan: Plan dictionary from build_plan()
+        plan_file: Path to write to
+    """
+    plan_dir = os.path.dirname(plan_file)
+    if plan_dir:
+        os.makedirs(plan_dir, exist_ok=True)
+    with open(plan_file, 'w') as f:
+        json.dump(plan, f, indent=2)
+
+
+def load_plan(plan_file: str) -> dict:
+    """
+    Read a plan written by save_plan()
+
+    Args:
+        plan_file: Path to the plan file
+
+    Returns:
+        Plan dictionary
+
+    Raises:
+        ValueError: If the file is not a plan this version can execute
+    """
+    with open(plan_file, 'r') as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"{plan_file} is not a version {PLAN_VERSION} sync plan")
+    return plan
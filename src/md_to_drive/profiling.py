@@ -0,0 +1,214 @@
+"""
+Profiling hooks for MD-to-Drive
+Capture a cProfile dump or sampled stacks (for flame graphs) of a sync run,
+with separate sections for the known hot paths
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Section name -> function whose cumulative time the section reports
+PROFILE_SECTIONS = {
+    'preprocess': 'preprocess_markdown_for_google_docs',
+    'hashing': 'get_file_hash',
+    'http_wait': '_execute_request',
+}
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+_PACKAGE_DIR = str(Path(__file__).resolve().parent)
+
+
+class SyncProfiler:
+    """Profile a sync run with cProfile or a sampling profiler"""
+
+    def __init__(self, mode: str = 'cprofile', interval: float = 0.005):
+        """
+        Initialize profiler
+
+        Args:
+            mode: 'cprofile' (deterministic, per-function call counts) or
+                'sampling' (low overhead, folded stacks for flame graphs)
+            interval: Seconds between samples in sampling mode
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.interval = interval
+        self.duration = 0.0
+        self._start = None
+        self._lock = threading.Lock()
+        # cProfile
+        self._profiles: List[cProfile.Profile] = []
+        self._stats: Optional[pstats.Stats] = None
+        # Sampling
+        self._samples: Counter = Counter()
+        self._ticks = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start profiling the current thread and any thread started afterwards"""
+        self._start = time.perf_counter()
+        if self.mode == 'cprofile':
+            # Before 3.12 cProfile only sees the thread that enables it, so
+            # give each new thread (e.g. upload workers) its own profile
+            if sys.version_info < (3, 12):
+                threading.setprofile(self._profile_new_thread)
+            self._enable_profile()
+        else:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name='md-to-drive-profiler', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop profiling"""
+        if self._start is None:
+            return
+        self.duration = time.perf_counter() - self._start
+        self._start = None
+        if self.mode == 'cprofile':
+            if sys.version_info < (3, 12):
+                threading.setprofile(None)
+            stats = None
+            with self._lock:
+                for profile in self._profiles:
+                    profile.disable()
+                    if stats is None:
+                        stats = pstats.Stats(profile)
+                    else:
+                        stats.add(profile)
+            self._stats = stats
+        else:
+            self._stop.set()
+            self._sampler.join()
+
+    def _enable_profile(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _profile_new_thread(self, frame, event, arg):
+        # Runs once as the new thread's profile hook; enable() replaces it
+        self._enable_profile()
+
+    def _sample(self):
+        own_thread = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._samples[';'.join(reversed(stack))] += 1
+            self._ticks += 1
+
+    def sections(self) -> Dict[str, dict]:
+        """
+        Time spent in each hot-path section
+
+        Returns:
+            Dictionary of section name -> {function, seconds, calls}
+            (calls is None in sampling mode)
+        """
+        sections = {}
+        for name, function in PROFILE_SECTIONS.items():
+            if self.mode == 'cprofile':
+                calls, seconds = 0, 0.0
+                if self._stats is not None:
+                    for (filename, _, funcname), (_, nc, _, ct, _) in self._stats.stats.items():
+                        if funcname == function and filename.startswith(_PACKAGE_DIR):
+                            calls += nc
+                            seconds += ct
+            else:
+                calls = None
+                marker = f";{function} ("
+                samples = sum(count for stack, count in self._samples.items() if marker in stack)
+                seconds = samples * self.duration / self._ticks if self._ticks else 0.0
+            sections[name] = {'function': function, 'seconds': round(seconds, 6), 'calls': calls}
+        return sections
+
+    def write(self, base_path: str) -> List[str]:
+        """
+        Write the profile next to `base_path`
+
+        cProfile mode writes `<base>.pstats` (load with pstats or snakeviz);
+        sampling mode writes `<base>.folded` (flamegraph.pl / speedscope).
+        Both write a `<base>.profile.txt` summary with one section per hot path.
+
+        Args:
+            base_path: Output path without extension
+
+        Returns:
+            List of files written
+        """
+        base_dir = os.path.dirname(base_path)
+        if base_dir:
+            os.makedirs(base_dir, exist_ok=True)
+
+        files = []
+        if self.mode == 'cprofile' and self._stats is not None:
+            self._stats.dump_stats(f"{base_path}.pstats")
+            files.append(f"{base_path}.pstats")
+        elif self.mode == 'sampling':
+            with open(f"{base_path}.folded", 'w') as f:
+                for stack, count in sorted(self._samples.items()):
+                    f.write(f"{stack} {count}\n")
+            files.append(f"{base_path}.folded")
+
+        with open(f"{base_path}.profile.txt", 'w') as f:
+            f.write(self._summary())
+        files.append(f"{base_path}.profile.txt")
+        return files
+
+    def _summary(self) -> str:
+        out = io.StringIO()
+        out.write(f"md-to-drive {self.mode} profile: {self.duration:.3f}s wall time\n")
+
+        for name, section in self.sections().items():
+            share = section['seconds'] / self.duration * 100 if self.duration else 0.0
+            calls = f"{section['calls']} calls, " if section['calls'] is not None else ''
+            out.write(f"\n=== {name} ({section['function']}): {calls}{section['seconds']:.3f}s ({share:.1f}%) ===\n")
+            if self.mode == 'cprofile' and self._stats is not None and section['calls']:
+                self._stats.stream = out
+                self._stats.sort_stats('cumulative').print_callees(rf"\({section['function']}\)")
+
+        out.write("\n=== top functions by cumulative time ===\n")
+        if self.mode == 'cprofile' and self._stats is not None:
+            self._stats.stream = out
+            self._stats.sort_stats('cumulative').print_stats(30)
+        else:
+            functions = Counter()
+            for stack, count in self._samples.items():
+                for function in set(stack.split(';')[1:]):
+                    functions[function] += count
+            for function, count in functions.most_common(30):
+                out.write(f"{count:>8} samples  {function}\n")
+        return out.getvalue()
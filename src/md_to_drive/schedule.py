@@ -0,0 +1,157 @@
+"""
+Cost-based scheduling for MD-to-Drive
+Estimate how long each file will take to sync and start the slowest first,
+so one large upload doesn't become the tail of a concurrent run
+"""
+
+import heapq
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from .converter import FileTypeDetector
+
+
+# Seconds per file and per byte before any durations have been recorded.
+# Sheets imports are markedly slower than Docs conversions.
+DEFAULT_COSTS = {
+    'application/vnd.google-apps.document': (0.5, 1e-6),
+    'application/vnd.google-apps.spreadsheet': (1.0, 4e-6),
+}
+
+# Most files buffered to choose the most expensive from (bounds memory with lazy discovery)
+DEFAULT_LOOKAHEAD = 1024
+
+
+def conversion_kind(path: Path) -> Optional[str]:
+    """
+    Get the Google Workspace type a file converts to
+
+    Args:
+        path: File path (only the suffix is used)
+
+    Returns:
+        Target MIME type, or None for unsupported files
+    """
+    try:
+        return FileTypeDetector.get_converter(Path(path)).get_conversion_mimetype()
+    except ValueError:
+        return None
+
+
+class CostModel:
+    """Predict per-file sync time from durations recorded in the cache"""
+
+    # Recorded samples needed before a fitted model replaces the defaults
+    MIN_SAMPLES = 3
+
+    def __init__(self, costs: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Initialize cost model
+
+        Args:
+            costs: Conversion kind -> (seconds per file, seconds per byte)
+        """
+        self.costs = dict(DEFAULT_COSTS)
+        self.costs.update(costs or {})
+
+    @classmethod
+    def from_cache(cls, entries: Dict[str, dict]) -> 'CostModel':
+        """
+        Fit a model to the `size` and `duration` of cached entries
+
+        Each conversion kind gets a least-squares line of duration against
+        size; kinds with too few samples keep the defaults.
+
+        Args:
+            entries: SyncCache entries
+
+        Returns:
+            CostModel
+        """
+        samples: Dict[str, list] = {}
+        for key, entry in entries.items():
+            if 'duration' in entry and 'size' in entry:
+                kind = conversion_kind(Path(key.split(':', 1)[-1]))
+                if kind:
+                    samples.setdefault(kind, []).append((entry['size'], entry['duration']))
+
+        costs = {}
+        for kind, points in samples.items():
+            if len(points) < cls.MIN_SAMPLES:
+                continue
+            n = len(points)
+            mean_size = sum(size for size, _ in points) / n
+            mean_duration = sum(duration for _, duration in points) / n
+            variance = sum((size - mean_size) ** 2 for size, _ in points)
+            per_byte = 0.0
+            if variance:
+                per_byte = max(sum((size - mean_size) * (duration - mean_duration)
+                                   for size, duration in points) / variance, 0.0)
+            costs[kind] = (max(mean_duration - per_byte * mean_size, 0.0), per_byte)
+        return cls(costs)
+
+    def estimate(self, path: Path, entry: Optional[dict] = None) -> float:
+        """
+        Estimate the seconds needed to sync a file
+
+        Args:
+            path: Local file path
+            entry: The file's cache entry, if any
+
+        Returns:
+            Expected duration in seconds
+        """
+        kind = conversion_kind(path)
+        if kind is None:
+            return 0.0
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 0.0
+
+        if entry:
+            # Not modified since its last sync: only the hash check remains
+            last_sync = entry.get('last_sync')
+            if entry.get('hash') and last_sync and datetime.fromtimestamp(stat.st_mtime).isoformat() <= last_sync:
+                return 0.0
+            # The file's own history beats the per-kind model
+            if entry.get('duration') and entry.get('size'):
+                return entry['duration'] * stat.st_size / entry['size']
+
+        per_file, per_byte = self.costs[kind]
+        return per_file + per_byte * stat.st_size
+
+
+def schedule(items: Iterable, cost: Callable[[object], float],
+             lookahead: int = DEFAULT_LOOKAHEAD, start: Optional[int] = None) -> Iterator:
+    """
+    Reorder work so the most expensive items start first
+
+    Items are buffered and released most expensive first (longest-
+    processing-time scheduling), so long uploads start early and the many
+    cheap files fill the remaining workers. The first item is released once
+    `start` items are buffered, so work begins as soon as there is enough
+    to keep the workers busy; the window then widens by one item per
+    release, up to `lookahead`.
+
+    Args:
+        items: Work items, in discovery order
+        cost: Function returning an item's expected cost
+        lookahead: Maximum number of items buffered
+        start: Items buffered before the first is released (e.g. the worker
+            count; defaults to the full window)
+
+    Yields:
+        The same items, most expensive first within the window
+    """
+    heap = []
+    window = max(1, min(start or lookahead, lookahead))
+    for sequence, item in enumerate(items):
+        heapq.heappush(heap, (-cost(item), sequence, item))
+        if len(heap) >= window:
+            yield heapq.heappop(heap)[2]
+            window = min(window + 1, lookahead)
+    while heap:
+        yield heapq.heappop(heap)[2]
@@ -0,0 +1,66 @@
+"""
+Deterministic sharding of sync work across CI jobs
+Every shard computes the same partition without coordinating with the others
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Tuple
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification of the form "i/N"
+
+    Args:
+        spec: Shard spec, 1-based (e.g. "2/4" is the second of four shards)
+
+    Returns:
+        Tuple of (index, total)
+
+    Raises:
+        ValueError: If the spec is malformed or out of range
+    """
+    try:
+        index_str, total_str = spec.split('/')
+        index, total = int(index_str), int(total_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected the form i/N (e.g. 1/4)")
+
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"Invalid shard '{spec}': index must be between 1 and {max(total, 1)}")
+
+    return index, total
+
+
+def shard_for_path(relative_path: Path, total: int) -> int:
+    """
+    Get the shard a file belongs to
+
+    Uses a stable hash of the POSIX form of the path so the result does not
+    depend on the platform, the Python process or the order files are found in.
+
+    Args:
+        relative_path: File path relative to the sync root
+        total: Number of shards
+
+    Returns:
+        1-based shard index
+    """
+    digest = hashlib.md5(Path(relative_path).as_posix().encode('utf-8')).hexdigest()
+    return int(digest, 16) % total + 1
+
+
+def in_shard(relative_path: Path, shard: Tuple[int, int]) -> bool:
+    """
+    Check whether a file belongs to the given shard
+
+    Args:
+        relative_path: File path relative to the sync root
+        shard: Tuple of (index, total) as returned by parse_shard
+
+    Returns:
+        bool: True if the file should be synced by this shard
+    """
+    index, total = shard
+    return shard_for_path(relative_path, total) == index
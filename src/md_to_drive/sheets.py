@@ -0,0 +1,160 @@
+"""
+Differential Google Sheets updates for MD-to-Drive
+Track per-block row hashes of a synced CSV and rewrite only the rows that
+changed with the Sheets values API instead of re-importing the whole file
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+
+# Rows per hashed block: smaller blocks mean smaller writes but a bigger cache
+BLOCK_ROWS = 500
+
+# Changed blocks sent per values.batchUpdate request
+BLOCKS_PER_REQUEST = 20
+
+
+def iter_blocks(csv_file: Path, block_rows: int = BLOCK_ROWS) -> Iterator[List[List[str]]]:
+    """
+    Read a CSV in blocks of rows
+
+    Args:
+        csv_file: Path to CSV file
+        block_rows: Data rows per block
+
+    Yields:
+        The header row as a block of its own, then blocks of data rows
+    """
+    with open(csv_file, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield [header]
+        while True:
+            block = list(itertools.islice(reader, block_rows))
+            if not block:
+                return
+            yield block
+
+
+def block_hash(rows: List[List[str]]) -> str:
+    """Hash a block of rows"""
+    return hashlib.md5(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def csv_layout(csv_file: Path, block_rows: int = BLOCK_ROWS) -> dict:
+    """
+    Describe a CSV for differential updates
+
+    Args:
+        csv_file: Path to CSV file
+        block_rows: Data rows per block
+
+    Returns:
+        Dictionary with header (hash), width (widest row), rows (data rows),
+        block_rows and blocks (hash per block) - stored in the cache entry
+    """
+    blocks = iter_blocks(csv_file, block_rows)
+    header = next(blocks, [[]])
+    layout = {
+        'header': block_hash(header),
+        'width': len(header[0]),
+        'rows': 0,
+        'block_rows': block_rows,
+        'blocks': [],
+    }
+    for block in blocks:
+        layout['width'] = max([layout['width']] + [len(row) for row in block])
+        layout['rows'] += len(block)
+        layout['blocks'].append(block_hash(block))
+    return layout
+
+
+def same_columns(old: dict, new: dict) -> bool:
+    """Whether two layouts share a header and width (so cells can be patched in place)"""
+    return (old.get('header') == new['header'] and old.get('width') == new['width']
+            and old.get('block_rows') == new['block_rows'])
+
+
+def column_letter(number: int) -> str:
+    """Convert a 1-based column number to its A1 letters (1 -> A, 27 -> AA)"""
+    letters = ''
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def update_changed_rows(execute: Callable, spreadsheet_id: str, csv_file: Path, old: dict, new: dict,
+                        sheet_id: Optional[int] = None) -> Tuple[int, Optional[int]]:
+    """
+    Write the blocks that changed between two layouts of the same CSV
+
+    The grid is resized first when rows were added or removed, then changed
+    blocks are written with values.batchUpdate (rows shorter than the widest
+    row are padded, so stale cells are cleared).
+
+    Args:
+        execute: Function running a request built from a Sheets service
+            (e.g. lambda make_request: pool.execute(make_request, api='sheets'))
+        spreadsheet_id: Google Sheet file ID
+        csv_file: Path to the current CSV
+        old: Layout the sheet currently holds (from the cache)
+        new: Layout of the current CSV (from csv_layout)
+        sheet_id: ID of the sheet (tab) holding the data, if known
+
+    Returns:
+        Tuple of (cells written, sheet ID)
+    """
+    if new['rows'] != old['rows']:
+        if sheet_id is None:
+            spreadsheet = execute(lambda sheets: sheets.spreadsheets().get(
+                spreadsheetId=spreadsheet_id,
+                fields='sheets.properties.sheetId'
+            ))
+            sheet_id = spreadsheet['sheets'][0]['properties']['sheetId']
+        execute(lambda sheets: sheets.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'requests': [{'updateSheetProperties': {
+                'properties': {'sheetId': sheet_id, 'gridProperties': {'rowCount': new['rows'] + 1}},
+                'fields': 'gridProperties.rowCount',
+            }}]}
+        ))
+
+    width = new['width']
+    last_column = column_letter(max(width, 1))
+    block_rows = new['block_rows']
+    cells = 0
+    data = []
+
+    def flush():
+        if data:
+            body = {'valueInputOption': 'USER_ENTERED', 'data': list(data)}
+            execute(lambda sheets: sheets.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body=body
+            ))
+            data.clear()
+
+    blocks = iter_blocks(csv_file, block_rows)
+    next(blocks, None)
+    for index, block in enumerate(blocks):
+        if index < len(old['blocks']) and old['blocks'][index] == new['blocks'][index]:
+            continue
+        # Row 1 holds the header
+        first_row = index * block_rows + 2
+        data.append({
+            'range': f"A{first_row}:{last_column}{first_row + len(block) - 1}",
+            'values': [row + [''] * (width - len(row)) for row in block],
+        })
+        cells += len(block) * width
+        if len(data) >= BLOCKS_PER_REQUEST:
+            flush()
+    flush()
+    return cells, sheet_id
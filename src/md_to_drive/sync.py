@@ -3,37 +3,301 @@ Core synchronization logic for MD-to-Drive
 """
 
 import os
+import json
+import logging
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict, Iterable, Iterator, Sequence, Tuple, Union
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 
-from .auth import GoogleAuthenticator
+from .assets import AssetUploader
+from .auth import CredentialPool, TokenCache
+from .convert import ConversionPool
 from .converter import FileTypeDetector, MarkdownConverter, CSVConverter
-from .cache import SyncCache
+from .folders import FolderResolver
+from .cache import SyncCache, UploadSessions
+from .metrics import SyncMetrics
+from .schedule import DEFAULT_LOOKAHEAD, CostModel, conversion_kind, schedule
+from .shard import in_shard
+from .transport import DEFAULT_TRANSPORT
+from . import docs, sheets
+
+logger = logging.getLogger(__name__)
+
+# CSVs are split into one sheet per chunk past these limits (Sheets allows
+# 10 million cells per spreadsheet, and large imports tend to time out)
+CSV_CHUNK_ROWS = 200_000
+CSV_CHUNK_CELLS = 5_000_000
+
+# Resumable uploads are sent in chunks of this size (a multiple of 256 KiB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def walk_directory(directory: Path, recursive: bool, exclude: Sequence[str],
+                   shard: Optional[Tuple[int, int]] = None,
+                   on_directory: Optional[Callable[[Path], object]] = None) -> Iterator[Tuple[Path, List[Path]]]:
+    """
+    Walk a directory for the files a sync would consider (shared by sync and plan)
+
+    Args:
+        directory: Local directory path
+        recursive: Include subdirectories
+        exclude: List of patterns to exclude
+        shard: Optional (index, total) to only keep this shard's files
+        on_directory: Optional callback for each directory walked (before its files)
+
+    Yields:
+        Tuples of (directory, its files to sync in sorted order)
+    """
+    for dirpath, dirnames, filenames in os.walk(directory):
+        if on_directory:
+            on_directory(Path(dirpath))
+        dirnames.sort()
+        if not recursive:
+            dirnames.clear()
+
+        files = []
+        for name in sorted(filenames):
+            file_path = Path(dirpath) / name
+            if any(file_path.match(pattern) for pattern in exclude):
+                continue
+            # Keep only this shard's files
+            if shard and not in_shard(file_path.relative_to(directory), shard):
+                continue
+            files.append(file_path)
+        yield Path(dirpath), files
+
+
+class SyncResult:
+    """Outcome of syncing one file"""
+
+    # Possible values of `action`
+    ACTIONS = ('created', 'updated', 'skipped', 'renamed', 'pruned', 'unsupported', 'failed')
+
+    def __init__(self, path: Path, action: str, drive_id: Optional[str] = None, bytes_uploaded: int = 0,
+                 duration: float = 0.0, error: Optional[str] = None):
+        self.path = path
+        self.action = action
+        self.drive_id = drive_id
+        self.bytes = bytes_uploaded
+        self.duration = duration
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        """Whether the file was synced or skipped without error"""
+        return self.action != 'failed'
+
+    def to_dict(self) -> dict:
+        return {
+            'path': str(self.path),
+            'action': self.action,
+            'drive_id': self.drive_id,
+            'bytes': self.bytes,
+            'duration': round(self.duration, 6),
+            'error': self.error,
+        }
+
+    def __repr__(self):
+        return f"SyncResult({str(self.path)!r}, {self.action!r}, drive_id={self.drive_id!r})"
+
+
+class UploadStatusRequest:
+    """Ask the server how much of an interrupted resumable upload it committed"""
+
+    # Not an upload itself: run with execute() even when progress is reported
+    resumable = None
+
+    def __init__(self, http, uri: str, size: int, method_id: Optional[str] = None):
+        """
+        Initialize upload status request
+
+        Args:
+            http: Authorized HTTP object to send the request with
+            uri: Upload session URI
+            size: Total size of the upload in bytes
+            method_id: API method the upload belongs to (for metrics)
+        """
+        self.http = http
+        self.uri = uri
+        self.size = size
+        self.methodId = method_id
+
+    def execute(self) -> dict:
+        """
+        Send the status query (an empty PUT with `Content-Range: bytes */size`)
+
+        Returns:
+            {'offset': bytes committed}, plus 'response' (the uploaded file
+            resource) if the upload already completed
+
+        Raises:
+            HttpError: If the server rejects the query (404/410 for an expired session)
+        """
+        response, content = self.http.request(self.uri, method='PUT', body=b'', headers={
+            'Content-Length': '0',
+            'Content-Range': f"bytes */{self.size}",
+        })
+        if response.status == 308:
+            committed = response.get('range')
+            return {'offset': int(committed.rsplit('-', 1)[1]) + 1 if committed else 0}
+        if response.status in (200, 201):
+            return {'offset': self.size, 'response': json.loads(content.decode('utf-8'))}
+        raise HttpError(response, content, uri=self.uri)
 
 
 class GoogleDriveSync:
     """Main sync class for uploading files to Google Drive"""
 
-    def __init__(self, credentials_file='credentials.json', folder_id: Optional[str] = None, use_cache: bool = True):
+    def __init__(self, credentials_file: Union[str, Sequence[str]] = 'credentials.json', folder_id: Optional[str] = None,
+                 use_cache: bool = True, cache_file: str = 'cache/.sync_cache.json', api_endpoint: Optional[str] = None,
+                 metrics: Optional[SyncMetrics] = None, upload_images: bool = True,
+                 transport: str = DEFAULT_TRANSPORT, convert_workers: int = 0):
         """
         Initialize Google Drive sync
 
         Args:
-            credentials_file: Path to service account JSON
+            credentials_file: Path to service account JSON, or a list of paths to
+                spread requests across several accounts' quotas
             folder_id: Optional Google Drive folder ID to sync to
             use_cache: Whether to use caching system (default: True)
+            cache_file: Path to cache file (access tokens and interrupted upload
+                sessions are kept alongside it)
+            api_endpoint: Optional root URL to send API requests to instead of Google's
+                (defaults to $MD_TO_DRIVE_API_ENDPOINT; used with the fake server in tests)
+            metrics: Optional SyncMetrics to record the run in (one is created if omitted)
+            upload_images: Upload local images referenced from Markdown to a shared
+                assets folder and link documents to them
+            transport: HTTP transport shared by all workers: 'urllib3' (pooled
+                keep-alive, default), 'http2' (needs httpx) or 'httplib2'
+            convert_workers: Processes converting large Markdown and code files
+                alongside the uploads (default: 0, converting in the sync threads).
+                Scripts that set it need an `if __name__ == '__main__':` guard
         """
-        self.auth = GoogleAuthenticator(credentials_file)
-        self.service = self.auth.authenticate()
+        token_cache = TokenCache(os.path.join(os.path.dirname(cache_file), '.token_cache.json'))
+        self.pool = CredentialPool(credentials_file, token_cache, api_endpoint, transport)
+        self.metrics = metrics or SyncMetrics()
+        self.pool.metrics = self.metrics
+        self.auth = self.pool.authenticators[0]
+        self.service = self.pool.authenticate()
         self.folder_id = folder_id or os.getenv('GOOGLE_DRIVE_FOLDER_ID')
         self.use_cache = use_cache
-        self.cache = SyncCache() if use_cache else None
+        self.cache = SyncCache(cache_file) if use_cache else None
+        self.uploads = UploadSessions(os.path.join(os.path.dirname(cache_file), '.upload_sessions.json')) \
+            if use_cache else None
+        self.assets = AssetUploader(self) if upload_images else None
+        self.conversions = ConversionPool(convert_workers)
+        self.csv_chunk_rows = CSV_CHUNK_ROWS
+        self.csv_chunk_cells = CSV_CHUNK_CELLS
+        self.upload_chunk_size = UPLOAD_CHUNK_SIZE
+        # Set while syncing a shard: other jobs may be creating the same folders
+        self.shard: Optional[Tuple[int, int]] = None
 
         if self.use_cache:
             self.cache.load()
 
+    def _execute(self, make_request, on_progress=None, api: str = 'drive'):
+        """
+        Execute a Drive API request using the credential pool
+
+        Args:
+            make_request: Function taking a Drive service and returning a request
+            on_progress: Optional callback(bytes_sent, total_bytes) for resumable uploads
+            api: 'sheets' to pass make_request a Sheets service instead
+
+        Returns:
+            API response
+        """
+        return self.pool.execute(make_request, on_progress, api)
+
+    def _upload(self, make_request, upload_file: str, upload_key: Optional[str], target: Optional[str] = None,
+                on_progress=None):
+        """
+        Execute a resumable upload, continuing an interrupted earlier attempt
+
+        Uploads larger than one chunk record their session URI and the bytes
+        the server acknowledged after every chunk, so a later run (or a retry
+        after a dropped connection) sends only what is missing. A saved session
+        is only reused for the same content going to the same file, after
+        asking the server how much of it was committed.
+
+        Args:
+            make_request: Function taking a Drive service and returning the upload request
+            upload_file: Path of the file being uploaded
+            upload_key: Key identifying the upload across runs (None to not persist it)
+            target: Drive ID of the file being replaced (None when creating one)
+            on_progress: Optional callback(bytes_sent, total_bytes)
+
+        Returns:
+            API response
+        """
+        size = os.path.getsize(upload_file)
+        if upload_key is None or self.uploads is None or size <= self.upload_chunk_size:
+            return self._execute(make_request, on_progress)
+
+        with self.metrics.phase('hash'):
+            content_hash = SyncCache.get_file_hash(upload_file)
+        requests = []
+        resumed = []
+
+        def make_status_request(service):
+            request = make_request(service)
+            return UploadStatusRequest(request.http, session['uri'], size, f"{request.methodId}.status")
+
+        session = self.uploads.get(upload_key, content_hash, target)
+        if session:
+            try:
+                status = self._execute(make_status_request)
+            except HttpError as error:
+                if error.resp.status not in (404, 410):
+                    raise
+                logger.debug("🔁 Upload session of %s expired, restarting", upload_file)
+                self.uploads.forget(upload_key)
+            else:
+                if 'response' in status:
+                    # The last chunk went through but the run ended before it was recorded
+                    self.uploads.forget(upload_key)
+                    return status['response']
+                self.uploads.record(upload_key, content_hash, target, session['uri'], status['offset'])
+
+        def make_resumable(service):
+            request = make_request(service)
+            # Continue from what the server acknowledged (also when retrying on another account)
+            session = self.uploads.get(upload_key, content_hash, target)
+            if session:
+                request.resumable_uri = session['uri']
+                request.resumable_progress = session['offset']
+                resumed.append(session)
+            requests.append(request)
+            return request
+
+        def progress(sent: int, total: int):
+            if sent < total:
+                self.uploads.record(upload_key, content_hash, target, requests[-1].resumable_uri, sent)
+            if on_progress:
+                on_progress(sent, total)
+
+        try:
+            response = self._execute(make_resumable, progress)
+        except HttpError as error:
+            # Expired or unknown session: start over with a new one
+            if not resumed or error.resp.status not in (404, 410):
+                raise
+            logger.debug("🔁 Upload session of %s expired, restarting", upload_file)
+            self.uploads.forget(upload_key)
+            response = self._execute(make_resumable, progress)
+        else:
+            if resumed:
+                logger.info("⏯️  Resumed upload of %s at %.1f MB", upload_file, resumed[0]['offset'] / 2 ** 20,
+                            extra={'event': 'upload_resumed', 'path': str(upload_file),
+                                   'bytes_sent': resumed[0]['offset']})
+                self.metrics.count('uploads_resumed')
+        self.uploads.forget(upload_key)
+        return response
+
     def get_or_create_folder(self, name: str, parent_id: Optional[str] = None) -> str:
         """
         Get existing folder or create if it doesn't exist
@@ -48,20 +312,11 @@ class GoogleDriveSync:
         parent_id = parent_id or 'root'
 
         try:
-            # Search for existing folder
-            query = f"name='{name}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name)',
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
-
-            files = results.get('files', [])
+            # Search for existing folder (oldest first, so concurrent shards agree on one)
+            files = self._find_folders(name, parent_id)
 
             if files:
-                print(f"📁 Found existing folder: {name}")
+                logger.debug("📁 Found existing folder: %s", name)
                 return files[0]['id']
 
             # Create new folder if it doesn't exist
@@ -73,17 +328,53 @@ class GoogleDriveSync:
             if parent_id:
                 folder_metadata['parents'] = [parent_id]
 
-            folder = self.service.files().create(
+            folder = self._execute(lambda service: service.files().create(
                 body=folder_metadata,
                 fields='id',
                 supportsAllDrives=True
-            ).execute()
-            print(f"📁 Created folder: {name}")
+            ))
+
+            if self.shard:
+                # Another shard may have created the same folder concurrently:
+                # keep the oldest one and drop ours so every shard uses the same ID
+                files = self._find_folders(name, parent_id)
+                if files and files[0]['id'] != folder['id']:
+                    self._execute(lambda service: service.files().delete(
+                        fileId=folder['id'],
+                        supportsAllDrives=True
+                    ))
+                    logger.info("📁 Found existing folder: %s (created by another shard)", name)
+                    return files[0]['id']
+
+            logger.info("📁 Created folder: %s", name, extra={'event': 'folder_created', 'drive_id': folder['id']})
             return folder['id']
 
         except HttpError as error:
             raise Exception(f"Error with folder '{name}': {error}")
 
+    def _find_folders(self, name: str, parent_id: str) -> List[dict]:
+        """
+        List folders with the given name under a parent, oldest first
+
+        Args:
+            name: Folder name
+            parent_id: Parent folder ID
+
+        Returns:
+            List of folder resources (id, name)
+        """
+        query = f"name='{name}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents and trashed=false"
+        results = self._execute(lambda service: service.files().list(
+            q=query,
+            spaces='drive',
+            fields='files(id, name)',
+            orderBy='createdTime',
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True
+        ))
+
+        return results.get('files', [])
+
     def create_folder(self, name: str, parent_id: Optional[str] = None) -> str:
         """
         Create folder in Google Drive (legacy method, use get_or_create_folder)
@@ -108,31 +399,20 @@ class GoogleDriveSync:
         Returns:
             Dictionary mapping local paths to Google Drive folder IDs
         """
-        folders = {}
         parent_id = parent_id or self.folder_id or 'root'
-
-        # Create main folder
-        main_folder_name = base_path.name
-        main_folder_id = self.create_folder(main_folder_name, parent_id)
-        folders[str(base_path)] = main_folder_id
-
-        # Create subdirectories
-        for subdir in base_path.rglob('*'):
-            if subdir.is_dir():
-                relative_path = subdir.relative_to(base_path.parent)
-                parent_path = subdir.parent
-
-                if str(parent_path) in folders:
-                    parent_folder_id = folders[str(parent_path)]
-                else:
-                    parent_folder_id = main_folder_id
-
-                folder_id = self.create_folder(subdir.name, parent_folder_id)
-                folders[str(subdir)] = folder_id
-
-        return folders
-
-    def markdown_to_doc(self, md_file: Path, folder_id: Optional[str] = None, custom_name: Optional[str] = None) -> str:
+        resolver = FolderResolver(self, base_path, parent_id)
+        try:
+            # Sibling subtrees resolve in parallel; each folder waits only for its parent
+            resolver.folder(base_path)
+            for subdir in base_path.rglob('*'):
+                if subdir.is_dir():
+                    resolver.folder(subdir)
+            return resolver.results()
+        finally:
+            resolver.shutdown()
+
+    def markdown_to_doc(self, md_file: Path, folder_id: Optional[str] = None, custom_name: Optional[str] = None,
+                        cache_key: Optional[str] = None) -> str:
         """
         Convert and upload markdown file to Google Docs (update if exists)
 
@@ -140,79 +420,122 @@ class GoogleDriveSync:
             md_file: Path to markdown file
             folder_id: Target Google Drive folder ID
             custom_name: Optional custom name for the document
+            cache_key: Cache key (defaults to the target folder and file name)
 
         Returns:
             Google Doc ID
         """
+        return self._markdown_to_doc(md_file, folder_id, custom_name, cache_key).drive_id
+
+    def _markdown_to_doc(self, md_file: Path, folder_id: Optional[str] = None, custom_name: Optional[str] = None,
+                         cache_key: Optional[str] = None, prepared: Optional[dict] = None) -> SyncResult:
+        """Sync a markdown file (see markdown_to_doc) and report what was done"""
         md_file = Path(md_file)
         folder_id = folder_id or self.folder_id or 'root'
 
-        # Check cache
-        if self.use_cache:
-            should_sync, reason = self.cache.should_sync(md_file)
-            if not should_sync:
-                print(f"⏭️  Skipped: {md_file} ({reason})")
-                return self.cache.cache[str(md_file)].get('drive_id')
-            print(f"📤 Syncing: {md_file} ({reason})")
+        # Check cache (unless the conversion stage already did)
+        cache_key = cache_key or self._cache_key(md_file, folder_id)
+        if prepared is None:
+            prepared = self._prepare_doc(md_file, cache_key)
+        images = prepared['images']
+        if not prepared['sync']:
+            logger.debug("⏭️  Skipped: %s (%s)", md_file, prepared['reason'])
+            self.metrics.count('files_skipped')
+            return SyncResult(md_file, 'skipped', self.cache.cache[cache_key].get('drive_id'))
+        if prepared['reason']:
+            logger.debug("📤 Syncing: %s (%s)", md_file, prepared['reason'])
         else:
-            print(f"📤 Syncing: {md_file}")
+            logger.debug("📤 Syncing: %s", md_file)
 
-        converter = MarkdownConverter()
-        file_metadata = converter.prepare_for_upload(md_file)
+        image_urls = self.assets.resolve(images) if images else None
+
+        file_metadata = prepared.get('converted')
+        if file_metadata is None:
+            with self.metrics.phase('convert'):
+                file_metadata = self.conversions.convert(self._converter_for(md_file, MarkdownConverter), md_file, image_urls,
+                                                         sections=self.use_cache)
 
         if custom_name:
             file_metadata['name'] = custom_name
 
         file_name = file_metadata['name']
+        upload_mimetype = file_metadata['mimeType']
         temp_file = file_metadata.get('temp_file')  # Get temp file if code formatting was applied
+        sections = file_metadata.pop('sections', None)
+
+        # Use temp file if available (code formatting), otherwise use original
+        upload_file = temp_file if temp_file else str(md_file)
 
         try:
+            if self.use_cache:
+                entry = self.cache.lookup(cache_key, md_file) or {}
+                if entry.get('sections') and entry.get('drive_id') and len(image_urls or {}) == len(images):
+                    result = self._update_doc_sections(md_file, entry, sections, cache_key, images)
+                    if result is not None:
+                        if temp_file and os.path.exists(temp_file):
+                            os.unlink(temp_file)
+                        return result
+
             # Check if file already exists
             query = f"name='{file_name}' and mimeType='application/vnd.google-apps.document' and '{folder_id}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name)',
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
+            with self.metrics.phase('lookup'):
+                results = self._execute(lambda service: service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields='files(id, name)',
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True
+                ))
 
             files = results.get('files', [])
 
-            # Use temp file if available (code formatting), otherwise use original
-            upload_file = temp_file if temp_file else str(md_file)
-            media = MediaFileUpload(upload_file, mimetype='text/markdown', resumable=True)
+            media = MediaFileUpload(upload_file, mimetype=upload_mimetype, resumable=True,
+                                    chunksize=self.upload_chunk_size)
+            upload_key = cache_key if self.use_cache else None
 
             if files:
                 # Update existing file
-                doc = self.service.files().update(
-                    fileId=files[0]['id'],
-                    media_body=media,
-                    supportsAllDrives=True
-                ).execute()
-                print(f"🔄 Updated: {md_file} → Google Doc (ID: {doc['id']})")
+                with self.metrics.phase('upload'):
+                    doc = self._upload(lambda service: service.files().update(
+                        fileId=files[0]['id'],
+                        media_body=media,
+                        supportsAllDrives=True
+                    ), upload_file, upload_key, files[0]['id'])
+                logger.info("🔄 Updated: %s → Google Doc (ID: %s)", md_file, doc['id'],
+                            extra={'event': 'file_updated', 'path': str(md_file), 'drive_id': doc['id']})
+                self.metrics.count('files_updated')
+                action = 'updated'
             else:
                 # Create new file - direct upload with conversion
                 file_metadata['mimeType'] = 'application/vnd.google-apps.document'
                 file_metadata['parents'] = [folder_id]
 
-                doc = self.service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id',
-                    supportsAllDrives=True
-                ).execute()
-                print(f"✅ Created: {md_file} → Google Doc (ID: {doc['id']})")
-
-            # Update cache
-            if self.use_cache:
-                self.cache.update(md_file, doc['id'])
+                with self.metrics.phase('upload'):
+                    doc = self._upload(lambda service: service.files().create(
+                        body=file_metadata,
+                        media_body=media,
+                        fields='id',
+                        supportsAllDrives=True
+                    ), upload_file, upload_key)
+                logger.info("✅ Created: %s → Google Doc (ID: %s)", md_file, doc['id'],
+                            extra={'event': 'file_created', 'path': str(md_file), 'drive_id': doc['id']})
+                self.metrics.count('files_created')
+                action = 'created'
+
+            # Update cache (unless an image failed to upload, so the next run retries it)
+            if self.use_cache and len(image_urls or {}) == len(images):
+                with self.metrics.phase('hash'):
+                    self.cache.update(md_file, doc['id'], cache_key, images,
+                                      outline=[section.outline for section in sections],
+                                      sections=[section.hash for section in sections])
+
+            uploaded = os.path.getsize(upload_file)
 
             # Clean up temp file
             if temp_file and os.path.exists(temp_file):
                 os.unlink(temp_file)
 
-            return doc['id']
+            return SyncResult(md_file, action, doc['id'], uploaded)
 
         except HttpError as error:
             # Clean up temp file on error
@@ -220,6 +543,143 @@ class GoogleDriveSync:
                 os.unlink(temp_file)
             raise Exception(f"Error syncing {md_file}: {error}")
 
+    def _prepare_doc(self, md_file: Path, cache_key: str, convert: bool = False) -> dict:
+        """
+        Check whether a file needs syncing as a Google Doc, converting it ahead of upload if asked
+
+        Args:
+            md_file: Path to markdown (or other Docs-bound) file
+            cache_key: Cache key for the file
+            convert: Also convert the file if it needs syncing and embeds no local images
+
+        Returns:
+            Dictionary with sync (bool), reason, images (local images it embeds)
+            and converted (upload metadata, when converted)
+        """
+        # Local images are part of the document, so they count towards its hash
+        images = self._local_images(md_file)
+
+        should_sync, reason = True, None
+        if self.use_cache:
+            with self.metrics.phase('hash'):
+                should_sync, reason = self.cache.should_sync(md_file, cache_key, images)
+
+        prepared = {'sync': should_sync, 'reason': reason, 'images': images}
+        # Image links point at the uploaded copies, which only exist at upload time
+        if should_sync and convert and not images:
+            with self.metrics.phase('convert'):
+                prepared['converted'] = self.conversions.convert(self._converter_for(md_file, MarkdownConverter), md_file,
+                                                                 sections=self.use_cache)
+        return prepared
+
+    @staticmethod
+    def _converter_for(file_path: Path, default):
+        """Get the registered converter for a file if it converts to the same type as `default`"""
+        try:
+            converter = FileTypeDetector.get_converter(file_path)
+        except ValueError:
+            return default
+        if converter.get_conversion_mimetype() != default.get_conversion_mimetype():
+            return default
+        return converter
+
+    def _update_doc_sections(self, md_file: Path, entry: dict, sections: List[docs.Section], cache_key: str,
+                             images: Sequence[Path]) -> Optional[SyncResult]:
+        """
+        Rewrite only the sections of a synced Google Doc that changed
+
+        Args:
+            md_file: Path to markdown file
+            entry: The file's cache entry (with the section hashes of the synced version)
+            sections: Sections of the Markdown as it would be uploaded
+            cache_key: Cache key for the file
+            images: Local images embedded in the document
+
+        Returns:
+            SyncResult, or None if the document should be re-uploaded instead
+        """
+        changed = docs.changed_sections(entry, sections)
+        if changed is None:
+            logger.debug("📤 Re-uploading %s (sections changed too much)", md_file)
+            return None
+
+        drive_id = entry['drive_id']
+        try:
+            with self.metrics.phase('upload'):
+                updated = not changed or docs.update_sections(
+                    lambda make_request: self._execute(make_request, api='docs'),
+                    drive_id, sections, changed)
+        except HttpError as error:
+            # Deleted document, Docs API not enabled...: fall back to a full upload
+            logger.warning("⚠️  Could not update %s in place, re-uploading: %s", md_file, error)
+            return None
+        if not updated:
+            logger.debug("📤 Re-uploading %s (document headings differ from the Markdown)", md_file)
+            return None
+
+        with self.metrics.phase('hash'):
+            self.cache.update(md_file, drive_id, cache_key, images,
+                              outline=[section.outline for section in sections],
+                              sections=[section.hash for section in sections])
+
+        if not changed:
+            logger.debug("⏭️  Skipped: %s (no section changed)", md_file)
+            self.metrics.count('files_skipped')
+            return SyncResult(md_file, 'skipped', drive_id)
+
+        logger.info("🔄 Updated: %s → Google Doc (%d of %d sections rewritten)", md_file, len(changed),
+                    len(sections), extra={'event': 'file_updated', 'path': str(md_file), 'drive_id': drive_id})
+        self.metrics.count('files_updated')
+        self.metrics.count('doc_sections_updated', len(changed))
+        return SyncResult(md_file, 'updated', drive_id,
+                          sum(len(sections[i].body.encode('utf-8')) for i in changed))
+
+    def _local_images(self, md_file: Path) -> List[Path]:
+        """
+        Find local images referenced by a Markdown file
+
+        Args:
+            md_file: Path to markdown file
+
+        Returns:
+            Resolved image paths (empty when image uploads are disabled)
+        """
+        if self.assets is None or md_file.suffix.lower() not in ('.md', '.markdown'):
+            return []
+        with self.metrics.phase('convert'):
+            try:
+                md_content = md_file.read_text(encoding='utf-8')
+            except (OSError, UnicodeDecodeError):
+                return []
+            if '![' not in md_content:
+                return []
+            return MarkdownConverter.find_local_images(md_content, md_file.parent)
+
+    def _cache_key(self, file_path: Path, folder_id: str, sync_root: Optional[Path] = None) -> str:
+        """
+        Get the cache key for a file being synced into a folder
+
+        Files inside a directory being synced are keyed by the sync's root
+        folder and their path relative to the directory's parent (the layout
+        mirrored on Drive), so `docs/`, `./docs` and absolute paths share
+        entries. Standalone files are keyed by their target folder and name.
+
+        Args:
+            file_path: Local file path
+            folder_id: Target Google Drive folder ID
+            sync_root: Resolved parent of the directory being synced, if any
+
+        Returns:
+            Cache key string
+        """
+        if sync_root is not None:
+            try:
+                relative_path = file_path.resolve().relative_to(sync_root)
+                return SyncCache.make_key(self.folder_id or 'root', relative_path)
+            except ValueError:
+                pass
+        return SyncCache.make_key(folder_id, Path(file_path.name))
+
     def csv_to_sheet(self, csv_file: Path, folder_id: Optional[str] = None, custom_name: Optional[str] = None) -> str:
         """
         Convert and upload CSV file to Google Sheets (update if exists)
@@ -232,132 +692,735 @@ class GoogleDriveSync:
         Returns:
             Google Sheet ID
         """
+        return self._csv_to_sheet(csv_file, folder_id, custom_name).drive_id
+
+    def _csv_to_sheet(self, csv_file: Path, folder_id: Optional[str] = None,
+                      custom_name: Optional[str] = None, cache_key: Optional[str] = None) -> SyncResult:
+        """Sync a CSV file (see csv_to_sheet) and report what was done"""
         csv_file = Path(csv_file)
         folder_id = folder_id or self.folder_id or 'root'
 
-        converter = CSVConverter()
+        converter = self._converter_for(csv_file, CSVConverter)
         file_metadata = converter.prepare_for_upload(csv_file)
 
         if custom_name:
             file_metadata['name'] = custom_name
 
         file_name = file_metadata['name']
+        temp_file = file_metadata.get('temp_file')  # CSV produced by a registered converter
+
+        # Sheets are built from the converted CSV; the cache tracks the original file
+        upload_file = Path(temp_file) if temp_file else csv_file
 
         try:
-            # Check if file already exists
-            query = f"name='{file_name}' and mimeType='application/vnd.google-apps.spreadsheet' and '{folder_id}' in parents and trashed=false"
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name, webViewLink)',
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True
-            ).execute()
+            cache_key = cache_key or self._cache_key(csv_file, folder_id)
+            entry = {}
+            if self.use_cache:
+                with self.metrics.phase('hash'):
+                    should_sync, reason = self.cache.should_sync(csv_file, cache_key)
+                entry = self.cache.lookup(cache_key, csv_file) or {}
+                if not should_sync and (entry.get('blocks') is not None or entry.get('chunks')):
+                    logger.debug("⏭️  Skipped: %s (%s)", csv_file, reason)
+                    self.metrics.count('files_skipped')
+                    return SyncResult(csv_file, 'skipped', entry.get('drive_id'))
+
+            # Large CSVs are split so no single import hits Sheets' limits. A CSV
+            # synced in several parts stays chunked so sheets of parts it lost are removed
+            with self.metrics.phase('convert'):
+                chunked = CSVConverter.needs_chunking(upload_file, self.csv_chunk_rows, self.csv_chunk_cells)
+            if chunked or len(entry.get('chunks', [])) > 1:
+                return self._csv_to_sheets_chunked(csv_file, folder_id, file_name, cache_key, entry, upload_file)
+
+            layout = None
+            if self.use_cache:
+                with self.metrics.phase('convert'):
+                    layout = sheets.csv_layout(upload_file)
+                if entry.get('blocks') is not None and entry.get('drive_id') and sheets.same_columns(entry, layout):
+                    result = self._update_sheet_rows(csv_file, entry, layout, cache_key, upload_file)
+                    if result is not None:
+                        return result
+
+            sheet, created = self._upload_sheet(upload_file, file_name, folder_id, file_metadata.get('description'),
+                                                upload_key=cache_key)
+            if layout is not None:
+                with self.metrics.phase('hash'):
+                    self.cache.update(csv_file, sheet['id'], cache_key, **layout)
+            if created:
+                logger.info("✅ Created: %s → Google Sheet\n   View at: %s", csv_file, sheet.get('webViewLink'),
+                            extra={'event': 'file_created', 'path': str(csv_file), 'drive_id': sheet['id']})
+                self.metrics.count('files_created')
+                action = 'created'
+            else:
+                logger.info("🔄 Updated: %s → Google Sheet\n   View at: %s", csv_file, sheet.get('webViewLink'),
+                            extra={'event': 'file_updated', 'path': str(csv_file), 'drive_id': sheet['id']})
+                self.metrics.count('files_updated')
+                action = 'updated'
+
+            return SyncResult(csv_file, action, sheet['id'], os.path.getsize(upload_file))
+
+        except HttpError as error:
+            raise Exception(f"Error syncing {csv_file}: {error}")
+
+        finally:
+            if temp_file and os.path.exists(temp_file):
+                os.unlink(temp_file)
 
+    def _update_sheet_rows(self, csv_file: Path, entry: dict, layout: dict, cache_key: str,
+                           upload_file: Optional[Path] = None) -> Optional[SyncResult]:
+        """
+        Rewrite only the rows of a synced sheet that changed
+
+        Args:
+            csv_file: Path to CSV file
+            entry: The file's cache entry (with the layout the sheet holds)
+            layout: Layout of the current CSV (see sheets.csv_layout)
+            cache_key: Cache key for the file
+            upload_file: CSV the sheet is built from, if converted from csv_file
+
+        Returns:
+            SyncResult, or None if the sheet couldn't be patched (re-import it)
+        """
+        drive_id = entry['drive_id']
+        upload_file = upload_file or csv_file
+        patched = self._patch_sheet(upload_file, entry, layout)
+        if patched is None:
+            return None
+        cells, sheet_id = patched
+
+        fields = dict(layout)
+        if sheet_id is not None:
+            fields['sheet_id'] = sheet_id
+        with self.metrics.phase('hash'):
+            self.cache.update(csv_file, drive_id, cache_key, **fields)
+
+        logger.info("🔄 Updated: %s → Google Sheet (%d cells rewritten)", csv_file, cells,
+                    extra={'event': 'file_updated', 'path': str(csv_file), 'drive_id': drive_id})
+        self.metrics.count('files_updated')
+        self.metrics.count('sheet_cells_updated', cells)
+        return SyncResult(csv_file, 'updated', drive_id, os.path.getsize(upload_file))
+
+    def _patch_sheet(self, csv_file: Path, entry: dict, layout: dict) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Write the changed blocks of a CSV to the sheet holding its previous layout
+
+        Args:
+            csv_file: CSV file (or chunk) the sheet should hold
+            entry: Cache entry of the sheet (drive_id and the layout it holds)
+            layout: Layout of the CSV (see sheets.csv_layout)
+
+        Returns:
+            Tuple of (cells written, sheet ID), or None if the sheet couldn't be patched (re-import it)
+        """
+        try:
+            with self.metrics.phase('upload'):
+                return sheets.update_changed_rows(
+                    lambda make_request: self._execute(make_request, api='sheets'),
+                    entry['drive_id'], csv_file, entry, layout, entry.get('sheet_id'))
+        except HttpError as error:
+            # Deleted sheet, edited grid, Sheets API not enabled...: fall back to a full import
+            logger.warning("⚠️  Could not update %s in place, re-importing: %s", csv_file, error)
+            return None
+
+    def _upload_sheet(self, upload_file: Path, name: str, folder_id: str, description: Optional[str] = None,
+                      existing_id: Optional[str] = None, upload_key: Optional[str] = None) -> Tuple[dict, bool]:
+        """
+        Upload a CSV as a Google Sheet, replacing the sheet of the same name if there is one
+
+        Args:
+            upload_file: CSV file to upload
+            name: Sheet name
+            folder_id: Target Google Drive folder ID
+            description: Optional file description for new sheets
+            existing_id: ID of the sheet to replace, if already known (skips the lookup)
+            upload_key: Key to persist the upload session under, so an interrupted
+                upload resumes on the next run (see _upload)
+
+        Returns:
+            Tuple of (file resource with id and webViewLink, whether it was created)
+        """
+        if existing_id is None:
+            query = f"name='{name}' and mimeType='application/vnd.google-apps.spreadsheet' and '{folder_id}' in parents and trashed=false"
+            with self.metrics.phase('lookup'):
+                results = self._execute(lambda service: service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields='files(id, name, webViewLink)',
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True
+                ))
             files = results.get('files', [])
-            media = MediaFileUpload(str(csv_file), mimetype='text/csv', resumable=True)
+            existing_id = files[0]['id'] if files else None
 
-            if files:
+        media = MediaFileUpload(str(upload_file), mimetype='text/csv', resumable=True,
+                                chunksize=self.upload_chunk_size)
+
+        def on_progress(sent: int, total: int):
+            logger.info("⬆️  %s: %d%% (%.1f of %.1f MB)", name, sent * 100 // max(total, 1), sent / 2 ** 20,
+                        total / 2 ** 20, extra={'event': 'upload_progress', 'bytes_sent': sent, 'total_bytes': total})
+
+        with self.metrics.phase('upload'):
+            if existing_id:
                 # Update existing file
-                sheet = self.service.files().update(
-                    fileId=files[0]['id'],
+                sheet = self._upload(lambda service: service.files().update(
+                    fileId=existing_id,
                     media_body=media,
                     fields='id,webViewLink',
                     supportsAllDrives=True
-                ).execute()
-                print(f"🔄 Updated: {csv_file} → Google Sheet")
-                print(f"   View at: {sheet.get('webViewLink')}")
-            else:
-                # Create new file
-                file_metadata['mimeType'] = converter.get_conversion_mimetype()
-                file_metadata['parents'] = [folder_id]
+                ), str(upload_file), upload_key, existing_id, on_progress)
+                return sheet, False
 
-                sheet = self.service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id,webViewLink',
-                    supportsAllDrives=True
-                ).execute()
-                print(f"✅ Created: {csv_file} → Google Sheet")
-                print(f"   View at: {sheet.get('webViewLink')}")
+            # Create new file
+            metadata = {
+                'name': name,
+                'mimeType': CSVConverter.get_conversion_mimetype(),
+                'parents': [folder_id],
+            }
+            if description:
+                metadata['description'] = description
+            sheet = self._upload(lambda service: service.files().create(
+                body=metadata,
+                media_body=media,
+                fields='id,webViewLink',
+                supportsAllDrives=True
+            ), str(upload_file), upload_key, on_progress=on_progress)
+            return sheet, True
 
-            return sheet['id']
+    def _csv_to_sheets_chunked(self, csv_file: Path, folder_id: str, file_name: str, cache_key: str,
+                               entry: Optional[dict] = None, upload_file: Optional[Path] = None) -> SyncResult:
+        """
+        Sync a large CSV as one Google Sheet per chunk
 
-        except HttpError as error:
-            raise Exception(f"Error syncing {csv_file}: {error}")
+        The first chunk keeps the sheet's plain name and later ones are named
+        "<name> (part N)". Chunk hashes, row counts and block layouts are
+        cached: unchanged chunks are skipped, and in a changed chunk with the
+        same columns only the changed rows are rewritten (like a small CSV),
+        otherwise the chunk is uploaded again. A chunk whose cached sheet is
+        gone from Drive is looked up by name or created again.
+
+        Args:
+            csv_file: Path to CSV file
+            folder_id: Target Google Drive folder ID
+            file_name: Base sheet name
+            cache_key: Cache key for the file
+            entry: The file's cache entry, if any
+            upload_file: CSV the sheets are built from, if converted from csv_file
 
-    def sync_file(self, file_path: Path, folder_id: Optional[str] = None) -> str:
+        Returns:
+            SyncResult (drive_id is the first chunk's sheet)
+        """
+        cached_chunks = (entry or {}).get('chunks', [])
+
+        chunks = []
+        uploaded = 0
+        uploaded_parts = 0
+        patched_parts = 0
+        created_first = False
+        with tempfile.TemporaryDirectory(prefix='md-to-drive-csv-') as directory:
+            with self.metrics.phase('convert'):
+                parts = CSVConverter.iter_chunks(upload_file or csv_file, self.csv_chunk_rows, self.csv_chunk_cells, directory)
+                chunk = next(parts, None)
+            while chunk is not None:
+                index = len(chunks)
+                cached = cached_chunks[index] if index < len(cached_chunks) else {}
+                chunk_path = Path(chunk['path'])
+                fields = {'hash': chunk['hash'], 'rows': chunk['rows']}
+                patched = None
+                if cached.get('hash') == chunk['hash'] and cached.get('drive_id'):
+                    # Unchanged: keep what the cache knows about its sheet
+                    fields = dict(cached)
+                    self.metrics.count('chunks_skipped')
+                elif self.use_cache:
+                    with self.metrics.phase('convert'):
+                        layout = sheets.csv_layout(chunk_path)
+                    fields.update(layout)
+                    if cached.get('blocks') is not None and cached.get('drive_id') \
+                            and sheets.same_columns(cached, layout):
+                        patched = self._patch_sheet(chunk_path, cached, layout)
+
+                if patched is not None:
+                    cells, sheet_id = patched
+                    fields['drive_id'] = cached['drive_id']
+                    if sheet_id is not None:
+                        fields['sheet_id'] = sheet_id
+                    patched_parts += 1
+                    self.metrics.count('chunks_patched')
+                    self.metrics.count('sheet_cells_updated', cells)
+                elif 'drive_id' not in fields:
+                    name = file_name if index == 0 else f"{file_name} (part {index + 1})"
+                    upload_key = f"{cache_key}#part{index + 1}"
+                    try:
+                        sheet, created = self._upload_sheet(chunk_path, name, folder_id,
+                                                            existing_id=cached.get('drive_id'), upload_key=upload_key)
+                    except HttpError as error:
+                        if error.resp.status != 404 or not cached.get('drive_id'):
+                            raise
+                        # Deleted on Drive: find or create it by name (its ID replaces the cached one)
+                        logger.warning("⚠️  Sheet for part %d of %s is gone from Drive, uploading it again",
+                                       index + 1, csv_file)
+                        sheet, created = self._upload_sheet(chunk_path, name, folder_id, upload_key=upload_key)
+                    fields['drive_id'] = sheet['id']
+                    created_first = created_first or (created and index == 0)
+                    uploaded += chunk['bytes']
+                    uploaded_parts += 1
+                    self.metrics.count('chunks_uploaded')
+                os.unlink(chunk['path'])
+                chunks.append(fields)
+                with self.metrics.phase('convert'):
+                    chunk = next(parts, None)
+
+        # The CSV shrank: remove sheets for chunks that no longer exist
+        for stale in cached_chunks[len(chunks):]:
+            try:
+                self._execute(lambda service: service.files().delete(
+                    fileId=stale['drive_id'],
+                    supportsAllDrives=True
+                ))
+            except HttpError as error:
+                if error.resp.status != 404:
+                    raise
+
+        if self.use_cache:
+            with self.metrics.phase('hash'):
+                self.cache.update(csv_file, chunks[0]['drive_id'], cache_key, chunks=chunks,
+                                  rows=sum(chunk['rows'] for chunk in chunks))
+
+        if not uploaded_parts and not patched_parts and len(chunks) == len(cached_chunks):
+            logger.debug("⏭️  Skipped: %s (no chunk changed)", csv_file)
+            self.metrics.count('files_skipped')
+            return SyncResult(csv_file, 'skipped', chunks[0]['drive_id'])
+
+        action = 'created' if created_first else 'updated'
+        logger.info("%s: %s → Google Sheet (%d parts, %d uploaded, %d updated in place)",
+                    '✅ Created' if created_first else '🔄 Updated', csv_file, len(chunks), uploaded_parts,
+                    patched_parts,
+                    extra={'event': f'file_{action}', 'path': str(csv_file), 'drive_id': chunks[0]['drive_id']})
+        self.metrics.count(f'files_{action}')
+        return SyncResult(csv_file, action, chunks[0]['drive_id'], uploaded)
+
+    def sync_file(self, file_path: Path, folder_id: Optional[str] = None, cache_key: Optional[str] = None) -> str:
         """
         Auto-detect file type and sync to Google Drive
 
         Args:
             file_path: Path to file
             folder_id: Target Google Drive folder ID
+            cache_key: Cache key (defaults to the target folder and file name)
 
         Returns:
             Google Drive file ID
         """
+        return self._sync_file(file_path, folder_id, cache_key).drive_id
+
+    def _sync_file(self, file_path: Path, folder_id: Optional[str] = None,
+                   cache_key: Optional[str] = None, prepared: Optional[dict] = None) -> SyncResult:
+        """Sync one file (see sync_file) and report what was done"""
         file_path = Path(file_path)
 
         try:
-            converter_class = FileTypeDetector.get_converter(file_path)
+            kind = FileTypeDetector.get_converter(file_path).get_conversion_mimetype()
 
-            if converter_class == MarkdownConverter:
-                return self.markdown_to_doc(file_path, folder_id)
-            elif converter_class == CSVConverter:
-                return self.csv_to_sheet(file_path, folder_id)
+            # Registered converters produce a Google Doc or a Sheet (imported as CSV)
+            if kind == MarkdownConverter.get_conversion_mimetype():
+                return self._markdown_to_doc(file_path, folder_id, cache_key=cache_key, prepared=prepared)
+            elif kind == CSVConverter.get_conversion_mimetype():
+                return self._csv_to_sheet(file_path, folder_id, cache_key=cache_key)
+            raise ValueError(f"Unsupported conversion target for {file_path.suffix}: {kind}")
 
         except ValueError as e:
-            print(f"⚠️  Skipped: {file_path} - {e}")
-            return None
+            logger.debug("⚠️  Skipped: %s - %s", file_path, e)
+            self.metrics.count('files_unsupported')
+            return SyncResult(file_path, 'unsupported', error=str(e))
 
-    def sync_directory(self, directory: Path, recursive: bool = True, exclude: Optional[List[str]] = None) -> Dict[str, str]:
+    def iter_sync(self, directory: Path, recursive: bool = True, exclude: Optional[List[str]] = None,
+                  shard: Optional[Tuple[int, int]] = None, workers: int = 1,
+                  progress=None, lookahead: int = DEFAULT_LOOKAHEAD) -> Iterator[SyncResult]:
         """
-        Sync entire directory to Google Drive
+        Sync a directory, yielding a result for each file as it completes
+
+        Files are discovered lazily and fed to `workers` threads through a
+        bounded queue, so memory stays flat however large the tree is. Drive
+        folders are resolved on separate workers as directories are found, and
+        each file starts as soon as its own folder exists. With several
+        workers, files bound for Google Docs are checked against the cache and
+        converted (large ones in worker processes) while their folders resolve
+        and earlier files upload, and files are started slowest first (within
+        a window that starts at one file per worker and widens to `lookahead`
+        files), using durations recorded in the cache.
+        The cache is saved when the iteration finishes or is abandoned.
 
         Args:
             directory: Local directory path
             recursive: Include subdirectories
             exclude: List of patterns to exclude
-
-        Returns:
-            Dictionary mapping local files to Google Drive IDs
+            shard: Optional (index, total) to only sync this shard's share of the files
+            workers: Number of files to sync concurrently
+            progress: Optional progress reporter with start(total), add(amount),
+                advance() and finish()
+            lookahead: Files buffered for cost-based ordering (0 keeps discovery order)
+
+        Yields:
+            SyncResult for every discovered file (in completion order)
         """
         directory = Path(directory)
-        exclude = exclude or []
-        synced_files = {}
+        self.shard = shard
+
+        # Every directory is resolved as the walk reaches it (every shard walks
+        # the full tree, so IDs agree), without waiting for the rest of the tree
+        folders = FolderResolver(self, directory, self.folder_id or 'root')
 
-        # Create folder structure
-        folders = self.create_folder_structure(directory, self.folder_id)
+        if progress:
+            progress.start(0)
 
-        # Get files to sync
-        pattern = '**/*' if recursive else '*'
-        files = [f for f in directory.glob(pattern) if f.is_file()]
+        files = self._discover_files(directory, recursive, exclude or [], shard, progress, folders.folder)
+        yield from self._sync_files(directory, files, folders, workers, progress, lookahead)
 
-        # Filter excluded patterns
-        for pattern in exclude:
-            files = [f for f in files if not f.match(pattern)]
+    def _sync_files(self, directory: Path, files: Iterable[Path], folders: FolderResolver, workers: int = 1,
+                    progress=None, lookahead: int = DEFAULT_LOOKAHEAD) -> Iterator[SyncResult]:
+        """
+        Sync files of a directory as their folders resolve (see iter_sync)
 
-        # Sync each file
-        for file_path in files:
-            # Determine target folder
-            parent_dir = str(file_path.parent)
-            target_folder = folders.get(parent_dir, self.folder_id or 'root')
+        The folder resolver is shut down and the cache saved when the
+        iteration finishes or is abandoned.
 
+        Args:
+            directory: Local directory the files belong to
+            files: Files to sync (may be a lazy iterator)
+            folders: Folder resolver for the directory
+            workers: Number of files to sync concurrently
+            progress: Optional progress reporter (files must already be added)
+            lookahead: Files buffered for cost-based ordering (0 keeps the given order)
+
+        Yields:
+            SyncResult for every file (in completion order)
+        """
+        sync_root = Path(directory).resolve().parent
+
+        def cache_key_for(file_path: Path) -> str:
+            return self._cache_key(file_path, self.folder_id or 'root', sync_root)
+
+        def prepare(converting: ThreadPoolExecutor, file_path: Path) -> Optional[Future]:
+            # Check and convert Docs-bound files while their folder resolves
+            if conversion_kind(file_path) != MarkdownConverter.get_conversion_mimetype():
+                return None
+            return converting.submit(self._prepare_doc, file_path, cache_key_for(file_path), True)
+
+        def discard(prepared: Optional[Future]):
+            # Remove the converted copy of a file that won't be uploaded
+            if prepared is None or prepared.cancelled() or prepared.exception() is not None:
+                return
+            temp_file = prepared.result().get('converted', {}).get('temp_file')
+            if temp_file and os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+        def sync_one(file_path: Path, folder: Future, prepared: Optional[Future] = None) -> SyncResult:
+            cache_key = cache_key_for(file_path)
+            start = time.perf_counter()
             try:
-                file_id = self.sync_file(file_path, target_folder)
-                if file_id:
-                    synced_files[str(file_path)] = file_id
+                result = self._sync_file(file_path, folder.result(), cache_key,
+                                         prepared.result() if prepared else None)
             except Exception as e:
-                print(f"❌ Error syncing {file_path}: {e}")
+                logger.error("❌ Error syncing %s: %s", file_path, e,
+                             extra={'event': 'file_failed', 'path': str(file_path)})
+                self.metrics.count('files_failed')
+                result = SyncResult(file_path, 'failed', error=str(e))
+                discard(prepared)
+            result.duration = time.perf_counter() - start
+            if self.use_cache and result.action in ('created', 'updated'):
+                # Learn how long this file takes for scheduling the next run
+                self.cache.record_cost(cache_key, os.path.getsize(file_path), result.duration)
+            if progress:
+                progress.advance()
+            return result
+
+        def submit(executor: ThreadPoolExecutor, converting: ThreadPoolExecutor, file_path: Path) -> Future:
+            # Queue the file on the upload workers once its folder is resolved and it is converted
+            queued = Future()
+            folder = folders.folder(file_path.parent)
+            prepared = prepare(converting, file_path)
+
+            def start(_):
+                if not queued.set_running_or_notify_cancel():
+                    discard(prepared)
+                    return
+                try:
+                    running = executor.submit(sync_one, file_path, folder, prepared)
+                except RuntimeError as e:
+                    discard(prepared)
+                    queued.set_exception(e)
+                    return
+                running.add_done_callback(lambda done: queued.set_result(done.result()))
+
+            if prepared is None:
+                folder.add_done_callback(start)
+            else:
+                folder.add_done_callback(lambda _: prepared.add_done_callback(start))
+            return queued
+
+        try:
+            if workers > 1 and lookahead > 0:
+                model = CostModel.from_cache(self.cache.cache) if self.use_cache else CostModel()
+
+                def cost(file_path: Path) -> float:
+                    entry = self.cache.lookup(cache_key_for(file_path), file_path) if self.use_cache else None
+                    return model.estimate(file_path, entry)
+
+                # Start as soon as there is a file per worker rather than a full window
+                files = schedule(files, cost, lookahead, start=workers)
+
+            if workers <= 1:
+                for file_path in files:
+                    yield sync_one(file_path, folders.folder(file_path.parent))
+                return
+
+            # Keep at most two files per worker in flight; discovery waits for room
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='md-to-drive-convert') as converting, \
+                    ThreadPoolExecutor(max_workers=workers, thread_name_prefix='md-to-drive-sync') as executor:
+                pending = set()
+                try:
+                    for file_path in files:
+                        if len(pending) >= workers * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                yield future.result()
+                        pending.add(submit(executor, converting, file_path))
+                    while pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                finally:
+                    for future in pending:
+                        future.cancel()
+        finally:
+            # Let folders already requested (e.g. empty directories) finish
+            folders.wait()
+            folders.shutdown()
+            if progress:
+                progress.finish()
+            # Save cache after syncing directory
+            if self.use_cache:
+                with self.metrics.phase('cache_save'):
+                    self.cache.save()
+            self.pool.save_tokens()
+
+    def apply_plan(self, plan: dict, workers: int = 1, progress=None, prune: bool = False) -> Iterator[SyncResult]:
+        """
+        Execute a plan from `md-to-drive plan` without re-scanning or re-hashing
+
+        Renames (and prunes, if enabled) are applied first, then the planned
+        creates and updates are synced like iter_sync() does, using the plan's
+        hashes. Files the plan skips are reported as skipped without being read.
+        Like iter_sync(), files deleted locally are left on Drive unless
+        `prune` is set.
+
+        Args:
+            plan: Plan dictionary (see plan.build_plan)
+            workers: Number of files to sync concurrently
+            progress: Optional progress reporter (see iter_sync)
+            prune: Move the Drive copies of files deleted locally to the trash
+
+        Yields:
+            SyncResult for every planned file
+
+        Raises:
+            ValueError: If the plan targets another Drive folder
+        """
+        if plan['folder_id'] != (self.folder_id or 'root'):
+            raise ValueError(f"Plan targets folder {plan['folder_id']}, not {self.folder_id or 'root'}")
+
+        directory = Path(plan['directory'])
+        self.shard = tuple(plan['shard']) if plan.get('shard') else None
+        folders = FolderResolver(self, directory, plan['folder_id'])
+        for folder in plan['folders']:
+            folders.folder(Path(folder['path']))
+
+        if progress:
+            progress.start(0)
+
+        changes = [item for item in plan['files'] if item['action'] == 'rename' or (prune and item['action'] == 'prune')]
+        uploads = [item for item in plan['files'] if item['action'] in ('create', 'update')]
+        kept = [item for item in plan['files'] if item['action'] == 'prune' and not prune]
+        if kept:
+            logger.info("📌 Keeping %d Drive files whose local file was deleted (pass --prune to trash them)",
+                        len(kept))
+        try:
+            for item in plan['files']:
+                if item['action'] == 'skip' or (item['action'] == 'prune' and not prune):
+                    self.metrics.count('files_skipped')
+                    drive_ids = item.get('drive_ids') or [item.get('drive_id')]
+                    yield SyncResult(Path(item['path']), 'skipped', drive_ids[0])
+            for item in changes:
+                if item['action'] == 'rename':
+                    yield self._rename_planned(item, folders.folder(Path(item['path']).parent))
+                else:
+                    yield self._prune_planned(item)
+        except BaseException:
+            # Abandoned before the uploads: keep the renames and prunes done so far
+            folders.wait()
+            folders.shutdown()
+            if self.use_cache:
+                self.cache.save()
+            raise
+
+        if self.use_cache:
+            # The plan already hashed these files
+            self.cache.known_hashes = {item['path']: item['hash'] for item in uploads}
+        self.metrics.count('files_found', len(uploads))
+        if progress and uploads:
+            progress.add(len(uploads))
+        try:
+            yield from self._sync_files(directory, [Path(item['path']) for item in uploads], folders,
+                                        workers, progress)
+        finally:
+            if self.use_cache:
+                self.cache.known_hashes = {}
+
+    def _rename_planned(self, item: dict, folder: Future) -> SyncResult:
+        """Move and rename a file's Drive copy to match its new local path"""
+        path = Path(item['path'])
+        start = time.perf_counter()
+        try:
+            folder_id = folder.result()
+            with self.metrics.phase('upload'):
+                current = self._execute(lambda service: service.files().get(
+                    fileId=item['drive_id'],
+                    fields='parents',
+                    supportsAllDrives=True
+                ))
+                old_parents = ','.join(parent for parent in current.get('parents', []) if parent != folder_id)
+                self._execute(lambda service: service.files().update(
+                    fileId=item['drive_id'],
+                    body={'name': path.stem},
+                    addParents=folder_id if old_parents else None,
+                    removeParents=old_parents or None,
+                    fields='id',
+                    supportsAllDrives=True
+                ))
+        except Exception as e:
+            logger.error("❌ Error renaming %s: %s", item['from'], e,
+                         extra={'event': 'file_failed', 'path': str(path)})
+            self.metrics.count('files_failed')
+            return SyncResult(path, 'failed', error=str(e), duration=time.perf_counter() - start)
+
+        if self.use_cache:
+            self.cache.move(item['from_key'], item['key'])
+        logger.info("🔀 Renamed: %s -> %s", item['from'], path,
+                    extra={'event': 'file_renamed', 'path': str(path), 'drive_id': item['drive_id']})
+        self.metrics.count('files_renamed')
+        return SyncResult(path, 'renamed', item['drive_id'], duration=time.perf_counter() - start)
+
+    def _prune_planned(self, item: dict) -> SyncResult:
+        """Move the Drive copies of a deleted local file to the trash"""
+        path = Path(item['path'])
+        start = time.perf_counter()
+        try:
+            with self.metrics.phase('upload'):
+                for drive_id in item['drive_ids']:
+                    try:
+                        self._execute(lambda service: service.files().update(
+                            fileId=drive_id,
+                            body={'trashed': True},
+                            fields='id',
+                            supportsAllDrives=True
+                        ))
+                    except HttpError as error:
+                        # Already deleted on Drive
+                        if error.resp.status != 404:
+                            raise
+        except Exception as e:
+            logger.error("❌ Error pruning %s: %s", path, e, extra={'event': 'file_failed', 'path': str(path)})
+            self.metrics.count('files_failed')
+            return SyncResult(path, 'failed', error=str(e), duration=time.perf_counter() - start)
 
-        # Save cache after syncing directory
         if self.use_cache:
-            self.cache.save()
+            self.cache.remove(item['key'])
+        logger.info("🗑️  Pruned: %s", path, extra={'event': 'file_pruned', 'path': str(path)})
+        self.metrics.count('files_pruned')
+        return SyncResult(path, 'pruned', item['drive_ids'][0] if item['drive_ids'] else None,
+                          duration=time.perf_counter() - start)
+
+    def _discover_files(self, directory: Path, recursive: bool, exclude: List[str],
+                        shard: Optional[Tuple[int, int]], progress=None,
+                        on_directory: Optional[Callable[[Path], object]] = None) -> Iterator[Path]:
+        """
+        Lazily walk a directory for files to sync
+
+        Args:
+            directory: Local directory path
+            recursive: Include subdirectories
+            exclude: List of patterns to exclude
+            shard: Optional (index, total) to only yield this shard's files
+            progress: Optional progress reporter to add discovered files to
+            on_directory: Optional callback for each directory walked (before its files)
+
+        Yields:
+            File paths, in sorted order within each directory
+        """
+        walker = walk_directory(directory, recursive, exclude, shard, on_directory)
+        while True:
+            with self.metrics.phase('scan'):
+                entry = next(walker, None)
+            if entry is None:
+                return
+            _, files = entry
+
+            self.metrics.count('files_found', len(files))
+            if progress and files:
+                progress.add(len(files))
+            yield from files
+
+    def sync_directory(self, directory: Path, recursive: bool = True, exclude: Optional[List[str]] = None,
+                       shard: Optional[Tuple[int, int]] = None, folders_only: bool = False,
+                       progress=None, workers: int = 1) -> Dict[str, str]:
+        """
+        Sync entire directory to Google Drive
+
+        Args:
+            directory: Local directory path
+            recursive: Include subdirectories
+            exclude: List of patterns to exclude
+            shard: Optional (index, total) to only sync this shard's share of the files
+            folders_only: Only create the folder structure (pre-pass for sharded syncs)
+            progress: Optional progress reporter (see iter_sync)
+            workers: Number of files to sync concurrently
+
+        Returns:
+            Dictionary mapping local files to Google Drive IDs
+        """
+        if folders_only:
+            self.shard = shard
+            with self.metrics.phase('folders'):
+                self.create_folder_structure(Path(directory), self.folder_id)
+            return {}
 
+        synced_files = {}
+        for result in self.iter_sync(directory, recursive, exclude, shard, workers, progress):
+            if result.drive_id:
+                synced_files[str(result.path)] = result.drive_id
         return synced_files
 
-    def finalize(self):
-        """Save cache before shutdown"""
+    def finalize(self, shutdown: bool = True):
+        """
+        Save cache and access tokens before shutdown
+
+        Args:
+            shutdown: Also stop the conversion processes and image upload workers
+                (a later sync starts new ones)
+        """
         if self.use_cache and self.cache:
-            self.cache.save()
+            with self.metrics.phase('cache_save'):
+                self.cache.save()
+        self.pool.save_tokens()
+        if shutdown:
+            self.conversions.shutdown()
+            if self.assets is not None:
+                self.assets.shutdown()
+
+    def write_report(self, report_file: str, **extra):
+        """
+        Write a JSON report of the run (phase timings, API calls, bytes, per-account usage)
+
+        Args:
+            report_file: Path to write the report to
+            **extra: Additional top-level fields (e.g. profile sections)
+        """
+        self.metrics.write_report(report_file, accounts=self.pool.usage(), **extra)
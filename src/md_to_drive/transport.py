@@ -0,0 +1,203 @@
+"""
+Pooled HTTP transports for MD-to-Drive
+The Google API client talks to an httplib2-style `request()` interface;
+these adapters put a thread-safe, sized keep-alive connection pool behind
+it (urllib3, or httpx for HTTP/2) so every worker thread shares the same
+connections instead of each paying for its own TCP/TLS handshakes
+"""
+
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httplib2
+import urllib3
+from google.auth.transport.urllib3 import Request
+
+
+# Transports that can be passed as `transport`
+TRANSPORTS = ('urllib3', 'http2', 'httplib2')
+DEFAULT_TRANSPORT = 'urllib3'
+
+# Connections kept open per account and host; requests beyond this wait for
+# a free one. Covers the default upload, folder and image workers
+POOL_SIZE = 16
+
+# Seconds to wait for a server response
+TIMEOUT = 120
+
+# Statuses after which the request is retried once with a refreshed token
+REFRESH_STATUSES = (401,)
+
+
+def _response(status: int, reason: str, headers) -> httplib2.Response:
+    """Build the httplib2 response the API client expects"""
+    info = {name.lower(): value for name, value in headers.items()}
+    info['status'] = str(status)
+    response = httplib2.Response(info)
+    response.reason = reason
+    return response
+
+
+class PooledHttp(ABC):
+    """httplib2.Http look-alike that authorizes requests and sends them over a shared pool"""
+
+    def __init__(self, credentials, pool_size: int = POOL_SIZE, timeout: float = TIMEOUT):
+        """
+        Initialize transport
+
+        Args:
+            credentials: Google credentials applied to every request
+            pool_size: Maximum open connections per host
+            timeout: Seconds to wait for a response
+        """
+        # Read by the API client to refresh credentials for batch requests
+        self.credentials = credentials
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._refresh_lock = threading.Lock()
+
+    def _authorize(self, headers: Dict[str, str], force_refresh: bool = False):
+        """Add an access token to the headers, refreshing it once across threads when needed"""
+        if force_refresh or not self.credentials.valid:
+            token = self.credentials.token
+            with self._refresh_lock:
+                # Another thread may have refreshed while this one waited
+                if self.credentials.token == token or not self.credentials.valid:
+                    self.credentials.refresh(self._auth_request())
+        self.credentials.apply(headers)
+
+    def request(self, uri: str, method: str = 'GET', body=None, headers: Optional[Dict[str, str]] = None,
+                redirections: int = 5, connection_type=None) -> Tuple[httplib2.Response, bytes]:
+        """
+        Send a request (same signature as httplib2.Http.request)
+
+        Returns:
+            Tuple of (httplib2.Response, body bytes)
+        """
+        headers = dict(headers or {})
+        self._authorize(headers)
+        status, reason, response_headers, content = self._send(method, uri, body, headers, redirections)
+        # Streamed upload chunks can't be replayed: the API client resumes those
+        if status in REFRESH_STATUSES and not hasattr(body, 'read'):
+            self._authorize(headers, force_refresh=True)
+            status, reason, response_headers, content = self._send(method, uri, body, headers, redirections)
+        return _response(status, reason, response_headers), content
+
+    @abstractmethod
+    def _auth_request(self):
+        """google-auth request adapter used to refresh tokens"""
+
+    @abstractmethod
+    def _send(self, method: str, uri: str, body, headers: Dict[str, str], redirections: int):
+        """Send a request, returning (status, reason, headers, content)"""
+
+    @abstractmethod
+    def close(self):
+        """Close every pooled connection"""
+
+
+class Urllib3Http(PooledHttp):
+    """Pooled HTTP/1.1 keep-alive transport built on urllib3"""
+
+    def __init__(self, credentials, pool_size: int = POOL_SIZE, timeout: float = TIMEOUT):
+        super().__init__(credentials, pool_size, timeout)
+        # Block instead of opening extra connections when the pool is busy
+        self._options = {'maxsize': pool_size, 'block': True, 'timeout': timeout}
+        try:
+            import certifi
+            self._options['ca_certs'] = certifi.where()
+        except ImportError:
+            pass
+        self._direct = urllib3.PoolManager(**self._options)
+        # Proxy settings are read from the environment once, then resolved per origin
+        self._proxies = urllib.request.getproxies()
+        self._managers: Dict[Tuple[str, str], urllib3.PoolManager] = {}
+        self._lock = threading.Lock()
+
+    def _manager_for(self, uri: str) -> urllib3.PoolManager:
+        parts = urlsplit(uri)
+        origin = (parts.scheme, parts.netloc)
+        manager = self._managers.get(origin)
+        if manager is None:
+            with self._lock:
+                manager = self._managers.get(origin)
+                if manager is None:
+                    proxy = self._proxies.get(parts.scheme)
+                    if proxy and not urllib.request.proxy_bypass(parts.hostname or ''):
+                        manager = urllib3.ProxyManager(proxy, **self._options)
+                    else:
+                        manager = self._direct
+                    self._managers[origin] = manager
+        return manager
+
+    def _auth_request(self):
+        return Request(self._direct)
+
+    def _send(self, method, uri, body, headers, redirections):
+        # Only redirects are followed: the API client retries failed requests itself
+        retries = urllib3.Retry(total=redirections, connect=0, read=0, status=0, other=0,
+                                redirect=redirections, raise_on_redirect=False)
+        response = self._manager_for(uri).request(method, uri, body=body, headers=headers, retries=retries)
+        return response.status, response.reason, response.headers, response.data
+
+    def close(self):
+        for manager in {self._direct, *self._managers.values()}:
+            manager.clear()
+
+
+class Http2Http(PooledHttp):
+    """Pooled transport built on httpx, multiplexing requests over HTTP/2 where the server supports it"""
+
+    def __init__(self, credentials, pool_size: int = POOL_SIZE, timeout: float = TIMEOUT):
+        super().__init__(credentials, pool_size, timeout)
+        try:
+            import httpx
+        except ImportError:
+            raise ValueError("The http2 transport needs httpx: pip install 'md-to-drive[http2]'")
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=timeout,
+        )
+        # Token refreshes are rare: one small urllib3 pool is enough for them
+        self._refresh_pool = urllib3.PoolManager(maxsize=1)
+
+    def _auth_request(self):
+        return Request(self._refresh_pool)
+
+    def _send(self, method, uri, body, headers, redirections):
+        if hasattr(body, 'read'):
+            # Upload chunk slice of a file
+            body = body.read()
+        response = self.client.request(method, uri, content=body, headers=headers,
+                                       follow_redirects=redirections > 0)
+        return response.status_code, response.reason_phrase, response.headers, response.content
+
+    def close(self):
+        self.client.close()
+        self._refresh_pool.clear()
+
+
+def make_http(transport: str, credentials, pool_size: int = POOL_SIZE) -> PooledHttp:
+    """
+    Create a pooled transport for credentials
+
+    Args:
+        transport: 'urllib3' or 'http2' (see TRANSPORTS)
+        credentials: Google credentials applied to every request
+        pool_size: Maximum open connections per host
+
+    Returns:
+        Transport to pass as `http` when building an API service
+
+    Raises:
+        ValueError: If the transport is unknown or its dependency is missing
+    """
+    if transport == 'urllib3':
+        return Urllib3Http(credentials, pool_size)
+    if transport == 'http2':
+        return Http2Http(credentials, pool_size)
+    raise ValueError(f"Unknown transport: {transport} (choose from {', '.join(TRANSPORTS)})")
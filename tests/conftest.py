@@ -0,0 +1,23 @@
+"""
+Shared fixtures for MD-to-Drive tests
+"""
+
+import pytest
+
+from fake_drive import FakeDriveServer
+
+
+@pytest.fixture
+def fake_drive(tmp_path, monkeypatch):
+    """
+    Run a fake Drive API server and chdir into a temp project using it
+
+    Yields the server; `credentials.json` in the working directory points
+    at its token endpoint and MD_TO_DRIVE_API_ENDPOINT at its API.
+    """
+    with FakeDriveServer() as server:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('MD_TO_DRIVE_API_ENDPOINT', server.url)
+        monkeypatch.delenv('GOOGLE_DRIVE_FOLDER_ID', raising=False)
+        server.write_credentials(str(tmp_path / 'credentials.json'))
+        yield server
@@ -0,0 +1,787 @@
+"""
+In-process fake of the Google Drive v3 endpoints used by MD-to-Drive
+
+Serves files.list (with `q` parsing), files.get/create/update/delete,
+multipart and resumable uploads, batch requests, the Sheets v4 and Docs v1
+calls used for in-place updates (uploaded CSVs become value grids, uploaded
+Markdown becomes paragraphs) and the OAuth token endpoint over real HTTP, with configurable latency, error injection and
+per-account quotas. Used by the tests and the benchmark suite.
+
+Usage:
+    with FakeDriveServer() as server:
+        server.write_credentials('credentials.json')
+        syncer = GoogleDriveSync('credentials.json', api_endpoint=server.url)
+"""
+
+import base64
+import csv
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+FOLDER_MIMETYPE = 'application/vnd.google-apps.folder'
+SPREADSHEET_MIMETYPE = 'application/vnd.google-apps.spreadsheet'
+DOCUMENT_MIMETYPE = 'application/vnd.google-apps.document'
+
+# (status, headers, body) returned by every fake endpoint
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+class QueryError(ValueError):
+    """Raised for `q` expressions the fake does not understand"""
+
+
+_QUERY_TERMS = [
+    (re.compile(r"name\s*=\s*'((?:[^'\\]|\\.)*)'"),
+     lambda m: lambda f: f['name'] == _unescape(m.group(1))),
+    (re.compile(r"name\s+contains\s+'((?:[^'\\]|\\.)*)'"),
+     lambda m: lambda f: _unescape(m.group(1)) in f['name']),
+    (re.compile(r"mimeType\s*=\s*'((?:[^'\\]|\\.)*)'"),
+     lambda m: lambda f: f['mimeType'] == _unescape(m.group(1))),
+    (re.compile(r"mimeType\s*!=\s*'((?:[^'\\]|\\.)*)'"),
+     lambda m: lambda f: f['mimeType'] != _unescape(m.group(1))),
+    (re.compile(r"'((?:[^'\\]|\\.)*)'\s+in\s+parents"),
+     lambda m: lambda f: _unescape(m.group(1)) in f['parents']),
+    (re.compile(r"trashed\s*=\s*(true|false)"),
+     lambda m: lambda f: f['trashed'] == (m.group(1) == 'true')),
+]
+_AND = re.compile(r"\s+and\s+")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def parse_query(q: str) -> Callable[[dict], bool]:
+    """
+    Compile a Drive `q` expression made of terms joined by `and`
+
+    Args:
+        q: Query string, e.g. "name='a' and 'root' in parents and trashed=false"
+
+    Returns:
+        Predicate taking a file resource
+
+    Raises:
+        QueryError: If the query uses unsupported syntax
+    """
+    predicates = []
+    position = 0
+    q = q.strip()
+
+    while position < len(q):
+        for pattern, build in _QUERY_TERMS:
+            match = pattern.match(q, position)
+            if match:
+                predicates.append(build(match))
+                position = match.end()
+                break
+        else:
+            raise QueryError(f"Invalid query near: {q[position:]!r}")
+
+        separator = _AND.match(q, position)
+        if separator:
+            position = separator.end()
+        elif position < len(q):
+            raise QueryError(f"Invalid query near: {q[position:]!r}")
+
+    return lambda f: all(predicate(f) for predicate in predicates)
+
+
+class FakeDrive:
+    """State and request handling for the fake Drive API"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, quota_per_window: Optional[int] = None,
+                 quota_window: float = 100.0, keep_content: bool = True, seed: int = 0,
+                 connect_latency: float = 0.0):
+        """
+        Initialize fake Drive
+
+        Args:
+            latency: Seconds added to every request
+            error_rate: Probability of answering a request with a 503
+            quota_per_window: Requests allowed per account per window (None: unlimited)
+            quota_window: Quota window in seconds
+            keep_content: Store uploaded bytes, sheet grids and documents (disable for very large benchmarks)
+            seed: Seed for error injection
+            connect_latency: Seconds added to every new connection (e.g. a TLS handshake)
+        """
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.error_rate = error_rate
+        self.quota_per_window = quota_per_window
+        self.quota_window = quota_window
+        self.keep_content = keep_content
+
+        self.files: Dict[str, dict] = {}
+        self.content: Dict[str, bytes] = {}
+        # Spreadsheet ID -> value grid (rows of cells) of its only sheet
+        self.grids: Dict[str, List[List[str]]] = {}
+        # Document ID -> body text and each character's (paragraph style, bullet)
+        self.documents: Dict[str, dict] = {}
+        self.calls: Counter = Counter()
+        self.calls_by_account: Counter = Counter()
+        self.bytes_uploaded = 0
+        # TCP connections accepted (keep-alive clients reuse theirs)
+        self.connections = 0
+
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._sessions: Dict[str, dict] = {}
+        self._recent: Dict[str, deque] = defaultdict(deque)
+        self._scripted_errors: deque = deque()
+
+    # -- test helpers --------------------------------------------------------
+
+    def fail_next(self, status: int = 503, count: int = 1, reason: str = 'backendError',
+                  method: Optional[str] = None, after: int = 0):
+        """
+        Make the next matching requests fail
+
+        Args:
+            status: HTTP status to return
+            count: Number of requests to fail
+            reason: Error reason (e.g. 'userRateLimitExceeded')
+            method: Only fail this API method (e.g. 'files.create'), any if None
+            after: Let this many matching requests through first (e.g. upload chunks)
+        """
+        with self._lock:
+            for _ in range(count):
+                self._scripted_errors.append([method, status, reason, after])
+
+    def reset_counters(self):
+        """Reset API call counters (e.g. between benchmark phases)"""
+        with self._lock:
+            self.calls.clear()
+            self.calls_by_account.clear()
+            self.bytes_uploaded = 0
+            self.connections = 0
+
+    def find(self, name: str, parent_id: Optional[str] = None) -> List[dict]:
+        """Get non-trashed files by name (and parent)"""
+        with self._lock:
+            return [f for f in self.files.values()
+                    if f['name'] == name and not f['trashed']
+                    and (parent_id is None or parent_id in f['parents'])]
+
+    def add_file(self, name: str, mime_type: str = FOLDER_MIMETYPE, parents: Optional[List[str]] = None,
+                 content: Optional[bytes] = None) -> dict:
+        """Create a file directly (e.g. a shared folder to sync into)"""
+        with self._lock:
+            return self._create({'name': name, 'mimeType': mime_type, 'parents': parents or ['root']}, content)
+
+    def sheet_values(self, file_id: str) -> List[List[str]]:
+        """Get a spreadsheet's rows as CSV would hold them (trailing empty cells dropped)"""
+        with self._lock:
+            rows = [list(row) for row in self.grids[file_id]]
+        for row in rows:
+            while row and row[-1] == '':
+                row.pop()
+        return rows
+
+    def doc_paragraphs(self, file_id: str) -> List[Tuple[str, str]]:
+        """Get a document's paragraphs as (style, text), bulleted ones prefixed with '* '"""
+        with self._lock:
+            return [(style, ('* ' if bullet else '') + text) for _, _, text, style, bullet
+                    in _paragraphs(self.documents[file_id])]
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    # -- request handling ----------------------------------------------------
+
+    def handle(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Response:
+        """
+        Handle one HTTP request
+
+        Args:
+            method: HTTP method
+            path: Request path including query string
+            headers: Request headers (lower-case names)
+            body: Request body
+
+        Returns:
+            Tuple of (status, headers, body)
+        """
+        url = urlparse(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/token':
+            return self._token(body)
+
+        if url.path.startswith('/batch/'):
+            return self._batch(headers, body)
+
+        route = self._route(method, url.path, query)
+        if route is None:
+            return _error(404, f"No fake endpoint for {method} {url.path}", 'notFound')
+        api_method, handler = route
+
+        account = headers.get('authorization', '')[len('Bearer '):] or 'anonymous'
+        with self._lock:
+            self.calls[api_method] += 1
+            self.calls_by_account[account] += 1
+            injected = self._injected_error(api_method, account)
+        if self.latency:
+            time.sleep(self.latency)
+        if injected:
+            return injected
+
+        try:
+            with self._lock:
+                return handler(url.path, query, headers, body)
+        except QueryError as e:
+            return _error(400, str(e), 'invalid')
+
+    def _route(self, method: str, path: str, query: dict):
+        file_path = re.fullmatch(r'/drive/v3/files/([^/]+)', path)
+        upload_path = re.fullmatch(r'/upload/drive/v3/files(?:/([^/]+))?', path)
+        sheets_path = re.fullmatch(r'/v4/spreadsheets/([^/:]+)(/values)?(:batchUpdate)?', path)
+        docs_path = re.fullmatch(r'/v1/documents/([^/:]+)(:batchUpdate)?', path)
+
+        if path == '/drive/v3/files':
+            if method == 'GET':
+                return 'files.list', self._list
+            if method == 'POST':
+                return 'files.create', self._create_metadata
+        elif file_path:
+            if method == 'GET':
+                return 'files.get', self._get
+            if method == 'PATCH':
+                return 'files.update', self._update_metadata
+            if method == 'DELETE':
+                return 'files.delete', self._delete
+        elif upload_path:
+            api_method = 'files.update' if upload_path.group(1) else 'files.create'
+            if 'upload_id' in query:
+                return f"{api_method}.upload", self._upload_chunk
+            if method in ('POST', 'PATCH'):
+                return api_method, self._upload
+        elif sheets_path:
+            values, batch_update = sheets_path.group(2), sheets_path.group(3)
+            if method == 'GET' and not values and not batch_update:
+                return 'sheets.get', self._sheets_get
+            if method == 'POST' and batch_update:
+                if values:
+                    return 'sheets.values.batchUpdate', self._sheets_values_batch_update
+                return 'sheets.batchUpdate', self._sheets_batch_update
+        elif docs_path:
+            if method == 'GET' and not docs_path.group(2):
+                return 'docs.get', self._docs_get
+            if method == 'POST' and docs_path.group(2):
+                return 'docs.batchUpdate', self._docs_batch_update
+        return None
+
+    def _injected_error(self, api_method: str, account: str) -> Optional[Response]:
+        for i, error in enumerate(self._scripted_errors):
+            method, status, reason, after = error
+            if method is None or method == api_method:
+                if after:
+                    error[3] -= 1
+                    break
+                del self._scripted_errors[i]
+                return _error(status, f"Injected {reason}", reason)
+
+        if self.quota_per_window is not None:
+            now = time.monotonic()
+            recent = self._recent[account]
+            while recent and recent[0] < now - self.quota_window:
+                recent.popleft()
+            if len(recent) >= self.quota_per_window:
+                return _error(429, "User rate limit exceeded", 'userRateLimitExceeded')
+            recent.append(now)
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            return _error(503, "Injected backend error", 'backendError')
+        return None
+
+    def _token(self, body: bytes) -> Response:
+        # Service account JWT bearer flow: the account is the assertion's issuer
+        form = {k: v[0] for k, v in parse_qs(body.decode('utf-8')).items()}
+        try:
+            payload = form['assertion'].split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            account = claims['iss']
+        except (KeyError, IndexError, ValueError):
+            return _error(400, "Invalid assertion", 'invalid_grant')
+
+        with self._lock:
+            self.calls['oauth.token'] += 1
+        return _json(200, {'access_token': f"fake-token:{account}", 'expires_in': 3600, 'token_type': 'Bearer'})
+
+    def _batch(self, headers: Dict[str, str], body: bytes) -> Response:
+        with self._lock:
+            self.calls['batch'] += 1
+
+        message = BytesParser().parsebytes(
+            b'Content-Type: ' + headers.get('content-type', '').encode('utf-8') + b'\r\n\r\n' + body
+        )
+        boundary = f"batch_{next(self._ids)}"
+        parts = []
+
+        for part in message.get_payload():
+            request = part.get_payload(decode=True)
+            head, _, part_body = request.partition(b'\r\n\r\n')
+            lines = head.decode('utf-8').split('\r\n')
+            method, path = lines[0].split(' ')[:2]
+            part_headers = dict(
+                (k.strip().lower(), v.strip()) for k, v in (line.split(':', 1) for line in lines[1:] if ':' in line)
+            )
+            part_headers.setdefault('authorization', headers.get('authorization', ''))
+            status, response_headers, response_body = self.handle(method, path, part_headers, part_body)
+
+            response = f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+            response += ''.join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"{response}\r\n{response_body.decode('utf-8')}\r\n"
+            )
+
+        payload = (''.join(parts) + f"--{boundary}--\r\n").encode('utf-8')
+        return 200, {'Content-Type': f"multipart/mixed; boundary={boundary}"}, payload
+
+    # -- files ---------------------------------------------------------------
+
+    def _create(self, metadata: dict, content: Optional[bytes] = None, media_type: Optional[str] = None) -> dict:
+        file_id = f"fake{next(self._ids):06d}"
+        now = datetime.now(timezone.utc).isoformat()
+        resource = {
+            'kind': 'drive#file',
+            'id': file_id,
+            'name': metadata.get('name', 'Untitled'),
+            'mimeType': metadata.get('mimeType') or media_type or 'application/octet-stream',
+            'parents': metadata.get('parents') or ['root'],
+            'description': metadata.get('description', ''),
+            'createdTime': now,
+            'modifiedTime': now,
+            'trashed': False,
+            'webViewLink': f"https://docs.google.com/fake/{file_id}",
+        }
+        self.files[file_id] = resource
+        if content is not None:
+            self._store_content(file_id, content)
+        return resource
+
+    def _store_content(self, file_id: str, content: bytes):
+        self.files[file_id]['size'] = str(len(content))
+        self.files[file_id]['md5Checksum'] = hashlib.md5(content).hexdigest()
+        self.files[file_id]['modifiedTime'] = datetime.now(timezone.utc).isoformat()
+        self.files[file_id]['version'] = str(int(self.files[file_id].get('version', '0')) + 1)
+        self.bytes_uploaded += len(content)
+        if not self.keep_content:
+            return
+        self.content[file_id] = content
+        if self.files[file_id]['mimeType'] == SPREADSHEET_MIMETYPE:
+            rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+            width = max((len(row) for row in rows), default=0)
+            self.grids[file_id] = [row + [''] * (width - len(row)) for row in rows]
+        elif self.files[file_id]['mimeType'] == DOCUMENT_MIMETYPE:
+            self.documents[file_id] = _import_markdown(content.decode('utf-8'))
+
+    def _list(self, path, query, headers, body) -> Response:
+        matches = self.files.values()
+        if query.get('q'):
+            predicate = parse_query(query['q'])
+            matches = [f for f in matches if predicate(f)]
+        else:
+            matches = [f for f in matches if not f['trashed']]
+
+        for order in reversed(query.get('orderBy', '').split(',')):
+            if order.strip():
+                field, _, direction = order.strip().partition(' ')
+                matches = sorted(matches, key=lambda f: f.get(field, ''), reverse=direction == 'desc')
+
+        page_size = min(int(query.get('pageSize', 100)), 1000)
+        start = int(query.get('pageToken', 0))
+        page = list(matches)[start:start + page_size]
+        result = {'kind': 'drive#fileList', 'files': page}
+        if start + page_size < len(matches):
+            result['nextPageToken'] = str(start + page_size)
+        return _json(200, result)
+
+    def _get(self, path, query, headers, body) -> Response:
+        resource = self.files.get(path.rsplit('/', 1)[1])
+        if resource is None:
+            return _error(404, "File not found", 'notFound')
+        return _json(200, resource)
+
+    def _create_metadata(self, path, query, headers, body) -> Response:
+        return _json(200, self._create(json.loads(body or b'{}')))
+
+    def _update_metadata(self, path, query, headers, body, content: Optional[bytes] = None) -> Response:
+        file_id = path.rsplit('/', 1)[1]
+        resource = self.files.get(file_id)
+        if resource is None:
+            return _error(404, "File not found", 'notFound')
+
+        metadata = json.loads(body or b'{}')
+        for field in ('name', 'description', 'trashed'):
+            if field in metadata:
+                resource[field] = metadata[field]
+        parents = resource['parents']
+        if query.get('addParents'):
+            parents = parents + query['addParents'].split(',')
+        if query.get('removeParents'):
+            parents = [p for p in parents if p not in query['removeParents'].split(',')]
+        resource['parents'] = parents
+        if content is not None:
+            self._store_content(file_id, content)
+        return _json(200, resource)
+
+    def _delete(self, path, query, headers, body) -> Response:
+        if self.files.pop(path.rsplit('/', 1)[1], None) is None:
+            return _error(404, "File not found", 'notFound')
+        return 204, {}, b''
+
+    # -- sheets --------------------------------------------------------------
+
+    def _grid(self, path: str) -> Optional[List[List[str]]]:
+        return self.grids.get(re.match(r'/v4/spreadsheets/([^/:]+)', path).group(1))
+
+    def _sheets_get(self, path, query, headers, body) -> Response:
+        grid = self._grid(path)
+        if grid is None:
+            return _error(404, "Requested entity was not found.", 'notFound')
+        return _json(200, {'sheets': [{'properties': {
+            'sheetId': 0,
+            'title': 'Sheet1',
+            'gridProperties': {'rowCount': len(grid), 'columnCount': len(grid[0]) if grid else 0},
+        }}]})
+
+    def _sheets_batch_update(self, path, query, headers, body) -> Response:
+        grid = self._grid(path)
+        if grid is None:
+            return _error(404, "Requested entity was not found.", 'notFound')
+        for request in json.loads(body)['requests']:
+            properties = request['updateSheetProperties']['properties']
+            if properties.get('sheetId') != 0:
+                return _error(400, f"No grid with id: {properties.get('sheetId')}", 'badRequest')
+            rows = properties.get('gridProperties', {}).get('rowCount')
+            if rows is not None:
+                width = len(grid[0]) if grid else 0
+                del grid[rows:]
+                grid.extend([''] * width for _ in range(rows - len(grid)))
+        return _json(200, {'replies': [{}]})
+
+    def _sheets_values_batch_update(self, path, query, headers, body) -> Response:
+        grid = self._grid(path)
+        if grid is None:
+            return _error(404, "Requested entity was not found.", 'notFound')
+        cells = 0
+        for data in json.loads(body)['data']:
+            match = re.fullmatch(r'([A-Z]+)(\d+):([A-Z]+)(\d+)', data['range'])
+            first_col, last_col = _column_number(match.group(1)), _column_number(match.group(3))
+            first_row, last_row = int(match.group(2)), int(match.group(4))
+            width = len(grid[0]) if grid else 0
+            if last_row > len(grid) or last_col > width:
+                return _error(400, f"Range ({data['range']}) exceeds grid limits", 'badRequest')
+            for row, values in zip(range(first_row - 1, last_row), data['values']):
+                for col, value in zip(range(first_col - 1, last_col), values):
+                    grid[row][col] = str(value)
+                    cells += 1
+        return _json(200, {'totalUpdatedCells': cells})
+
+    # -- docs ----------------------------------------------------------------
+
+    def _docs_get(self, path, query, headers, body) -> Response:
+        document = self.documents.get(re.match(r'/v1/documents/([^/:]+)', path).group(1))
+        if document is None:
+            return _error(404, "Requested entity was not found.", 'notFound')
+        content = [{'startIndex': 0, 'endIndex': 1, 'sectionBreak': {}}]
+        for start, end, text, style, bullet in _paragraphs(document):
+            paragraph = {
+                'elements': [{'startIndex': start, 'endIndex': end, 'textRun': {'content': text + '\n'}}],
+                'paragraphStyle': {'namedStyleType': style},
+            }
+            if bullet:
+                paragraph['bullet'] = {'listId': 'fake.list'}
+            content.append({'startIndex': start, 'endIndex': end, 'paragraph': paragraph})
+        return _json(200, {'documentId': path.rsplit('/', 1)[1], 'body': {'content': content}})
+
+    def _docs_batch_update(self, path, query, headers, body) -> Response:
+        document = self.documents.get(re.match(r'/v1/documents/([^/:]+)', path).group(1))
+        if document is None:
+            return _error(404, "Requested entity was not found.", 'notFound')
+        # Requests apply in order and all-or-nothing, like the real API
+        text, marks = document['text'], list(document['marks'])
+        for request in json.loads(body)['requests']:
+            (kind, args), = request.items()
+            if kind == 'insertText':
+                index = args['location']['index']
+                if not 1 <= index <= len(text):
+                    return _error(400, f"Index {index} must be less than the end index of the segment", 'badRequest')
+                position = index - 1
+                text = text[:position] + args['text'] + text[position:]
+                marks[position:position] = [marks[position]] * len(args['text'])
+                continue
+
+            start, end = args['range']['startIndex'], args['range']['endIndex']
+            if not 1 <= start < end <= len(text) + 1:
+                return _error(400, f"Invalid range {start}-{end}", 'badRequest')
+            if kind == 'deleteContentRange':
+                if end > len(text):
+                    return _error(400, "The range cannot include the newline at the end of the segment",
+                                  'badRequest')
+                text = text[:start - 1] + text[end - 1:]
+                del marks[start - 1:end - 1]
+            elif kind in ('updateParagraphStyle', 'createParagraphBullets', 'deleteParagraphBullets'):
+                # Paragraph properties cover every paragraph the range touches
+                first = text.rfind('\n', 0, start - 1) + 1
+                last = text.find('\n', end - 2) + 1
+                for i in range(first, last):
+                    style, bullet = marks[i]
+                    if kind == 'updateParagraphStyle':
+                        style = args['paragraphStyle']['namedStyleType']
+                    else:
+                        bullet = kind == 'createParagraphBullets'
+                    marks[i] = (style, bullet)
+            elif kind != 'updateTextStyle':
+                return _error(400, f"Unsupported request: {kind}", 'badRequest')
+        document['text'], document['marks'] = text, marks
+        return _json(200, {'replies': [{} for _ in json.loads(body)['requests']]})
+
+    # -- uploads -------------------------------------------------------------
+
+    def _upload(self, path, query, headers, body) -> Response:
+        upload_type = query.get('uploadType', 'media')
+        file_id = path.rsplit('/', 1)[1] if path.count('/') > 4 else None
+
+        if upload_type == 'resumable':
+            session_id = f"session{next(self._ids)}"
+            self._sessions[session_id] = {
+                'file_id': file_id,
+                'metadata': json.loads(body or b'{}'),
+                'media_type': headers.get('x-upload-content-type'),
+                'total': int(headers['x-upload-content-length']) if 'x-upload-content-length' in headers else None,
+                'data': bytearray(),
+            }
+            location = f"{headers.get('x-fake-base', '')}{path}?uploadType=resumable&upload_id={session_id}"
+            return 200, {'Location': location, 'Content-Length': '0'}, b''
+
+        if upload_type == 'multipart':
+            message = BytesParser().parsebytes(
+                b'Content-Type: ' + headers.get('content-type', '').encode('utf-8') + b'\r\n\r\n' + body
+            )
+            metadata_part, media_part = message.get_payload()
+            metadata = json.loads(metadata_part.get_payload(decode=True) or b'{}')
+            content = media_part.get_payload(decode=True)
+            media_type = media_part.get_content_type()
+        else:
+            metadata, content, media_type = {}, body, headers.get('content-type')
+
+        return self._finish_upload(file_id, metadata, content, media_type, query)
+
+    def _upload_chunk(self, path, query, headers, body) -> Response:
+        session = self._sessions.get(query['upload_id'])
+        if session is None:
+            return _error(404, "Upload session not found", 'notFound')
+
+        content_range = headers.get('content-range', '')
+        status_query = re.fullmatch(r'bytes \*/(\d+|\*)', content_range)
+        if not status_query:
+            match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+|\*)', content_range)
+            if match is None and body:
+                return _error(400, f"Invalid Content-Range: {content_range}", 'badContent')
+            if match:
+                start, total = int(match.group(1)), match.group(3)
+                if start != len(session['data']):
+                    return _error(400, "Chunk does not start at the committed offset", 'badContent')
+                if total != '*':
+                    session['total'] = int(total)
+            session['data'].extend(body)
+
+        received = len(session['data'])
+        if session['total'] is None or received < session['total']:
+            response_headers = {'Content-Length': '0'}
+            if received:
+                response_headers['Range'] = f"bytes=0-{received - 1}"
+            return 308, response_headers, b''
+
+        del self._sessions[query['upload_id']]
+        return self._finish_upload(session['file_id'], session['metadata'], bytes(session['data']),
+                                   session['media_type'], query)
+
+    def _finish_upload(self, file_id, metadata, content, media_type, query) -> Response:
+        if file_id:
+            return self._update_metadata(f"/drive/v3/files/{file_id}", query, {}, json.dumps(metadata).encode(),
+                                         content=content)
+        return _json(200, self._create(metadata, content, media_type))
+
+
+def _import_markdown(content: str) -> dict:
+    # Headings, paragraphs (lines joined) and bullet items; emphasis markers are dropped
+    paragraphs = []
+    lines: List[str] = []
+
+    def flush():
+        if lines:
+            paragraphs.append(('NORMAL_TEXT', False, ' '.join(lines)))
+            lines.clear()
+
+    for line in content.split('\n'):
+        heading = re.match(r'(#{1,6})\s+(.*)', line)
+        item = re.match(r'[-*+]\s+(.*)', line)
+        if heading or item or not line.strip():
+            flush()
+        if heading:
+            paragraphs.append((f"HEADING_{len(heading.group(1))}", False, heading.group(2).strip()))
+        elif item:
+            paragraphs.append(('NORMAL_TEXT', True, item.group(1).strip()))
+        elif line.strip():
+            lines.append(line.strip())
+    flush()
+
+    document = {'text': '', 'marks': []}
+    for style, bullet, text in paragraphs or [('NORMAL_TEXT', False, '')]:
+        text = re.sub(r'\*\*|__', '', text) + '\n'
+        document['text'] += text
+        document['marks'] += [(style, bullet)] * len(text)
+    return document
+
+
+def _paragraphs(document: dict):
+    # (startIndex, endIndex, text, style, bullet) of each paragraph; the body starts at index 1
+    start = 0
+    for end, char in enumerate(document['text']):
+        if char == '\n':
+            style, bullet = document['marks'][end]
+            yield start + 1, end + 2, document['text'][start:end], style, bullet
+            start = end + 1
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+def _json(status: int, body: dict) -> Response:
+    return status, {'Content-Type': 'application/json; charset=UTF-8'}, json.dumps(body).encode('utf-8')
+
+
+def _error(status: int, message: str, reason: str) -> Response:
+    return _json(status, {'error': {
+        'code': status,
+        'message': message,
+        'errors': [{'domain': 'global', 'reason': reason, 'message': message}],
+    }})
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    drive: FakeDrive = None
+    protocol_version = 'HTTP/1.1'
+    # Send each response in one write: separate header/body segments on a
+    # keep-alive connection stall on Nagle + delayed ACK (~40ms per request)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.drive._lock:
+            self.drive.connections += 1
+        if self.drive.connect_latency:
+            time.sleep(self.drive.connect_latency)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        headers['x-fake-base'] = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+        status, response_headers, payload = self.drive.handle(self.command, self.path, headers, body)
+
+        self.send_response(status)
+        for name, value in response_headers.items():
+            if name.lower() != 'content-length':
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDriveServer:
+    """Run a FakeDrive on a local HTTP port in a background thread"""
+
+    def __init__(self, drive: Optional[FakeDrive] = None, **options):
+        """
+        Initialize fake server
+
+        Args:
+            drive: FakeDrive to serve (created from options if omitted)
+            **options: FakeDrive options (latency, error_rate, ...)
+        """
+        self.drive = drive or FakeDrive(**options)
+        handler = type('RequestHandler', (_RequestHandler,), {'drive': self.drive})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Root URL to pass as api_endpoint"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> 'FakeDriveServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeDriveServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def write_credentials(self, path: str, account: str = 'fake-sync@fake-project.iam.gserviceaccount.com'):
+        """
+        Write a service account key whose token endpoint is this server
+
+        Args:
+            path: Where to write the credentials JSON
+            account: Service account email
+        """
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode('utf-8')
+
+        with open(path, 'w') as f:
+            json.dump({
+                'type': 'service_account',
+                'project_id': 'fake-project',
+                'private_key_id': hashlib.md5(account.encode('utf-8')).hexdigest(),
+                'private_key': pem,
+                'client_email': account,
+                'client_id': '1',
+                'token_uri': f"{self.url}token",
+            }, f)
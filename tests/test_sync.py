@@ -2,12 +2,75 @@
 Basic tests for MD-to-Drive sync functionality
 """
 
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import Mock, patch, MagicMock
 
 from md_to_drive import GoogleDriveSync
+from md_to_drive import cli, converter
+from md_to_drive.convert import ConversionPool
 from md_to_drive.converter import FileTypeDetector, MarkdownConverter, CSVConverter
+from md_to_drive.cache import SyncCache, UploadSessions
+from md_to_drive.shard import parse_shard, shard_for_path, in_shard
+from md_to_drive.auth import CredentialPool, TokenCache, is_rate_limit_error
+from md_to_drive.daemon import SyncDaemon
+from md_to_drive.metrics import SyncMetrics
+from md_to_drive.log import JSONLinesFormatter, ProgressBar, setup_logging
+from md_to_drive.profiling import SyncProfiler
+from md_to_drive.schedule import CostModel, schedule
+from md_to_drive.sheets import column_letter, csv_layout, same_columns
+from md_to_drive.docs import changed_sections, render_body, split_sections
+from md_to_drive.folders import FolderResolver
+from md_to_drive.plan import build_plan, load_plan, save_plan
+from fake_drive import parse_query
+from googleapiclient.errors import HttpError
+from types import SimpleNamespace
+from click.testing import CliRunner
+
+
+class RstConverter:
+    """Minimal reStructuredText converter (module level so worker processes can load it)"""
+
+    @staticmethod
+    def prepare_for_upload(rst_file: Path) -> dict:
+        lines = Path(rst_file).read_text().splitlines()
+        markdown = [f"# {line}" if i + 1 < len(lines) and set(lines[i + 1]) == {'='} else line
+                    for i, line in enumerate(lines) if set(line) != {'='}]
+        markdown.append(f"converted by {os.getpid()}")
+        path = Path(rst_file).with_suffix('.converted.md')
+        path.write_text('\n'.join(markdown))
+        return {'name': Path(rst_file).stem, 'mimeType': 'text/markdown', 'temp_file': str(path)}
+
+    @staticmethod
+    def get_conversion_mimetype() -> str:
+        return 'application/vnd.google-apps.document'
+
+
+class TsvConverter:
+    """Minimal tab-separated values converter, synced as a Sheet through a temporary CSV"""
+
+    @staticmethod
+    def prepare_for_upload(tsv_file: Path) -> dict:
+        # Written outside the synced tree so the directory walk never picks it up
+        path = Path(tsv_file).parent.parent / f"{Path(tsv_file).stem}.converted.csv"
+        with open(tsv_file, newline='') as source, open(path, 'w', newline='') as target:
+            csv.writer(target).writerows(csv.reader(source, delimiter='\t'))
+        return {'name': Path(tsv_file).stem, 'mimeType': 'text/csv', 'temp_file': str(path)}
+
+    @staticmethod
+    def get_conversion_mimetype() -> str:
+        return 'application/vnd.google-apps.spreadsheet'
 
 
 class TestFileTypeDetector:
@@ -31,6 +94,22 @@ class TestFileTypeDetector:
         with pytest.raises(ValueError, match="Unsupported file type"):
             FileTypeDetector.get_converter(txt_file)
 
+    def test_registered_and_plugin_converters(self, monkeypatch):
+        """Test converters can be registered directly and through entry points"""
+        monkeypatch.setattr(FileTypeDetector, 'CONVERTERS', dict(FileTypeDetector.CONVERTERS))
+        monkeypatch.setattr(FileTypeDetector, '_plugins_loaded', False)
+        plugin = SimpleNamespace(name='rst', value='plugin:RstConverter', load=lambda: RstConverter)
+        broken = SimpleNamespace(name='adoc', value='missing:Converter', load=Mock(side_effect=ImportError))
+        monkeypatch.setattr(converter, '_entry_points', lambda group: [plugin, broken])
+
+        converter.register_converter(['TXT', '.text'], MarkdownConverter)
+
+        assert FileTypeDetector.get_converter(Path("notes.txt")) == MarkdownConverter
+        assert FileTypeDetector.get_converter(Path("notes.text")) == MarkdownConverter
+        assert FileTypeDetector.get_converter(Path("guide.rst")) == RstConverter
+        with pytest.raises(ValueError):
+            FileTypeDetector.get_converter(Path("guide.adoc"))
+
 
 class TestConverters:
     """Test converter classes"""
@@ -61,6 +140,1097 @@ class TestConverters:
         mimetype = CSVConverter.get_conversion_mimetype()
         assert mimetype == 'application/vnd.google-apps.spreadsheet'
 
+    def test_csv_chunks_repeat_header_and_respect_limits(self, tmp_path):
+        """Test large CSVs are split by rows and cells with stable chunk hashes"""
+        csv_file = tmp_path / "data.csv"
+        csv_file.write_text('id,note\n' + ''.join(f'{i},"line\nbreak {i}"\n' for i in range(25)))
+
+        chunks = list(CSVConverter.iter_chunks(csv_file, 10, 1000, str(tmp_path)))
+        assert [c['rows'] for c in chunks] == [10, 10, 5]
+        assert all(Path(c['path']).read_text().startswith('id,note\n') for c in chunks)
+        assert '"line\nbreak 12"' in Path(chunks[1]['path']).read_text()
+
+        # 3 columns' worth of cells per row: 8 cells fit the header plus 3 rows
+        by_cells = list(CSVConverter.iter_chunks(csv_file, 10, 8, str(tmp_path / "..")))
+        assert by_cells[0]['rows'] == 3
+        assert [c['hash'] for c in CSVConverter.iter_chunks(csv_file, 10, 1000, str(tmp_path))] == \
+            [c['hash'] for c in chunks]
+
+    def test_find_local_images(self, tmp_path):
+        """Test only existing local images outside code blocks are found"""
+        (tmp_path / "img").mkdir()
+        (tmp_path / "img" / "diagram.png").write_bytes(b"png")
+        md = (
+            '![Diagram](img/diagram.png "Title")\n'
+            '![Again](./img/diagram.png)\n'
+            '![Remote](https://example.com/x.png) ![Missing](img/missing.png)\n'
+            '```markdown\n![In code](img/diagram.png)\n```\n'
+        )
+
+        assert MarkdownConverter.find_local_images(md, tmp_path) == [tmp_path / "img" / "diagram.png"]
+
+        rewritten = MarkdownConverter.rewrite_image_links(
+            md, tmp_path, {tmp_path / "img" / "diagram.png": "https://drive/x"})
+        assert '![Diagram](https://drive/x "Title")' in rewritten
+        assert '![Again](https://drive/x)' in rewritten
+        assert '![In code](img/diagram.png)' in rewritten
+        assert '![Missing](img/missing.png)' in rewritten
+
+
+class TestSharding:
+    """Test deterministic shard partitioning"""
+
+    def test_parse_shard(self):
+        """Test parsing i/N shard specs"""
+        assert parse_shard("2/4") == (2, 4)
+
+    @pytest.mark.parametrize("spec", ["0/4", "5/4", "1/0", "abc", "1-4"])
+    def test_parse_invalid_shard(self, spec):
+        """Test malformed shard specs are rejected"""
+        with pytest.raises(ValueError, match="Invalid shard"):
+            parse_shard(spec)
+
+    def test_shards_partition_files(self):
+        """Test every file lands in exactly one shard, stably"""
+        paths = [Path(f"guides/section{i}/page{j}.md") for i in range(10) for j in range(20)]
+
+        for path in paths:
+            owners = [i for i in range(1, 5) if in_shard(path, (i, 4))]
+            assert owners == [shard_for_path(path, 4)]
+
+        counts = [sum(in_shard(p, (i, 4)) for p in paths) for i in range(1, 5)]
+        assert all(count > 0 for count in counts)
+
+
+class TestSyncCache:
+    """Test cache persistence and merging"""
+
+    def test_merge_keeps_most_recent_entry(self):
+        """Test merging shard caches prefers the newest sync"""
+        cache = SyncCache()
+        cache.cache = {
+            'docs/a.md': {'hash': 'old', 'drive_id': '1', 'last_sync': '2025-01-01T00:00:00'},
+            'docs/b.md': {'hash': 'keep', 'drive_id': '2', 'last_sync': '2025-01-03T00:00:00'},
+        }
+
+        changed = cache.merge({
+            'docs/a.md': {'hash': 'new', 'drive_id': '1', 'last_sync': '2025-01-02T00:00:00'},
+            'docs/b.md': {'hash': 'stale', 'drive_id': '2', 'last_sync': '2025-01-02T00:00:00'},
+            'docs/c.md': {'hash': 'added', 'drive_id': '3', 'last_sync': '2025-01-02T00:00:00'},
+        })
+
+        assert changed == 2
+        assert cache.cache['docs/a.md']['hash'] == 'new'
+        assert cache.cache['docs/b.md']['hash'] == 'keep'
+        assert cache.cache['docs/c.md']['hash'] == 'added'
+
+    def test_legacy_entries_migrate_to_portable_keys(self, tmp_path):
+        """Test version 1 caches keyed by local path stay warm"""
+        md_file = tmp_path / "guide.md"
+        md_file.write_text("# Guide\n")
+        legacy_file = tmp_path / "cache.json"
+        legacy_file.write_text(
+            '{"%s": {"hash": "%s", "drive_id": "doc1", "last_sync": "2025"}}'
+            % (md_file, SyncCache.get_file_hash(md_file))
+        )
+
+        cache = SyncCache(str(legacy_file))
+        cache.load()
+        key = SyncCache.make_key('folder1', Path('docs/guide.md'))
+
+        assert cache.should_sync(md_file, key) == (False, "already synced")
+        assert cache.cache[key]['drive_id'] == 'doc1'
+        assert str(md_file) not in cache.cache
+
+    def test_export_import_roundtrip(self, tmp_path):
+        """Test an exported cache can be imported elsewhere"""
+        source = SyncCache(str(tmp_path / "a.json"))
+        source.cache = {'folder1:docs/a.md': {'hash': 'h', 'drive_id': '1', 'last_sync': '2025'}}
+        source.export_to(str(tmp_path / "artifact" / "cache.json"))
+
+        target = SyncCache(str(tmp_path / "b.json"))
+        assert target.import_from(str(tmp_path / "artifact" / "cache.json")) == 1
+        assert target.cache == source.cache
+
+    def test_cache_key_independent_of_invocation_path(self, tmp_path, monkeypatch):
+        """Test docs/, ./docs and absolute paths share cache entries"""
+        md_file = tmp_path / "docs" / "guide" / "a.md"
+        md_file.parent.mkdir(parents=True)
+        md_file.write_text("# A\n")
+        monkeypatch.chdir(tmp_path)
+
+        with patch('md_to_drive.auth.GoogleAuthenticator'):
+            syncer = GoogleDriveSync(folder_id='root123', use_cache=False)
+
+        keys = set()
+        for directory in [Path('docs'), Path('./docs'), tmp_path / 'docs']:
+            keys.add(syncer._cache_key(directory / 'guide' / 'a.md', 'subfolder', directory.resolve().parent))
+
+        assert keys == {'root123:docs/guide/a.md'}
+
+
+class TestUploadSessions:
+    """Test persisted resumable upload sessions"""
+
+    def test_sessions_match_content_and_target(self, tmp_path):
+        """Test a session is only reused for the same content going to the same file"""
+        sessions = UploadSessions(str(tmp_path / "sessions.json"))
+        sessions.record('root:docs/data.csv', 'abc', None, 'https://upload/1', 256)
+
+        reloaded = UploadSessions(str(tmp_path / "sessions.json"))
+        assert reloaded.get('root:docs/data.csv', 'abc', None)['offset'] == 256
+        assert reloaded.get('root:docs/data.csv', 'changed', None) is None
+        assert reloaded.get('root:docs/data.csv', 'abc', 'sheet1') is None
+
+        reloaded.forget('root:docs/data.csv')
+        assert UploadSessions(str(tmp_path / "sessions.json")).sessions == {}
+
+    def test_expired_sessions_are_dropped(self, tmp_path):
+        """Test sessions older than a week are removed on load"""
+        sessions_file = tmp_path / "sessions.json"
+        sessions_file.write_text(json.dumps({
+            'old': {'hash': 'a', 'uri': 'u', 'offset': 1, 'updated': (datetime.now() - timedelta(days=8)).isoformat()},
+            'new': {'hash': 'b', 'uri': 'u', 'offset': 1, 'updated': datetime.now().isoformat()},
+        }))
+
+        assert list(UploadSessions(str(sessions_file)).sessions) == ['new']
+        assert list(json.loads(sessions_file.read_text())) == ['new']
+
+
+class TestCredentialPool:
+    """Test spreading requests across service accounts"""
+
+    @staticmethod
+    def _pool(services):
+        pool = CredentialPool([f"sa{i}.json" for i in range(len(services))])
+        for auth, service in zip(pool.authenticators, services):
+            auth._service = auth._local.service = service
+        return pool
+
+    @staticmethod
+    def _rate_limit_error():
+        return HttpError(Mock(status=429), b'{"error": {"message": "Rate Limit Exceeded"}}')
+
+    def test_rate_limit_detection(self):
+        """Test 429s and 403 rate limit errors are recognised"""
+        assert is_rate_limit_error(self._rate_limit_error())
+        assert is_rate_limit_error(HttpError(Mock(status=403), b'{"reason": "userRateLimitExceeded"}'))
+        assert not is_rate_limit_error(HttpError(Mock(status=403), b'{"reason": "forbidden"}'))
+
+    def test_requests_are_spread_across_accounts(self):
+        """Test the least busy account is used for each request"""
+        services = [MagicMock(), MagicMock()]
+        pool = self._pool(services)
+
+        for _ in range(4):
+            pool.execute(lambda service: service.files().list())
+
+        assert [u['requests'] for u in pool.usage()] == [2, 2]
+
+    def test_failover_on_rate_limit(self):
+        """Test a rate limited request is retried on another account"""
+        limited, healthy = MagicMock(), MagicMock()
+        limited.files().list().execute.side_effect = self._rate_limit_error()
+        healthy.files().list().execute.return_value = {'files': []}
+        pool = self._pool([limited, healthy])
+
+        assert pool.execute(lambda service: service.files().list()) == {'files': []}
+        usage = pool.usage()
+        assert usage[0]['rate_limited'] == 1
+        assert usage[1]['requests'] == 1
+
+
+class TestStartup:
+    """Test CLI startup stays cheap"""
+
+    def test_cli_import_does_not_load_google_client(self):
+        """Test importing the package and CLI skips the Google API client"""
+        code = "import sys, md_to_drive.cli; print('googleapiclient' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert output.stdout.strip() == 'False'
+
+    def test_lazy_package_attributes(self):
+        """Test public classes are still importable from the package"""
+        import md_to_drive
+        assert md_to_drive.GoogleDriveSync is GoogleDriveSync
+
+    def test_token_cache_roundtrip(self, tmp_path):
+        """Test unexpired tokens are reused and expiring ones are not"""
+        token_cache = TokenCache(str(tmp_path / "tokens.json"))
+        creds = Mock(service_account_email='sa@example.iam.gserviceaccount.com',
+                     token='abc', expiry=datetime.utcnow() + timedelta(hours=1))
+        token_cache.store(creds)
+
+        fresh = Mock(service_account_email=creds.service_account_email, token=None, expiry=None)
+        assert token_cache.restore(fresh)
+        assert fresh.token == 'abc'
+
+        creds.expiry = datetime.utcnow() + timedelta(minutes=1)
+        token_cache.store(creds)
+        assert not token_cache.restore(Mock(service_account_email=creds.service_account_email))
+
+
+class TestSyncDaemon:
+    """Test daemon job queueing"""
+
+    def test_pending_jobs_are_coalesced(self, tmp_path):
+        """Test repeated submissions join the pending job"""
+        (tmp_path / "docs").mkdir()
+        daemon = SyncDaemon(Mock())
+
+        first = daemon.submit(str(tmp_path / "docs"))
+        again = daemon.submit(str(tmp_path / "docs" / "."))
+        inner = daemon.submit(str(tmp_path / "docs" / "guide.md"))
+        other = daemon.submit(str(tmp_path / "docs"), exclude=["*.draft.md"])
+
+        assert first is again
+        assert first.submissions == 2
+        assert inner is not first
+        assert other is not first
+
+    def test_workers_run_jobs(self, tmp_path):
+        """Test queued jobs are synced by the worker pool"""
+        (tmp_path / "docs").mkdir()
+        syncer = Mock()
+        syncer.sync_directory.return_value = {'a.md': 'id1', 'b.md': 'id2'}
+        daemon = SyncDaemon(syncer, workers=2)
+        daemon.start()
+
+        job = daemon.wait(daemon.submit(str(tmp_path / "docs"), workers=3).id, timeout=5)
+        daemon.stop()
+
+        assert job.status == 'done'
+        assert job.result == {'files_synced': 2}
+        syncer.sync_directory.assert_called_once()
+        assert syncer.sync_directory.call_args.kwargs['workers'] == 3
+
+    def test_sync_only_forwards_options_the_daemon_honours(self, fake_drive, tmp_path):
+        """Test syncs setting the daemon's own options (accounts, transport...) run in-process"""
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "index.md").write_text("# Index\n")
+        client = Mock(url='http://daemon')
+        client.health.return_value = {'folder_id': None}
+        client.submit.return_value = {'id': 'job1'}
+        client.wait.return_value = {'status': 'done', 'result': {'files_synced': 1}}
+
+        with patch('md_to_drive.cli.DaemonClient.discover', return_value=client):
+            forwarded = CliRunner().invoke(cli.main, ['sync', 'docs', '--workers', '2', '--no-progress'])
+            local = CliRunner().invoke(cli.main, ['sync', 'docs', '--no-images', '--no-progress'])
+
+        assert 'Forwarding' in forwarded.output
+        client.submit.assert_called_once_with('docs', True, [], 2)
+        assert 'Forwarding' not in local.output
+        assert fake_drive.drive.find('index')
+
+
+class TestLogging:
+    """Test structured log output and the progress bar"""
+
+    def test_json_lines_include_extra_fields(self):
+        """Test JSON-lines records carry the message and structured fields"""
+        record = logging.makeLogRecord({
+            'name': 'md_to_drive.sync', 'levelname': 'INFO', 'msg': 'Created: %s',
+            'args': ('docs/a.md',), 'event': 'file_created', 'drive_id': 'abc',
+        })
+        entry = json.loads(JSONLinesFormatter().format(record))
+        assert entry['msg'] == 'Created: docs/a.md'
+        assert entry['level'] == 'info'
+        assert entry['event'] == 'file_created'
+        assert entry['drive_id'] == 'abc'
+
+    def test_progress_bar_shows_throughput(self):
+        """Test the progress bar reports counts, rate and ETA"""
+        stream = io.StringIO()
+        bar = ProgressBar(stream)
+        bar.start(4)
+        bar.advance(4)
+        bar.finish()
+        assert '4/4 files' in stream.getvalue()
+        assert 'files/s' in stream.getvalue()
+        assert 'ETA' in stream.getvalue()
+
+    def test_nested_phases_are_not_counted_twice(self):
+        """Test time spent in an inner phase is only counted for that phase"""
+        metrics = SyncMetrics()
+        start = time.perf_counter()
+        with metrics.phase('upload'):
+            with metrics.phase('hash'):
+                time.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        phases = metrics.report()['phases']
+        assert phases['hash']['seconds'] >= 0.05
+        assert phases['upload']['seconds'] < 0.05
+        assert phases['upload']['seconds'] + phases['hash']['seconds'] <= elapsed
+
+    def test_quiet_sync_logs_nothing_per_file(self, fake_drive, tmp_path):
+        """Test warning level suppresses all per-file output"""
+        TestSyncAgainstFakeDrive._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        stream = io.StringIO()
+
+        setup_logging('warning', stream=stream)
+        try:
+            GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        finally:
+            logging.getLogger('md_to_drive').handlers.clear()
+
+        assert stream.getvalue() == ''
+
+
+class TestProfiling:
+    """Test the --profile hooks"""
+
+    def test_cprofile_sections_cover_hot_paths(self, tmp_path):
+        """Test cProfile mode reports preprocessing and hashing separately"""
+        md_file = tmp_path / "page.md"
+        md_file.write_text("# Page\n```python\nprint(1)\n```\n")
+
+        with SyncProfiler('cprofile') as profiler:
+            MarkdownConverter.preprocess_markdown_for_google_docs(md_file.read_text())
+            SyncCache.get_file_hash(md_file)
+            SyncCache.get_file_hash(md_file)
+
+        sections = profiler.sections()
+        assert sections['preprocess']['calls'] == 1
+        assert sections['hashing']['calls'] == 2
+        assert sections['http_wait']['calls'] == 0
+
+        files = profiler.write(str(tmp_path / "reports" / "run"))
+        assert files == [str(tmp_path / "reports" / "run.pstats"), str(tmp_path / "reports" / "run.profile.txt")]
+        assert '=== hashing (get_file_hash): 2 calls' in (tmp_path / "reports" / "run.profile.txt").read_text()
+
+    def test_sampling_writes_folded_stacks(self, tmp_path):
+        """Test sampling mode writes flame graph input"""
+        with SyncProfiler('sampling', interval=0.001) as profiler:
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        files = profiler.write(str(tmp_path / "run"))
+        lines = (tmp_path / "run.folded").read_text().splitlines()
+        assert files[0].endswith('run.folded')
+        assert any(line.startswith('MainThread;') and 'test_sampling_writes_folded_stacks' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+    def test_unknown_mode(self):
+        """Test an unknown profile mode is rejected"""
+        with pytest.raises(ValueError):
+            SyncProfiler('perf')
+
+
+class TestScheduling:
+    """Test cost-based ordering of the upload queue"""
+
+    def test_most_expensive_items_start_first(self):
+        """Test items are released largest cost first within the lookahead window"""
+        costs = {'a': 1, 'b': 5, 'c': 3, 'd': 9, 'e': 2}
+        assert list(schedule('abcde', costs.get)) == ['d', 'b', 'c', 'e', 'a']
+        assert list(schedule('abcde', costs.get, lookahead=2)) == ['b', 'c', 'd', 'e', 'a']
+
+    def test_window_starts_small_and_widens(self):
+        """Test the first item is released once `start` items are buffered"""
+        costs = {'a': 1, 'b': 5, 'c': 3, 'd': 9, 'e': 2, 'f': 8}
+        discovered = []
+        ordered = schedule(iter(costs), lambda item: discovered.append(item) or costs[item], start=2)
+
+        assert next(ordered) == 'b'
+        assert discovered == ['a', 'b']
+        # The window is now three items: 'a', 'c' and 'd' are buffered
+        assert next(ordered) == 'd'
+        assert discovered == ['a', 'b', 'c', 'd']
+        assert list(ordered) == ['f', 'c', 'e', 'a']
+
+    def test_sheets_cost_more_than_docs(self, tmp_path):
+        """Test the default model expects CSV imports to be slower"""
+        (tmp_path / "a.md").write_text("x" * 1000)
+        (tmp_path / "a.csv").write_text("x" * 1000)
+        model = CostModel()
+        assert model.estimate(tmp_path / "a.csv") > model.estimate(tmp_path / "a.md") > 0
+        assert model.estimate(tmp_path / "a.txt") == 0.0
+
+    def test_model_is_fitted_to_recorded_durations(self, tmp_path):
+        """Test per-kind costs are learned from cache entries"""
+        entries = {
+            f'root:docs/{i}.md': {'size': size, 'duration': 0.2 + size * 1e-5}
+            for i, size in enumerate([100, 1000, 10000])
+        }
+        per_file, per_byte = CostModel.from_cache(entries).costs['application/vnd.google-apps.document']
+        assert per_file == pytest.approx(0.2)
+        assert per_byte == pytest.approx(1e-5)
+
+    def test_file_history_and_unchanged_files(self, tmp_path):
+        """Test a file's own duration is used, and unmodified files cost nothing"""
+        md_file = tmp_path / "big.md"
+        md_file.write_text("x" * 2000)
+        model = CostModel()
+
+        assert model.estimate(md_file, {'size': 1000, 'duration': 3.0}) == pytest.approx(6.0)
+        synced = {'hash': 'h', 'last_sync': datetime.now().isoformat(), 'size': 2000, 'duration': 3.0}
+        assert model.estimate(md_file, synced) == 0.0
+
+
+class TestSheetLayout:
+    """Test block hashing of CSVs for in-place Sheets updates"""
+
+    def test_column_letters(self):
+        """Test A1 column names"""
+        assert [column_letter(n) for n in (1, 26, 27, 52, 703)] == ['A', 'Z', 'AA', 'AZ', 'AAA']
+
+    def test_layout_changes_only_the_edited_block(self, tmp_path):
+        """Test one edited row changes one block hash, and a new column changes the structure"""
+        csv_file = tmp_path / "data.csv"
+        rows = [f"{i},v{i}" for i in range(25)]
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        before = csv_layout(csv_file, block_rows=10)
+
+        rows[12] = "12,changed"
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        after = csv_layout(csv_file, block_rows=10)
+
+        assert (after['rows'], after['width'], len(after['blocks'])) == (25, 2, 3)
+        assert [a == b for a, b in zip(before['blocks'], after['blocks'])] == [True, False, True]
+        assert same_columns(before, after)
+
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n99,x,extra\n")
+        assert not same_columns(before, csv_layout(csv_file, block_rows=10))
+
+
+class TestDocSections:
+    """Test splitting Markdown into sections for in-place Docs updates"""
+
+    def test_sections_split_at_headings_outside_code(self):
+        """Test headings start sections and fenced lines don't"""
+        sections = split_sections("Intro\n# Guide\nText\n```\n# not a heading\n```\n## Setup **now**\nMore\n")
+
+        assert [section.outline for section in sections] == ['0 ', '1 Guide', '2 Setup now']
+        assert '# not a heading' in sections[1].body
+
+    def test_render_body_styles_and_lists(self):
+        """Test paragraphs, lists and inline styles, and refusal of unsupported Markdown"""
+        paragraphs = render_body("Some **bold** and [a link](https://x.test)\nwrapped.\n\n- one\n- two\n1. first\n")
+
+        assert [(text, kind) for text, _, kind in paragraphs] == [
+            ('Some bold and a link wrapped.', None), ('one', 'bullet'), ('two', 'bullet'), ('first', 'number'),
+        ]
+        assert paragraphs[0][1] == [(5, 9, {'bold': True}), (14, 20, {'link': {'url': 'https://x.test'}})]
+        assert render_body("| a | b |\n|---|---|\n") is None
+        assert render_body("═══ CODE ═══\n    make\n") is None
+
+    def test_changed_sections_falls_back_on_structure_changes(self):
+        """Test only same-outline documents with few changed sections are patched"""
+        old = split_sections("# A\none\n# B\ntwo\n# C\nthree\n")
+        entry = {'outline': [s.outline for s in old], 'sections': [s.hash for s in old]}
+
+        assert changed_sections(entry, split_sections("# A\none\n# B\nTWO\n# C\nthree\n")) == [2]
+        assert changed_sections(entry, split_sections("# A\none\n# Bee\ntwo\n# C\nthree\n")) is None
+        assert changed_sections(entry, split_sections("# A\n1\n# B\n2\n# C\n3\n")) is None
+
+
+class TestFolderResolver:
+    """Test folders are resolved as a dependency graph"""
+
+    def test_children_wait_for_parents_and_share_failures(self, tmp_path):
+        """Test each folder is created once inside its parent, and a failed parent fails its subtree"""
+        created = []
+
+        def get_or_create_folder(name, parent_id):
+            if name == 'broken':
+                raise Exception(f"Error with folder '{name}'")
+            created.append((name, parent_id))
+            return f"id-{name}"
+
+        syncer = Mock(metrics=SyncMetrics())
+        syncer.get_or_create_folder.side_effect = get_or_create_folder
+        resolver = FolderResolver(syncer, tmp_path / "docs", 'root')
+        deep = resolver.folder(tmp_path / "docs" / "a" / "b")
+        broken = resolver.folder(tmp_path / "docs" / "broken" / "c")
+
+        assert deep.result(timeout=5) == 'id-b'
+        assert resolver.folder(tmp_path / "docs" / "a") is resolver.folder(tmp_path / "docs" / "a")
+        with pytest.raises(Exception, match='broken'):
+            broken.result(timeout=5)
+        resolver.shutdown()
+        assert sorted(created) == [('a', 'id-docs'), ('b', 'id-a'), ('docs', 'root')]
+
+
+class TestSyncAgainstFakeDrive:
+    """End-to-end sync tests against the local fake Drive API"""
+
+    @staticmethod
+    def _make_tree(root):
+        (root / "docs" / "guide").mkdir(parents=True)
+        (root / "docs" / "index.md").write_text("# Index\n")
+        (root / "docs" / "guide" / "setup.md").write_text("# Setup\n```bash\nmake\n```\n")
+        (root / "docs" / "data.csv").write_text("a,b\n1,2\n")
+
+    def test_fake_query_parsing(self):
+        """Test the fake understands the queries the sync sends"""
+        match = parse_query("name='it\\'s' and 'p1' in parents and trashed=false")
+        assert match({'name': "it's", 'parents': ['p1'], 'trashed': False})
+        assert not match({'name': "it's", 'parents': ['p2'], 'trashed': False})
+
+    def test_directory_sync_mirrors_tree(self, fake_drive, tmp_path):
+        """Test folders and converted files are created in the right place"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        synced = GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+
+        assert len(synced) == 3
+        docs = fake_drive.drive.find('docs', root)[0]
+        guide = fake_drive.drive.find('guide', docs['id'])[0]
+        setup = fake_drive.drive.find('setup', guide['id'])[0]
+        assert setup['mimeType'] == 'application/vnd.google-apps.document'
+        assert b'CODE (BASH)' in fake_drive.drive.content[setup['id']]
+
+    def test_unchanged_files_are_not_uploaded_again(self, fake_drive, tmp_path):
+        """Test a no-op rerun skips cached files and reuses folders"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        fake_drive.drive.reset_counters()
+
+        GoogleDriveSync(folder_id=root).sync_directory(Path('./docs'))
+
+        assert fake_drive.drive.calls['files.create'] == 0
+        assert fake_drive.drive.calls['oauth.token'] == 0
+        assert fake_drive.drive.calls['files.update'] == 0
+        assert fake_drive.drive.calls['sheets.values.batchUpdate'] == 0
+
+    def test_run_report_matches_api_traffic(self, fake_drive, tmp_path):
+        """Test the run report counts every API call and phase"""
+        self._make_tree(tmp_path)
+        syncer = GoogleDriveSync(metrics=SyncMetrics(trace=True))
+        syncer.sync_directory(Path('docs'))
+        syncer.write_report(str(tmp_path / "report.json"))
+
+        report = json.loads((tmp_path / "report.json").read_text())
+        drive_calls = sum(n for method, n in fake_drive.drive.calls.items()
+                          if method != 'oauth.token' and not method.endswith('.upload'))
+        assert report['api']['calls'] == drive_calls
+        assert report['counters']['files_created'] == 3
+        assert {'folders', 'scan', 'hash', 'lookup', 'upload', 'cache_save'} <= set(report['phases'])
+        assert report['bytes_uploaded'] == fake_drive.drive.bytes_uploaded
+        assert any(span['parent'] == 'upload' for span in report['spans'])
+
+    def test_iter_sync_yields_per_file_results(self, fake_drive, tmp_path):
+        """Test iter_sync reports each file's action, size and Drive ID"""
+        self._make_tree(tmp_path)
+        (tmp_path / "docs" / "notes.txt").write_text("plain\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        results = {r.path.name: r for r in GoogleDriveSync(folder_id=root).iter_sync(Path('docs'), workers=4)}
+
+        assert {name: r.action for name, r in results.items()} == {
+            'index.md': 'created', 'setup.md': 'created', 'data.csv': 'created', 'notes.txt': 'unsupported',
+        }
+        assert results['data.csv'].bytes == len("a,b\n1,2\n")
+        assert results['index.md'].drive_id in fake_drive.drive.content
+        assert all(r.duration > 0 for r in results.values())
+
+        rerun = {r.path.name: r.action for r in GoogleDriveSync(folder_id=root).iter_sync(Path('docs'))}
+        assert rerun['index.md'] == 'skipped'
+
+    def test_docs_with_images_are_skipped_in_a_moved_checkout(self, fake_drive, tmp_path, monkeypatch):
+        """Test a tree copied to another directory with its cache hashes the same, images included"""
+        project = tmp_path / "a"
+        (project / "docs" / "img").mkdir(parents=True)
+        (project / "docs" / "img" / "logo.png").write_bytes(b"\x89PNG logo")
+        (project / "docs" / "index.md").write_text("# Index\n![Logo](img/logo.png)\n")
+        shutil.copy(tmp_path / "credentials.json", project)
+        monkeypatch.chdir(project)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+
+        shutil.copytree(project, tmp_path / "b")
+        monkeypatch.chdir(tmp_path / "b")
+        # A fresh checkout: every file looks modified since the last sync
+        later = time.time() + 60
+        for path in (tmp_path / "b" / "docs").rglob('*'):
+            os.utime(path, (later, later))
+        fake_drive.drive.reset_counters()
+        before = json.loads((tmp_path / "b" / "cache" / ".sync_cache.json").read_text())['files']
+
+        results = {r.path.name: r.action for r in GoogleDriveSync(folder_id=root).iter_sync(Path('docs'))}
+
+        assert results == {'index.md': 'skipped', 'logo.png': 'unsupported'}
+        assert fake_drive.drive.calls['files.update'] + fake_drive.drive.calls['files.create'] == 0
+        # Skipped on the content hash alone, without comparing sections
+        assert json.loads((tmp_path / "b" / "cache" / ".sync_cache.json").read_text())['files'] == before
+
+    def test_shared_images_are_uploaded_once(self, fake_drive, tmp_path):
+        """Test an image used by several docs is uploaded once and reused on later runs"""
+        (tmp_path / "docs" / "guide").mkdir(parents=True)
+        (tmp_path / "docs" / "img").mkdir()
+        (tmp_path / "docs" / "img" / "logo.png").write_bytes(b"\x89PNG logo")
+        (tmp_path / "docs" / "index.md").write_text("# Index\n![Logo](img/logo.png)\n")
+        (tmp_path / "docs" / "guide" / "setup.md").write_text("# Setup\n![Logo](../img/logo.png)\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'), workers=2)
+
+        assets = fake_drive.drive.find('_assets', root)[0]
+        digest = SyncCache.get_file_hash(tmp_path / "docs" / "img" / "logo.png")
+        image = fake_drive.drive.find(f"{digest}.png", assets['id'])
+        assert len(image) == 1
+        index = fake_drive.drive.find('index', fake_drive.drive.find('docs', root)[0]['id'])[0]
+        assert f"id={image[0]['id']}".encode() in fake_drive.drive.content[index['id']]
+
+        # Unchanged: nothing is uploaded. Changed image: both docs are re-rendered.
+        fake_drive.drive.reset_counters()
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        assert fake_drive.drive.calls['files.create'] == 0
+
+        (tmp_path / "docs" / "img" / "logo.png").write_bytes(b"\x89PNG new logo")
+        results = {r.path.name: r.action for r in GoogleDriveSync(folder_id=root).iter_sync(Path('docs'))}
+        assert results['index.md'] == results['setup.md'] == 'updated'
+        new_digest = SyncCache.get_file_hash(tmp_path / "docs" / "img" / "logo.png")
+        assert len(fake_drive.drive.find(f"{new_digest}.png", assets['id'])) == 1
+
+    def test_finalize_stops_image_workers(self, fake_drive, tmp_path):
+        """Test finalize() stops the asset upload threads and a later sync starts new ones"""
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "logo.png").write_bytes(b"\x89PNG logo")
+        (tmp_path / "docs" / "index.md").write_text("# Index\n![Logo](logo.png)\n")
+        syncer = GoogleDriveSync(folder_id=fake_drive.drive.add_file('Shared')['id'])
+        syncer.sync_directory(Path('docs'))
+        executor = syncer.assets._executor
+
+        syncer.finalize()
+
+        assert executor._shutdown and syncer.assets._executor is None
+        (tmp_path / "docs" / "logo.png").write_bytes(b"\x89PNG new logo")
+        assert next(syncer.iter_sync(Path('docs'))).action == 'updated'
+        syncer.finalize()
+
+    def test_large_csv_is_split_and_unchanged_chunks_skipped(self, fake_drive, tmp_path, caplog):
+        """Test chunked CSV sync uploads only the chunks that changed"""
+        (tmp_path / "docs").mkdir()
+        csv_file = tmp_path / "docs" / "data.csv"
+        rows = [f"{i},value{i}" for i in range(25)]
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        def sync():
+            syncer = GoogleDriveSync(folder_id=root)
+            syncer.csv_chunk_rows = 10
+            syncer.upload_chunk_size = 64
+            return {r.path.name: r for r in syncer.iter_sync(Path('docs'))}['data.csv']
+
+        with caplog.at_level(logging.INFO, logger='md_to_drive'):
+            assert sync().action == 'created'
+        folder = fake_drive.drive.find('docs', root)[0]['id']
+        assert [len(fake_drive.drive.find(name, folder)) for name in ('data', 'data (part 2)', 'data (part 3)')] \
+            == [1, 1, 1]
+        assert any(getattr(record, 'event', None) == 'upload_progress' for record in caplog.records)
+
+        fake_drive.drive.reset_counters()
+        assert sync().action == 'skipped'
+        assert fake_drive.drive.calls['files.update'] + fake_drive.drive.calls['files.create'] == 0
+
+        rows[12] = "12,changed"
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        fake_drive.drive.reset_counters()
+        assert sync().action == 'updated'
+        # Only the changed rows of part 2 are rewritten: no chunk is uploaded again
+        assert fake_drive.drive.calls['files.update'] == 0
+        assert fake_drive.drive.calls['sheets.values.batchUpdate'] == 1
+        part2 = fake_drive.drive.find('data (part 2)', folder)[0]['id']
+        assert ['12', 'changed'] in fake_drive.drive.sheet_values(part2)
+        # Chunk sheet IDs come from the cache: the only lookup is the docs folder
+        assert fake_drive.drive.calls['files.list'] == 1
+
+        rows[3] = "3,changed,extra"
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        fake_drive.drive.reset_counters()
+        assert sync().action == 'updated'
+        # Part 1 gained a column: it is uploaded again
+        assert fake_drive.drive.calls['files.update'] == 1
+
+        csv_file.write_text("id,value\n" + "\n".join(rows[:5]) + "\n")
+        sync()
+        assert fake_drive.drive.find('data (part 2)', folder) == []
+
+    def test_csv_with_long_rows_is_updated_in_place(self, fake_drive, tmp_path):
+        """Test chunking depends on row count, not file size, so wide small CSVs get differential updates"""
+        (tmp_path / "docs").mkdir()
+        csv_file = tmp_path / "docs" / "data.csv"
+        rows = [f"{i},{'x' * 100}" for i in range(8)]
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+        syncer = GoogleDriveSync(folder_id=root)
+        syncer.csv_chunk_rows = 10
+        assert next(syncer.iter_sync(Path('docs'))).action == 'created'
+        assert len(fake_drive.drive.find('data (part 2)')) == 0
+
+        rows[5] = "5,changed"
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        fake_drive.drive.reset_counters()
+
+        assert next(syncer.iter_sync(Path('docs'))).action == 'updated'
+        assert fake_drive.drive.calls['files.update'] == 0
+        assert fake_drive.drive.calls['sheets.values.batchUpdate'] == 1
+
+    def test_deleted_chunk_sheet_is_uploaded_again(self, fake_drive, tmp_path):
+        """Test a chunk whose cached sheet was deleted on Drive is recreated instead of failing"""
+        (tmp_path / "docs").mkdir()
+        csv_file = tmp_path / "docs" / "data.csv"
+        rows = [f"{i},value{i}" for i in range(25)]
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+        syncer = GoogleDriveSync(folder_id=root)
+        syncer.csv_chunk_rows = 10
+        assert next(syncer.iter_sync(Path('docs'))).action == 'created'
+
+        folder = fake_drive.drive.find('docs', root)[0]['id']
+        part2 = fake_drive.drive.find('data (part 2)', folder)[0]['id']
+        fake_drive.drive.files.pop(part2)
+        fake_drive.drive.grids.pop(part2)
+        rows[12] = "12,changed"
+        csv_file.write_text("id,value\n" + "\n".join(rows) + "\n")
+
+        assert next(syncer.iter_sync(Path('docs'))).action == 'updated'
+        recreated = fake_drive.drive.find('data (part 2)', folder)
+        assert len(recreated) == 1 and recreated[0]['id'] != part2
+        assert b'12,changed' in fake_drive.drive.content[recreated[0]['id']]
+
+    def test_interrupted_upload_resumes_on_next_run(self, fake_drive, tmp_path):
+        """Test an upload that failed midway continues its saved session instead of starting over"""
+        (tmp_path / "docs").mkdir()
+        csv_file = tmp_path / "docs" / "data.csv"
+        csv_file.write_text("id,value\n" + "".join(f"{i},value{i}\n" for i in range(40)))
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        def sync():
+            syncer = GoogleDriveSync(folder_id=root)
+            syncer.upload_chunk_size = 128
+            return next(syncer.iter_sync(Path('docs')))
+
+        fake_drive.drive.fail_next(503, method='files.create.upload', after=1)
+        assert sync().action == 'failed'
+        sessions = UploadSessions('cache/.upload_sessions.json').sessions
+        assert [session['offset'] for session in sessions.values()] == [128]
+
+        fake_drive.drive.reset_counters()
+        result = sync()
+
+        assert result.action == 'created'
+        # No new session: a status query, then only the chunks after the first
+        assert fake_drive.drive.calls['files.create'] == 0
+        assert fake_drive.drive.calls['files.create.upload'] == 4
+        assert fake_drive.drive.content[result.drive_id] == csv_file.read_bytes()
+        assert UploadSessions('cache/.upload_sessions.json').sessions == {}
+
+    def test_expired_upload_session_restarts(self, fake_drive, tmp_path):
+        """Test a session the server no longer knows is replaced by a new one"""
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "data.csv").write_text("id,value\n" + "".join(f"{i},v\n" for i in range(40)))
+        root = fake_drive.drive.add_file('Shared')['id']
+        syncer = GoogleDriveSync(folder_id=root)
+        syncer.upload_chunk_size = 128
+        fake_drive.drive.fail_next(503, method='files.create.upload', after=1)
+        assert next(syncer.iter_sync(Path('docs'))).action == 'failed'
+
+        fake_drive.drive._sessions.clear()
+        fake_drive.drive.reset_counters()
+
+        assert next(syncer.iter_sync(Path('docs'))).action == 'created'
+        assert fake_drive.drive.calls['files.create'] == 1
+
+    def test_changed_csv_rows_are_updated_in_place(self, fake_drive, tmp_path):
+        """Test edited, appended and removed rows are written with the Sheets API"""
+        (tmp_path / "docs").mkdir()
+        csv_file = tmp_path / "docs" / "data.csv"
+        rows = [[str(i), f"value{i}"] for i in range(1200)]
+
+        def sync(rows, header=('id', 'value')):
+            with open(csv_file, 'w', newline='') as f:
+                csv.writer(f).writerows([list(header)] + rows)
+            fake_drive.drive.reset_counters()
+            return {r.path.name: r for r in GoogleDriveSync(folder_id=root).iter_sync(Path('docs'))}['data.csv']
+
+        root = fake_drive.drive.add_file('Shared')['id']
+        sheet_id = sync(rows).drive_id
+
+        rows[700][1] = "changed"
+        assert sync(rows).action == 'updated'
+        assert fake_drive.drive.calls['files.update'] == 0
+        assert fake_drive.drive.calls['sheets.values.batchUpdate'] == 1
+        assert fake_drive.drive.sheet_values(sheet_id) == [['id', 'value']] + rows
+
+        # Appended and removed rows resize the grid
+        rows += [["1200", "new"], ["1201", "row, with comma"]]
+        sync(rows)
+        assert fake_drive.drive.sheet_values(sheet_id) == [['id', 'value']] + rows
+        rows = rows[:300]
+        sync(rows)
+        assert fake_drive.drive.calls['files.update'] == 0
+        assert fake_drive.drive.sheet_values(sheet_id) == [['id', 'value']] + rows
+
+        # A new column structure is re-imported
+        assert sync(rows, header=('id', 'label')).action == 'updated'
+        assert fake_drive.drive.calls['files.update'] == 1
+        assert fake_drive.drive.calls['sheets.values.batchUpdate'] == 0
+
+    def test_csv_update_falls_back_to_reimport(self, fake_drive, tmp_path):
+        """Test a failed in-place update re-imports the whole CSV"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+
+        (tmp_path / "docs" / "data.csv").write_text("a,b\n1,3\n")
+        fake_drive.drive.reset_counters()
+        fake_drive.drive.fail_next(403, reason='accessNotConfigured', method='sheets.values.batchUpdate')
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+
+        assert fake_drive.drive.calls['files.update'] == 1
+        sheet = fake_drive.drive.find('data', fake_drive.drive.find('docs', root)[0]['id'])[0]
+        assert fake_drive.drive.sheet_values(sheet['id']) == [['a', 'b'], ['1', '3']]
+
+    def test_registered_sheets_converter_uploads_its_csv(self, fake_drive, tmp_path, monkeypatch):
+        """Test a registered Sheets converter's CSV is imported and updated, and then removed"""
+        monkeypatch.setattr(FileTypeDetector, 'CONVERTERS', dict(FileTypeDetector.CONVERTERS))
+        converter.register_converter('.tsv', TsvConverter)
+        (tmp_path / "docs").mkdir()
+        tsv_file = tmp_path / "docs" / "data.tsv"
+        tsv_file.write_text("a\tb\n1\t2\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        result = next(GoogleDriveSync(folder_id=root).iter_sync(Path('docs')))
+        assert result.action == 'created'
+        assert fake_drive.drive.sheet_values(result.drive_id) == [['a', 'b'], ['1', '2']]
+        assert not (tmp_path / "data.converted.csv").exists()
+
+        tsv_file.write_text("a\tb\n1\t3\n")
+        fake_drive.drive.reset_counters()
+        assert next(GoogleDriveSync(folder_id=root).iter_sync(Path('docs'))).action == 'updated'
+        assert fake_drive.drive.calls['sheets.values.batchUpdate'] == 1
+        assert fake_drive.drive.sheet_values(result.drive_id) == [['a', 'b'], ['1', '3']]
+        assert not (tmp_path / "data.converted.csv").exists()
+
+    def test_changed_doc_sections_are_updated_in_place(self, fake_drive, tmp_path):
+        """Test an edited section is rewritten with the Docs API and the rest of the doc is kept"""
+        (tmp_path / "docs").mkdir()
+        md_file = tmp_path / "docs" / "guide.md"
+        parts = ["Intro text.\n", "# Install\nRun the **installer**.\n", "# Use\n- open\n- save\n",
+                 "# Notes\nNothing yet.\n", "# End\n"]
+        root = fake_drive.drive.add_file('Shared')['id']
+
+        def sync():
+            md_file.write_text("\n".join(parts))
+            fake_drive.drive.reset_counters()
+            return {r.path.name: r for r in GoogleDriveSync(folder_id=root).iter_sync(Path('docs'))}['guide.md']
+
+        doc_id = sync().drive_id
+        parts[2] = "# Use\n- open\n- edit\n- save\n\nThen *close* it.\n"
+        parts[4] = "# End\nBye.\n"
+        assert sync().action == 'updated'
+        assert fake_drive.drive.calls['files.update'] == 0
+        assert fake_drive.drive.calls['docs.batchUpdate'] == 1
+        assert fake_drive.drive.doc_paragraphs(doc_id) == [
+            ('NORMAL_TEXT', 'Intro text.'),
+            ('HEADING_1', 'Install'), ('NORMAL_TEXT', 'Run the installer.'),
+            ('HEADING_1', 'Use'), ('NORMAL_TEXT', '* open'), ('NORMAL_TEXT', '* edit'), ('NORMAL_TEXT', '* save'),
+            ('NORMAL_TEXT', 'Then close it.'),
+            ('HEADING_1', 'Notes'), ('NORMAL_TEXT', 'Nothing yet.'),
+            ('HEADING_1', 'End'), ('NORMAL_TEXT', 'Bye.'),
+        ]
+
+        # Emptying a section removes its paragraphs
+        parts[3] = "# Notes\n"
+        sync()
+        assert ('NORMAL_TEXT', 'Nothing yet.') not in fake_drive.drive.doc_paragraphs(doc_id)
+        assert fake_drive.drive.calls['files.update'] == 0
+
+        # A new heading changes the structure: the doc is re-uploaded
+        parts.append("# Appendix\nMore.\n")
+        assert sync().action == 'updated'
+        assert fake_drive.drive.calls['files.update'] == 1
+        assert fake_drive.drive.calls['docs.batchUpdate'] == 0
+
+    def test_doc_edited_by_hand_is_reuploaded(self, fake_drive, tmp_path):
+        """Test a doc whose headings no longer match the Markdown is replaced"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        index = fake_drive.drive.find('index', fake_drive.drive.find('docs', root)[0]['id'])[0]
+        fake_drive.drive.documents[index['id']] = {'text': 'Retitled\n', 'marks': [('HEADING_1', False)] * 9}
+
+        (tmp_path / "docs" / "index.md").write_text("# Index\nNew text.\n")
+        fake_drive.drive.reset_counters()
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+
+        assert fake_drive.drive.calls['docs.batchUpdate'] == 0
+        assert fake_drive.drive.calls['files.update'] == 1
+        assert fake_drive.drive.doc_paragraphs(index['id']) == [('HEADING_1', 'Index'), ('NORMAL_TEXT', 'New text.')]
+
+    def test_uploads_start_before_the_folder_tree_is_complete(self, fake_drive, tmp_path):
+        """Test files in resolved folders upload while deeper folders are still being created"""
+        deep = tmp_path / "docs"
+        (deep / "index.md").parent.mkdir()
+        (deep / "index.md").write_text("# Index\n")
+        for name in "abcdef":
+            deep = deep / name
+            deep.mkdir()
+            (deep / "page.md").write_text(f"# {name}\n")
+        root = fake_drive.drive.add_file('Shared')['id']
+        fake_drive.drive.latency = 0.02
+
+        results = list(GoogleDriveSync(folder_id=root).iter_sync(Path('docs'), workers=4))
+
+        assert all(r.action == 'created' for r in results)
+        created = {f['name']: f['createdTime'] for f in fake_drive.drive.files.values()}
+        assert created['index'] < created['f']
+        assert fake_drive.drive.find('page', fake_drive.drive.find('f')[0]['id'])
+
+    def test_sync_durations_are_recorded_for_scheduling(self, fake_drive, tmp_path):
+        """Test uploads store their size and duration in the cache"""
+        self._make_tree(tmp_path)
+        syncer = GoogleDriveSync(folder_id=fake_drive.drive.add_file('Shared')['id'])
+        syncer.sync_directory(Path('docs'), workers=2)
+
+        entries = syncer.cache.cache.values()
+        assert len(entries) == 3
+        assert all(entry['duration'] > 0 and entry['size'] > 0 for entry in entries)
+
+    def test_iter_sync_discovers_files_lazily(self, fake_drive, tmp_path):
+        """Test stopping early leaves the rest of the tree unscanned but saves the cache"""
+        for i in range(5):
+            (tmp_path / "docs" / f"part{i}").mkdir(parents=True)
+            (tmp_path / "docs" / f"part{i}" / "page.md").write_text(f"# Part {i}\n")
+        syncer = GoogleDriveSync(folder_id=fake_drive.drive.add_file('Shared')['id'])
+
+        results = syncer.iter_sync(Path('docs'))
+        first = next(results)
+        results.close()
+
+        assert first.action == 'created'
+        assert syncer.metrics.report()['counters']['files_found'] < 5
+        assert len(SyncCache(syncer.cache.cache_file).load()) == 1
+
+    def test_registered_converters_run_in_worker_processes(self, fake_drive, tmp_path, monkeypatch):
+        """Test registered converters sync as Docs and large files convert in another process"""
+        monkeypatch.setattr(FileTypeDetector, 'CONVERTERS', dict(FileTypeDetector.CONVERTERS))
+        converter.register_converter('.rst', RstConverter)
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "guide.rst").write_text("Guide\n=====\n\nText\n")
+        (tmp_path / "docs" / "index.md").write_text("# Index\n```py\nx = 1\n```\n")
+        (tmp_path / "docs" / "small.md").write_text("# Small\n")
+        syncer = GoogleDriveSync(folder_id=fake_drive.drive.add_file('Shared')['id'])
+        # The library converts in the sync threads unless asked for processes
+        assert syncer.conversions.workers == 0
+        syncer.conversions = ConversionPool(workers=1, min_bytes=16)
+        try:
+            results = {r.path.name: r for r in syncer.iter_sync(Path('docs'), workers=2)}
+        finally:
+            syncer.finalize()
+        assert syncer.conversions._executor is None
+
+        assert {name: r.action for name, r in results.items()} == {
+            'guide.rst': 'created', 'index.md': 'created', 'small.md': 'created',
+        }
+        guide = fake_drive.drive.content[results['guide.rst'].drive_id].decode()
+        assert guide.startswith('# Guide')
+        assert f"converted by {os.getpid()}" not in guide
+        assert b'CODE (PY)' in fake_drive.drive.content[results['index.md'].drive_id]
+        assert not (tmp_path / "docs" / "guide.converted.md").exists()
+
+    def test_pooled_transport_shares_connections_across_threads(self, fake_drive):
+        """Test worker threads reuse a bounded set of keep-alive connections"""
+        pool = CredentialPool('credentials.json', transport='urllib3', pool_size=2)
+        pool.authenticate()
+
+        def list_files(_):
+            return pool.execute(lambda service: service.files().list(pageSize=1))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(list_files, range(40)))
+
+        assert len(results) == 40
+        assert fake_drive.drive.calls['files.list'] == 40
+        # Token requests share the pool too
+        assert fake_drive.drive.connections <= 2
+
+    def test_pooled_transport_refreshes_rejected_token(self, fake_drive):
+        """Test a 401 refreshes the access token and retries once"""
+        pool = CredentialPool('credentials.json')
+        pool.authenticate()
+        pool.execute(lambda service: service.files().list(pageSize=1))
+        fake_drive.drive.fail_next(status=401, reason='authError', method='files.list')
+
+        pool.execute(lambda service: service.files().list(pageSize=1))
+
+        assert fake_drive.drive.calls['files.list'] == 3
+        assert fake_drive.drive.calls['oauth.token'] == 2
+
+    def _change_tree(self, root):
+        (root / "docs" / "index.md").write_text("# Index\n\nMore.\n")
+        (root / "docs" / "guide" / "setup.md").rename(root / "docs" / "guide" / "install.md")
+        (root / "docs" / "data.csv").unlink()
+        (root / "docs" / "faq").mkdir()
+        (root / "docs" / "faq" / "new.md").write_text("# New\n")
+
+    def test_plan_needs_no_api_calls(self, fake_drive, tmp_path):
+        """Test a plan classifies changes from the cache alone"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        self._change_tree(tmp_path)
+        fake_drive.drive.reset_counters()
+
+        cache = SyncCache()
+        cache.load()
+        plan = build_plan(Path('docs'), cache, root)
+
+        assert fake_drive.drive.total_calls == 0
+        actions = {Path(item['path']).name: item['action'] for item in plan['files']}
+        assert actions == {'index.md': 'update', 'install.md': 'rename', 'new.md': 'create', 'data.csv': 'prune'}
+        summary = plan['summary']
+        assert (summary['folders'], summary['new_folders']) == (3, 1)
+        assert summary['bytes'] == len("# Index\n\nMore.\n") + len("# New\n")
+        assert summary['api_calls'] > 0
+
+    def test_plan_keeps_deleted_files_without_prune(self, fake_drive, tmp_path):
+        """Test a plan only trashes Drive copies of deleted files when pruning is asked for"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        data_id = fake_drive.drive.find('data')[0]['id']
+        (tmp_path / "docs" / "data.csv").unlink()
+        cache = SyncCache()
+        cache.load()
+
+        results = {r.path.name: r.action for r in GoogleDriveSync(folder_id=root).apply_plan(
+            build_plan(Path('docs'), cache, root))}
+
+        assert results['data.csv'] == 'skipped'
+        assert not fake_drive.drive.files[data_id].get('trashed')
+
+    def test_sync_executes_saved_plan(self, fake_drive, tmp_path):
+        """Test applying a plan renames in place, trashes pruned files and uploads the rest"""
+        self._make_tree(tmp_path)
+        root = fake_drive.drive.add_file('Shared')['id']
+        GoogleDriveSync(folder_id=root).sync_directory(Path('docs'))
+        setup_id = fake_drive.drive.find('setup')[0]['id']
+        data_id = fake_drive.drive.find('data')[0]['id']
+        self._change_tree(tmp_path)
+        cache = SyncCache()
+        cache.load()
+        save_plan(build_plan(Path('docs'), cache, root), 'plan.json')
+        fake_drive.drive.reset_counters()
+
+        results = {r.path.name: r.action
+                   for r in GoogleDriveSync(folder_id=root).apply_plan(load_plan('plan.json'), prune=True)}
+
+        assert results == {'index.md': 'updated', 'install.md': 'renamed', 'new.md': 'created', 'data.csv': 'pruned'}
+        assert fake_drive.drive.files[setup_id]['name'] == 'install'
+        assert fake_drive.drive.files[data_id]['trashed']
+        assert fake_drive.drive.calls['files.create'] == 2  # faq folder and new.md
+        cache.load()
+        replan = build_plan(Path('docs'), cache, root)
+        assert {item['action'] for item in replan['files']} == {'skip'}
+
 
 # Integration tests would require actual Google Drive credentials
 # These should be run separately in CI/CD with test credentials